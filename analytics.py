@@ -0,0 +1,347 @@
+"""
+Optional DuckDB analytics backend for historical reports.
+
+The andon database is attached read-only (SQLite file or Lakebase), or a Parquet
+archive is read instead, and the multi-week Pareto / trend queries run columnar
+and multi-threaded inside DuckDB. Results come back as Arrow-backed DataFrames.
+Nothing here writes to the operational database.
+"""
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from config import (
+    ANALYTICS_PARQUET_DIR,
+    ANALYTICS_THREADS,
+    ANDON_SCHEMA,
+    PG_DATABASE,
+    PG_HOST,
+    PG_PORT,
+    PG_READ_HOST,
+    PG_SSLMODE,
+    PG_USER,
+)
+from db import DB_PATH, IS_LAKEBASE, _lakebase_password
+
+# Optional import for DuckDB (analytics only)
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - handled at runtime if missing
+    duckdb = None
+
+TABLES = (
+    "lines",
+    "machines",
+    "operators",
+    "work_orders",
+    "downtime_reasons",
+    "quality_reasons",
+    "downtime_events",
+    "quality_events",
+    "production_counts",
+    "safety_incidents",
+    "targets",
+)
+
+BUCKETS = {
+    "hour": "INTERVAL 1 HOUR",
+    "day": "INTERVAL 1 DAY",
+    "week": "INTERVAL 7 DAY",
+    "month": "INTERVAL 1 MONTH",
+}
+
+# Lakebase OAuth tokens expire after an hour; re-attach well before that.
+_LAKEBASE_REATTACH_SECONDS = 45 * 60
+# After a failed attach (e.g. the extension cannot be downloaded), callers fall back for this long.
+_RETRY_SECONDS = 300
+
+_conn = None
+_conn_opened_at = 0.0
+_conn_failed_at = None
+_conn_lock = threading.Lock()
+
+
+def is_available() -> bool:
+    """True when duckdb is installed and the database could be attached."""
+    global _conn_failed_at
+    if duckdb is None:
+        return False
+    if _conn_failed_at is not None and time.time() - _conn_failed_at < _RETRY_SECONDS:
+        return False
+    try:
+        _connection().close()
+    except Exception as exc:
+        _conn_failed_at = time.time()
+        print(f"Analytics: DuckDB unavailable, reading the database directly ({exc})")
+        return False
+    _conn_failed_at = None
+    return True
+
+
+def _load_extension(con, name: str):
+    """LOAD a DuckDB extension, installing it only when it is not present (INSTALL needs network)."""
+    try:
+        con.execute(f"LOAD {name}")
+    except duckdb.Error:
+        con.execute(f"INSTALL {name}")
+        con.execute(f"LOAD {name}")
+
+
+def _attach(con):
+    """Expose the andon tables to DuckDB as read-only views or an attached catalog."""
+    if ANALYTICS_PARQUET_DIR:
+        root = Path(ANALYTICS_PARQUET_DIR)
+        for table in TABLES:
+            single = root / f"{table}.parquet"
+            source = single if single.exists() else root / table / "*.parquet"
+            con.execute(
+                f"CREATE OR REPLACE VIEW {table} AS "
+                f"SELECT * FROM read_parquet('{source.as_posix()}', hive_partitioning = true)"
+            )
+        return
+
+    if IS_LAKEBASE:
+        _load_extension(con, "postgres")
+        # Prefer the read replica so historical scans never compete with operator writes.
+        dsn = (
+            f"host={PG_READ_HOST or PG_HOST} port={PG_PORT} dbname={PG_DATABASE} user={PG_USER} "
+            f"password={_lakebase_password()} sslmode={PG_SSLMODE}"
+        )
+        con.execute(f"ATTACH '{dsn}' AS andon (TYPE POSTGRES, READ_ONLY)")
+        con.execute(f'USE andon."{ANDON_SCHEMA}"')
+        return
+
+    _load_extension(con, "sqlite")
+    con.execute(f"ATTACH '{DB_PATH.resolve().as_posix()}' AS andon (TYPE SQLITE, READ_ONLY)")
+    con.execute("USE andon")
+
+
+def _connection():
+    """Return a per-call DuckDB cursor on the shared, process-wide analytics connection."""
+    global _conn, _conn_opened_at
+    if duckdb is None:
+        raise RuntimeError("duckdb is required for the analytics backend.")
+    with _conn_lock:
+        expired = IS_LAKEBASE and time.time() - _conn_opened_at > _LAKEBASE_REATTACH_SECONDS
+        if _conn is None or expired:
+            if _conn is not None:
+                _conn.close()
+            _conn = None
+            con = duckdb.connect(database=":memory:", config={"threads": ANALYTICS_THREADS})
+            try:
+                _attach(con)
+            except Exception:
+                con.close()
+                raise
+            _conn, _conn_opened_at = con, time.time()
+        # DuckDB cursors are independent connections to the same catalog and are safe per thread.
+        return _conn.cursor()
+
+
+def _query(sql: str, params: Optional[Any] = None) -> pd.DataFrame:
+    """Execute on a fresh cursor and return an Arrow-backed DataFrame."""
+    if isinstance(params, dict):
+        # DuckDB rejects named parameters the statement does not reference.
+        used = set(re.findall(r"\$(\w+)", sql))
+        params = {name: value for name, value in params.items() if name in used}
+    else:
+        params = list(params or [])
+    cur = _connection()
+    try:
+        table = cur.execute(sql, params).fetch_arrow_table()
+    finally:
+        cur.close()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _bucket_interval(bucket: str) -> str:
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+    return BUCKETS[bucket]
+
+
+# Downtime rows clipped to the [start, end] window; open events run until `now`.
+_CLIPPED_DOWNTIME = """
+    SELECT d.machine_id, d.line_id, d.reason_id,
+           greatest(CAST(d.start_time AS TIMESTAMP), CAST($start AS TIMESTAMP)) AS s,
+           least(coalesce(CAST(d.end_time AS TIMESTAMP), CAST($now AS TIMESTAMP)), CAST($end AS TIMESTAMP)) AS e
+    FROM downtime_events d
+    WHERE d.start_time <= $end_str
+      AND (d.end_time IS NULL OR d.end_time >= $start_str)
+      AND ($line_id IS NULL OR d.line_id = $line_id)
+"""
+
+
+def _window_params(start: datetime, end: datetime, line_id=None) -> dict:
+    return {
+        "start": start,
+        "end": end,
+        "start_str": start.isoformat(),
+        "end_str": end.isoformat(),
+        "now": datetime.now(),
+        "line_id": int(line_id) if line_id is not None else None,
+    }
+
+
+def event_frames(start: datetime, end: datetime) -> dict:
+    """Raw downtime / quality / production rows of the window, filtered and joined like db.py's summaries."""
+    params = _window_params(start, end)
+    return {
+        "downtime": _query("""
+            SELECT d.id, d.machine_id, d.line_id, d.reason_id, d.operator_id,
+                   CAST(d.start_time AS TIMESTAMP) AS start_time, CAST(d.end_time AS TIMESTAMP) AS end_time
+            FROM downtime_events d
+            JOIN machines m ON d.machine_id = m.id
+            JOIN lines l ON d.line_id = l.id
+            JOIN downtime_reasons r ON d.reason_id = r.id
+            WHERE (d.end_time IS NULL OR d.end_time >= $start_str) AND d.start_time <= $end_str
+        """, params),
+        "quality": _query("""
+            SELECT q.id, q.machine_id, q.line_id, q.work_order_id, q.reason_id, q.quantity,
+                   CAST(q.timestamp AS TIMESTAMP) AS timestamp
+            FROM quality_events q
+            JOIN machines m ON q.machine_id = m.id
+            JOIN lines l ON q.line_id = l.id
+            JOIN quality_reasons r ON q.reason_id = r.id
+            WHERE q.timestamp >= $start_str AND q.timestamp <= $end_str
+        """, params),
+        "production": _query("""
+            SELECT p.id, p.machine_id, p.line_id, p.work_order_id, p.good_quantity,
+                   CAST(p.timestamp AS TIMESTAMP) AS timestamp
+            FROM production_counts p
+            JOIN machines m ON p.machine_id = m.id
+            JOIN lines l ON p.line_id = l.id
+            WHERE p.timestamp >= $start_str AND p.timestamp <= $end_str
+        """, params),
+    }
+
+
+def downtime_pareto(start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+    """Downtime minutes per reason inside the window, with cumulative Pareto %."""
+    sql = f"""
+        WITH dt AS ({_CLIPPED_DOWNTIME})
+        SELECT r.code AS reason_code,
+               r.description AS reason_description,
+               r.category,
+               count(*) AS events,
+               sum(date_diff('second', dt.s, dt.e)) / 60.0 AS downtime_minutes,
+               100.0 * sum(sum(date_diff('second', dt.s, dt.e))) OVER (ORDER BY sum(date_diff('second', dt.s, dt.e)) DESC
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+                   / sum(sum(date_diff('second', dt.s, dt.e))) OVER () AS cumulative_pct
+        FROM dt
+        JOIN downtime_reasons r ON dt.reason_id = r.id
+        WHERE dt.e > dt.s
+        GROUP BY r.code, r.description, r.category
+        ORDER BY downtime_minutes DESC
+    """
+    return _query(sql, _window_params(start, end, line_id))
+
+
+def downtime_trend(start: datetime, end: datetime, bucket: str = "day", line_id=None) -> pd.DataFrame:
+    """Downtime minutes per line and time bucket, splitting events across bucket boundaries."""
+    interval = _bucket_interval(bucket)
+    sql = f"""
+        WITH dt AS ({_CLIPPED_DOWNTIME}),
+        buckets AS (
+            SELECT unnest(generate_series(date_trunc('{bucket}', CAST($start AS TIMESTAMP)),
+                                          CAST($end AS TIMESTAMP), {interval})) AS bucket_start
+        )
+        SELECT b.bucket_start,
+               l.name AS line_name,
+               r.category,
+               sum(date_diff('second',
+                             greatest(dt.s, b.bucket_start),
+                             least(dt.e, b.bucket_start + {interval}))) / 60.0 AS downtime_minutes
+        FROM buckets b
+        JOIN dt ON dt.s < b.bucket_start + {interval} AND dt.e > b.bucket_start
+        JOIN lines l ON dt.line_id = l.id
+        JOIN downtime_reasons r ON dt.reason_id = r.id
+        GROUP BY b.bucket_start, l.name, r.category
+        ORDER BY b.bucket_start, l.name, r.category
+    """
+    return _query(sql, _window_params(start, end, line_id))
+
+
+def quality_trend(start: datetime, end: datetime, bucket: str = "day", line_id=None) -> pd.DataFrame:
+    """Good / scrap counts and FPY per line and bucket, with a rolling 7-bucket FPY."""
+    _bucket_interval(bucket)
+    sql = f"""
+        WITH good AS (
+            SELECT p.line_id, date_trunc('{bucket}', CAST(p.timestamp AS TIMESTAMP)) AS bucket_start,
+                   CAST(sum(p.good_quantity) AS BIGINT) AS good
+            FROM production_counts p
+            WHERE p.timestamp >= $start_str AND p.timestamp <= $end_str
+              AND ($line_id IS NULL OR p.line_id = $line_id)
+            GROUP BY ALL
+        ),
+        scrap AS (
+            SELECT q.line_id, date_trunc('{bucket}', CAST(q.timestamp AS TIMESTAMP)) AS bucket_start,
+                   CAST(sum(q.quantity) AS BIGINT) AS scrap
+            FROM quality_events q
+            WHERE q.timestamp >= $start_str AND q.timestamp <= $end_str
+              AND ($line_id IS NULL OR q.line_id = $line_id)
+            GROUP BY ALL
+        ),
+        joined AS (
+            SELECT coalesce(g.line_id, s.line_id) AS line_id,
+                   coalesce(g.bucket_start, s.bucket_start) AS bucket_start,
+                   coalesce(g.good, 0) AS good,
+                   coalesce(s.scrap, 0) AS scrap
+            FROM good g
+            FULL OUTER JOIN scrap s ON g.line_id = s.line_id AND g.bucket_start = s.bucket_start
+        )
+        SELECT j.bucket_start, l.name AS line_name, j.good, j.scrap,
+               100.0 * j.good / nullif(j.good + j.scrap, 0) AS fpy,
+               100.0 * sum(j.good) OVER w / nullif(sum(j.good + j.scrap) OVER w, 0) AS fpy_rolling_7
+        FROM joined j
+        JOIN lines l ON j.line_id = l.id
+        WINDOW w AS (PARTITION BY j.line_id ORDER BY j.bucket_start ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)
+        ORDER BY j.bucket_start, l.name
+    """
+    return _query(sql, _window_params(start, end, line_id))
+
+
+def scrap_pareto(start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+    """Scrap quantity per quality reason inside the window, with cumulative Pareto %."""
+    sql = """
+        SELECT r.code AS reason_code,
+               r.description AS reason_description,
+               count(*) AS events,
+               CAST(sum(q.quantity) AS BIGINT) AS quantity,
+               100.0 * sum(sum(q.quantity)) OVER (ORDER BY sum(q.quantity) DESC
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+                   / sum(sum(q.quantity)) OVER () AS cumulative_pct
+        FROM quality_events q
+        JOIN quality_reasons r ON q.reason_id = r.id
+        WHERE q.timestamp >= $start_str AND q.timestamp <= $end_str
+          AND ($line_id IS NULL OR q.line_id = $line_id)
+        GROUP BY r.code, r.description
+        ORDER BY quantity DESC
+    """
+    return _query(sql, _window_params(start, end, line_id))
+
+
+def query(sql: str, params: Optional[Any] = None) -> pd.DataFrame:
+    """Run an ad-hoc read-only query (DuckDB dialect) against the attached tables."""
+    return _query(sql, params)
+
+
+def export_parquet_archive(dest: str) -> list:
+    """Copy every andon table into `<dest>/<table>.parquet` for offline analytics."""
+    root = Path(dest)
+    root.mkdir(parents=True, exist_ok=True)
+    cur = _connection()
+    written = []
+    try:
+        for table in TABLES:
+            path = root / f"{table}.parquet"
+            cur.execute(f"COPY (SELECT * FROM {table}) TO '{path.as_posix()}' (FORMAT PARQUET)")
+            written.append(str(path))
+    finally:
+        cur.close()
+    return written
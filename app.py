@@ -1,5 +1,7 @@
 import streamlit as st
-from db import init_db, seed_db
+from db import ensure_database
+from event_store import get_event_store
+from write_queue import start_worker
 
 st.set_page_config(
     page_title="Digital Andon",
@@ -19,6 +21,9 @@ def main():
     - **Maintenance View**: For managing active maintenance requests.
     - **Value Stream SQDC**: Tier-1 daily management board for value streams.
     - **Executive Summary**: Tier-2 aggregated dashboard and action tracking.
+    - **Andon Board**: Plant-wide machine status for floor screens (`?kiosk=1`).
+    - **Reports**: Historical downtime, production rate, quality and OEE trends.
+    - **Machine Timeline**: When each machine on a line was down, by reason category.
     """)
 
     st.info("This is a simple MVP andon system built with Streamlit.")
@@ -32,10 +37,16 @@ def main():
             st.page_link("pages/1_Operator_Panel.py", label="Go to Operator Panel", icon="🏭")
             st.page_link("pages/5_Value_Stream_SQDC.py", label="View SQDC Board", icon="📊")
             st.page_link("pages/6_Executive_Summary.py", label="Executive Summary", icon="📈")
+            st.page_link("pages/11_Andon_Board.py", label="Andon Board", icon="🚨")
+            st.page_link("pages/12_Reports.py", label="Reports", icon="📉")
+            st.page_link("pages/13_Machine_Timeline.py", label="Machine Timeline", icon="🕒")
         else:
             st.write("Use the sidebar to navigate.")
 
 if __name__ == "__main__":
-    init_db()
-    seed_db()
+    ensure_database()
+    # Restores the event store snapshot and starts background warming on first load.
+    get_event_store()
+    # Replays operator writes journaled before a restart or outage.
+    start_worker()
     main()
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the Andon app.
+
+Run from the repository root, e.g. `python -m benchmarks.import_time`.
+Results are written as JSON under benchmarks/results/ so runs can be compared.
+"""
@@ -0,0 +1,355 @@
+"""
+Synthetic plant-scale data for benchmarks.
+
+Master data and years of downtime / quality / production history are generated as
+NumPy columns, with no per-row Python work, and bulk loaded. SQLite uses one executemany
+per table in a single transaction; Postgres uses COPY. Rows are inserted in time order,
+so ids grow with timestamps as they do in production (the event store relies on this).
+
+    python -m benchmarks.datagen --lines 6 --machines-per-line 8 --days 730
+
+Existing rows are deleted first, so the CLIs always target a scratch database:
+benchmarks/.data/bench.db on SQLite, or the `andon_bench` schema of a local Postgres
+(`--backend postgres`, password auth from PGHOST / PGUSER / PGPASSWORD).
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Children before parents, for clearing.
+TABLES = [
+    "mrb_items", "inspection_records", "targets", "actions", "safety_incidents",
+    "production_counts", "quality_events", "downtime_events",
+    "quality_reasons", "downtime_reasons", "work_orders", "operators", "machines", "lines",
+]
+
+DOWNTIME_REASONS = [
+    ("NO_MAT", "No Material", "Unplanned"),
+    ("JAM", "Machine Jam", "Unplanned"),
+    ("MECH", "Mechanical Failure", "Unplanned"),
+    ("ELEC", "Electrical Fault", "Unplanned"),
+    ("QUAL", "Quality Hold", "Unplanned"),
+    ("BRK", "Break", "Planned"),
+    ("CHG", "Changeover", "Planned"),
+    ("PM", "Preventive Maintenance", "Planned"),
+]
+QUALITY_REASONS = [
+    ("DIM", "Dimension Out of Spec", "Defect"),
+    ("SCR", "Scratch/Dent", "Defect"),
+    ("MAT", "Material Defect", "Defect"),
+    ("ASM", "Assembly Error", "Defect"),
+    ("REW", "Rework", "Rework"),
+]
+
+
+SCRATCH_SQLITE = "benchmarks/.data/bench.db"
+SCRATCH_SCHEMA = "andon_bench"
+
+
+def use_scratch_database(backend: str):
+    """
+    Point config at the benchmark database. Must run before `db` is first imported,
+    since config reads the environment at import time.
+    """
+    if backend == "sqlite":
+        os.environ["DB_BACKEND"] = "sqlite"
+        os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", SCRATCH_SQLITE)
+        os.makedirs(os.path.dirname(os.environ["DB_NAME"]) or ".", exist_ok=True)
+    elif backend == "postgres":
+        # Plain Postgres through the Lakebase code path, with password auth and its own schema.
+        os.environ["DB_BACKEND"] = "lakebase"
+        os.environ["PG_AUTH"] = "password"
+        os.environ["ANDON_SCHEMA"] = os.environ.get("BENCH_SCHEMA", SCRATCH_SCHEMA)
+        for name, default in (("PGHOST", "localhost"), ("PGDATABASE", "postgres"), ("PGUSER", "postgres"), ("PGSSLMODE", "disable")):
+            os.environ.setdefault(name, default)
+    else:
+        raise ValueError(f"Unknown benchmark backend '{backend}'. Use 'sqlite' or 'postgres'.")
+    # Keep side services out of the measurements.
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["WARM_CACHE_DIR"] = ""
+    os.environ["SQLITE_SNAPSHOT_NAME"] = ""
+    os.environ["WRITE_QUEUE_PATH"] = os.environ.get("BENCH_QUEUE_PATH", "benchmarks/.data/queue.db")
+
+
+class PlantScale(NamedTuple):
+    lines: int = 4
+    machines_per_line: int = 6
+    operators: int = 60
+    days: int = 365
+    downtime_per_day: float = 6.0     # events per machine per day
+    quality_per_day: float = 4.0      # scrap events per machine per day
+    production_per_day: float = 48.0  # count postings per machine per day (every 30 min)
+    work_orders_per_line: int = 40
+    seed: int = 42
+
+    @property
+    def machines(self) -> int:
+        return self.lines * self.machines_per_line
+
+
+def _iso(values: np.ndarray, unit: str = "s") -> list:
+    """datetime64 -> ISO 8601 strings (what the helpers write); NaT -> None."""
+    text = np.datetime_as_string(values, unit=unit)
+    return [None if s == "NaT" else s for s in text.tolist()]
+
+
+def _events(rng, scale: PlantScale, per_day: float, start: np.datetime64, now: np.datetime64):
+    """Time-sorted (machine index, timestamp) pairs up to `now`: a Poisson number per machine-day."""
+    counts = rng.poisson(per_day, size=scale.machines * scale.days)
+    machine_day = np.repeat(np.arange(scale.machines * scale.days), counts)
+    machine = machine_day % scale.machines
+    day = machine_day // scale.machines
+    seconds = rng.integers(0, 86400, size=machine_day.size)
+    ts = start + (day * 86400 + seconds).astype("timedelta64[s]")
+    order = np.argsort(ts, kind="stable")
+    machine, ts = machine[order], ts[order]
+    keep = ts <= now
+    return machine[keep], ts[keep]
+
+
+def generate(scale: PlantScale, end: Optional[datetime] = None) -> dict:
+    """{table: {column: values}} for every table the dashboards read; ids start at 1."""
+    rng = np.random.default_rng(scale.seed)
+    end = end or datetime.now()
+    start = np.datetime64(datetime.combine(end.date() - timedelta(days=scale.days - 1), datetime.min.time()), "s")
+    now = np.datetime64(end, "s")
+
+    line_ids = np.arange(1, scale.lines + 1)
+    machine_ids = np.arange(1, scale.machines + 1)
+    machine_line = np.repeat(line_ids, scale.machines_per_line)
+    operator_ids = np.arange(1, scale.operators + 1)
+
+    tables = {
+        "lines": {
+            "id": line_ids,
+            "name": [f"Line_{i:02d}" for i in line_ids],
+            "description": [f"Synthetic line {i}" for i in line_ids],
+        },
+        "machines": {
+            "id": machine_ids,
+            "name": [f"L{line:02d}_M{(m - 1) % scale.machines_per_line + 1:02d}" for m, line in zip(machine_ids, machine_line)],
+            "line_id": machine_line,
+            "description": ["Synthetic machine"] * scale.machines,
+            # Standards between 12 and 20 s per unit (deterministic, so the event streams are unchanged).
+            "ideal_cycle_seconds": (12.0 + 2 * (machine_ids % 5)).tolist(),
+        },
+        "operators": {
+            "id": operator_ids,
+            "name": [f"Operator_{i:03d}" for i in operator_ids],
+            "badge_id": [f"OP{i:04d}" for i in operator_ids],
+        },
+        "downtime_reasons": {
+            "id": np.arange(1, len(DOWNTIME_REASONS) + 1),
+            **dict(zip(("code", "description", "category"), map(list, zip(*DOWNTIME_REASONS)))),
+        },
+        "quality_reasons": {
+            "id": np.arange(1, len(QUALITY_REASONS) + 1),
+            **dict(zip(("code", "description", "category"), map(list, zip(*QUALITY_REASONS)))),
+        },
+    }
+
+    n_wo = scale.lines * scale.work_orders_per_line
+    wo_line = np.repeat(line_ids, scale.work_orders_per_line)
+    # The newest work order per line is Active, a few are Scheduled, the rest Completed.
+    rank = np.tile(np.arange(scale.work_orders_per_line)[::-1], scale.lines)
+    wo_status = np.where(rank == 0, "Active", np.where(rank < 4, "Scheduled", "Completed"))
+    tables["work_orders"] = {
+        "id": np.arange(1, n_wo + 1),
+        "wo_number": [f"WO-{i:06d}" for i in range(1, n_wo + 1)],
+        "part_number": [f"PN-{i % 50:03d}" for i in range(n_wo)],
+        "target_quantity": rng.integers(100, 5000, size=n_wo),
+        "due_date": _iso(now + rng.integers(-scale.days, 30, size=n_wo).astype("timedelta64[D]"), unit="D"),
+        "line_id": wo_line,
+        "status": wo_status.tolist(),
+    }
+    # Events reference the line's active work order.
+    active_wo = {int(line): int(wo) for line, wo, r in zip(wo_line, tables["work_orders"]["id"], rank) if r == 0}
+    wo_for_line = np.array([active_wo[int(line)] for line in line_ids])
+
+    def event_columns(machine_idx, ts):
+        n = ts.size
+        return {
+            "id": np.arange(1, n + 1),
+            "machine_id": machine_ids[machine_idx],
+            "line_id": machine_line[machine_idx],
+            "work_order_id": wo_for_line[machine_line[machine_idx] - 1],
+            "operator_id": rng.choice(operator_ids, size=n),
+        }
+
+    machine_idx, ts = _events(rng, scale, scale.downtime_per_day, start, now)
+    # Exponential durations (mean 12 min); events still running at `end` stay open.
+    duration = np.maximum(rng.exponential(12 * 60, size=ts.size), 30).astype("timedelta64[s]")
+    end_ts = ts + duration
+    open_mask = end_ts > now
+    end_ts = np.where(open_mask, np.datetime64("NaT"), end_ts)
+    minutes = np.where(open_mask, np.nan, duration.astype(np.float64) / 60)
+    downtime = event_columns(machine_idx, ts)
+    downtime.update({
+        "reason_id": rng.integers(1, len(DOWNTIME_REASONS) + 1, size=ts.size),
+        "start_time": _iso(ts),
+        "end_time": _iso(end_ts),
+        "duration_minutes": [None if np.isnan(m) else round(float(m), 2) for m in minutes],
+        "notes": [""] * ts.size,
+    })
+    tables["downtime_events"] = downtime
+
+    machine_idx, ts = _events(rng, scale, scale.quality_per_day, start, now)
+    quality = event_columns(machine_idx, ts)
+    quality.update({
+        "reason_id": rng.integers(1, len(QUALITY_REASONS) + 1, size=ts.size),
+        "quantity": rng.integers(1, 10, size=ts.size),
+        "timestamp": _iso(ts),
+        "notes": [""] * ts.size,
+    })
+    tables["quality_events"] = quality
+
+    machine_idx, ts = _events(rng, scale, scale.production_per_day, start, now)
+    production = event_columns(machine_idx, ts)
+    production.update({
+        "good_quantity": rng.integers(5, 60, size=ts.size),
+        "scrap_quantity": np.zeros(ts.size, dtype=np.int64),
+        "timestamp": _iso(ts),
+    })
+    tables["production_counts"] = production
+
+    incidents = rng.poisson(0.02, size=scale.lines * scale.days)
+    line_day = np.repeat(np.arange(scale.lines * scale.days), incidents)
+    tables["safety_incidents"] = {
+        "id": np.arange(1, line_day.size + 1),
+        "line_id": line_ids[line_day % scale.lines],
+        "date": _iso(start + (line_day // scale.lines).astype("timedelta64[D]"), unit="D"),
+        "description": ["Synthetic incident"] * line_day.size,
+    }
+
+    n_actions = scale.lines * 20
+    tables["actions"] = {
+        "id": np.arange(1, n_actions + 1),
+        "timestamp": _iso(np.sort(start + rng.integers(0, scale.days * 86400, size=n_actions).astype("timedelta64[s]"))),
+        "line_id": rng.choice(line_ids, size=n_actions),
+        "category": rng.choice(["Safety", "Quality", "Delivery", "Cost"], size=n_actions).tolist(),
+        "description": ["Synthetic action"] * n_actions,
+        "assigned_to": rng.choice(operator_ids, size=n_actions),
+        "status": np.where(rng.random(n_actions) < 0.3, "open", "closed").tolist(),
+    }
+
+    metrics = ["safety", "quality", "delivery", "cost"]
+    values = [0.0, 95.0, 2000.0, 60.0]
+    tables["targets"] = {
+        "id": np.arange(1, scale.lines * len(metrics) + 1),
+        "line_id": np.repeat(line_ids, len(metrics)),
+        "metric_type": metrics * scale.lines,
+        "target_value": values * scale.lines,
+    }
+    return tables
+
+
+def _rows(columns: dict) -> list:
+    """Column arrays -> row tuples of native Python values."""
+    return list(zip(*(values.tolist() if isinstance(values, np.ndarray) else values for values in columns.values())))
+
+
+def clear(conn):
+    """Delete every row from the app tables (ids restart at 1)."""
+    import db
+
+    cur = conn.cursor()
+    if db.IS_LAKEBASE:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+    else:
+        for table in TABLES:
+            cur.execute(f"DELETE FROM {table}")
+        cur.execute("DELETE FROM sqlite_sequence")
+    conn.commit()
+
+
+def load(tables: dict, conn) -> dict:
+    """Bulk insert generated tables; returns row counts."""
+    import db
+
+    counts = {}
+    cur = conn.cursor()
+    # Parents first (reverse of the clearing order).
+    for table in reversed(TABLES):
+        if table not in tables:
+            continue
+        columns = tables[table]
+        names = ", ".join(columns)
+        rows = _rows(columns)
+        if db.IS_LAKEBASE:
+            with cur.copy(f"COPY {table} ({names}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+            # Explicit ids bypass the SERIAL sequence; move it past them.
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(MAX(id), 1)) FROM {table}")
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            cur.executemany(f"INSERT INTO {table} ({names}) VALUES ({placeholders})", rows)
+        counts[table] = len(rows)
+    if db.IS_LAKEBASE:
+        cur.execute("ANALYZE")
+    else:
+        conn.commit()
+        cur.execute("ANALYZE")
+    conn.commit()
+    return counts
+
+
+def build(scale: PlantScale, end: Optional[datetime] = None) -> dict:
+    """Migrate the configured database, replace its data with a synthetic plant, and time it."""
+    import db
+
+    db.init_db()
+    t0 = time.perf_counter()
+    tables = generate(scale, end)
+    generated = time.perf_counter()
+    conn = db.get_connection()
+    try:
+        if db.IS_LAKEBASE:
+            # One transaction for the whole load (pooled connections are in autocommit mode).
+            with conn.transaction():
+                clear(conn)
+                counts = load(tables, conn)
+        else:
+            clear(conn)
+            counts = load(tables, conn)
+    finally:
+        db.release_connection(conn)
+    loaded = time.perf_counter()
+    return {
+        "scale": scale._asdict(),
+        "rows": counts,
+        "generate_s": round(generated - t0, 2),
+        "load_s": round(loaded - generated, 2),
+    }
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    defaults = PlantScale()
+    for field in PlantScale._fields:
+        default = getattr(defaults, field)
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+
+
+def scale_from_args(args) -> PlantScale:
+    return PlantScale(**{field: getattr(args, field) for field in PlantScale._fields})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "postgres"])
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    use_scratch_database(args.backend)
+    summary = build(scale_from_args(args))
+    print(f"Generated in {summary['generate_s']} s, loaded in {summary['load_s']} s")
+    for table, count in summary["rows"].items():
+        print(f"    {table:<20} {count:>10,}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""
+Hot-path benchmark for db.py and the dashboard aggregations.
+
+Builds a synthetic plant (benchmarks.datagen) in a scratch database. It then times:
+- every db.py read helper;
+- the Supervisor, SQDC and Executive Summary aggregations, both from the shared event
+  store and from the database fallback;
+- event store cold and delta syncs;
+- the operator write helpers.
+
+Each benchmark reports min / median / p95 over N runs after warm-up. Results are written
+to JSON and compared with a stored baseline, where medians slower by more than the
+threshold are reported as regressions.
+
+    python -m benchmarks.db_hot_paths                              # SQLite, default scale
+    python -m benchmarks.db_hot_paths --backend postgres           # local Postgres (PG* env)
+    python -m benchmarks.db_hot_paths --days 730 --lines 8 --repeat 50
+    python -m benchmarks.db_hot_paths --save-baseline              # accept current numbers
+
+Exits non-zero when a baseline exists and any benchmark regressed.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.datagen import add_scale_arguments, build, scale_from_args, use_scratch_database
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+BASELINE_DIR = REPO_ROOT / "benchmarks" / "baselines"
+
+REPEAT = 20
+WARMUP = 2
+# A median counts as a regression only if it is this much slower *and* by at least NOISE_MS.
+DEFAULT_THRESHOLD = 0.20
+NOISE_MS = 0.5
+
+
+def _time(fn, repeat: int, warmup: int, setup=None) -> dict:
+    """Wall-clock timings (ms) of fn(); `setup` runs untimed before each call."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples = np.array(samples)
+    return {
+        "runs": repeat,
+        "min_ms": round(float(samples.min()), 3),
+        "median_ms": round(float(np.median(samples)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
+
+
+def _benchmarks(scale) -> dict:
+    """name -> (group, fn, setup); built after `use_scratch_database` so db sees the scratch config."""
+    import db
+    import event_store
+
+    now = datetime.now()
+    today = datetime.combine(now.date(), datetime.min.time())
+    today_end = datetime.combine(now.date(), datetime.max.time())
+    week_start = today - timedelta(days=6)
+    shift_start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=4)
+    shift_end = shift_start + timedelta(hours=8)
+    old_start = today - timedelta(days=min(scale.days - 1, 60))
+    old_end = old_start + timedelta(hours=8)
+    line_id, machine_id = 1, 1
+    line_ids = list(range(1, scale.lines + 1))
+
+    store = event_store.EventStore(event_store.EVENT_STORE_DAYS).sync(max_age=0)
+
+    def fresh_memo():
+        # Measure the aggregation itself, not the memo of a previous repeat.
+        store._memo = {}
+
+    def supervisor(events, start, end):
+        events.machine_summary(start, end, line_id)
+        events.downtime_pareto(start, end, line_id)
+        events.scrap_pareto(start, end, line_id)
+
+    def sqdc(start, end):
+        db.fetch_many({
+            "targets": (db.get_targets, line_id),
+            "safety": (db.get_safety_incidents, line_id, start.date().isoformat(), end.date().isoformat()),
+        })
+        store.line_totals(start, end)
+
+    def executive():
+        calls = {"operators": (db.get_operators,), "open_actions": (db.get_actions, "open")}
+        for lid in line_ids:
+            calls[("targets", lid)] = (db.get_targets, lid)
+            calls[("safety", lid)] = (db.get_safety_incidents, lid, today.date().isoformat(), today.date().isoformat())
+        db.fetch_many(calls)
+        store.line_totals(today, today_end)
+
+    def delta_sync():
+        db.log_production_count(machine_id, line_id, None, 1, 10)
+        store.sync(max_age=0)
+
+    def downtime_cycle():
+        event_id = db.create_downtime_event(machine_id, line_id, None, 1, 1, "bench")
+        db.close_downtime_event(event_id)
+
+    reads = {
+        "get_lines": (db.get_lines,),
+        "get_machines": (db.get_machines,),
+        "get_machines[line]": (db.get_machines, line_id),
+        "get_operators": (db.get_operators,),
+        "get_work_orders[line]": (db.get_work_orders, line_id),
+        "get_work_orders[line,status]": (db.get_work_orders, line_id, "Active"),
+        "get_downtime_reasons": (db.get_downtime_reasons,),
+        "get_quality_reasons": (db.get_quality_reasons,),
+        "get_targets": (db.get_targets, line_id),
+        "get_active_downtime_event": (db.get_active_downtime_event, machine_id),
+        "get_active_maintenance_events": (db.get_active_maintenance_events,),
+        "get_recent_downtime_events[machine]": (db.get_recent_downtime_events, 10, machine_id),
+        "get_recent_quality_events[machine]": (db.get_recent_quality_events, 10, machine_id),
+        "get_downtime_summary[today]": (db.get_downtime_summary, today.isoformat(), today_end.isoformat()),
+        "get_downtime_summary[week]": (db.get_downtime_summary, week_start.isoformat(), today_end.isoformat()),
+        "get_quality_summary[week]": (db.get_quality_summary, week_start.isoformat(), today_end.isoformat()),
+        "get_production_summary[week]": (db.get_production_summary, week_start.isoformat(), today_end.isoformat()),
+        "get_safety_incidents[week]": (db.get_safety_incidents, line_id, week_start.date().isoformat(), today.date().isoformat()),
+        "get_actions[open]": (db.get_actions, "open"),
+        "get_inspection_records": (db.get_inspection_records,),
+        "get_mrb_items": (db.get_mrb_items,),
+        "get_table_versions": (db.get_table_versions,),
+    }
+    benchmarks = {
+        f"read.{name}": ("read", (lambda call=call: call[0](*call[1:])), None)
+        for name, call in reads.items()
+    }
+    benchmarks.update({
+        "page.supervisor_shift[store]": ("page", lambda: supervisor(store, shift_start, shift_end), fresh_memo),
+        "page.supervisor_shift[db]": (
+            "page", lambda: supervisor(event_store.EventColumns.from_db(old_start, old_end), old_start, old_end), None,
+        ),
+        "page.sqdc_week": ("page", lambda: sqdc(week_start, today_end), fresh_memo),
+        "page.executive_today": ("page", executive, fresh_memo),
+        "store.cold_sync": ("store", lambda: event_store.EventStore(event_store.EVENT_STORE_DAYS).sync(max_age=0), None),
+        "store.delta_sync": ("store", delta_sync, None),
+        "write.downtime_start_close": ("write", downtime_cycle, None),
+        "write.log_quality_event": ("write", lambda: db.log_quality_event(machine_id, line_id, None, 1, 1, 2), None),
+        "write.log_production_count": ("write", lambda: db.log_production_count(machine_id, line_id, None, 1, 10), None),
+        "write.set_targets": (
+            "write", lambda: db.set_targets(line_id, {"safety": 0, "quality": 95, "delivery": 2000, "cost": 60}), None,
+        ),
+        "write.create_action": ("write", lambda: db.create_action(line_id, "Cost", "bench", 1), None),
+    })
+    return benchmarks
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    """Per-benchmark median ratio against the baseline, and the names that regressed."""
+    ratios, regressed = {}, []
+    base = baseline.get("results", {})
+    for name, result in results.items():
+        if name not in base:
+            continue
+        before, after = base[name]["median_ms"], result["median_ms"]
+        ratio = after / before if before else float("inf")
+        ratios[name] = round(ratio, 3)
+        if ratio > 1 + threshold and after - before > NOISE_MS:
+            regressed.append(name)
+    return {"ratios": ratios, "regressed": regressed, "threshold": threshold}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "postgres"])
+    add_scale_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--only", help="Run benchmarks whose name contains this text.")
+    parser.add_argument("--reuse", action="store_true", help="Keep the existing scratch data instead of regenerating.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed median slowdown (0.2 = 20%%).")
+    parser.add_argument("--baseline", help="Baseline JSON (default: benchmarks/baselines/db_hot_paths_<backend>.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write this run as the new baseline.")
+    parser.add_argument("--output", help="Result JSON (default: benchmarks/results/db_hot_paths_<backend>.json).")
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.backend)
+    scale = scale_from_args(args)
+    dataset = None if args.reuse else build(scale)
+
+    results = {}
+    for name, (group, fn, setup) in _benchmarks(scale).items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = dict(_time(fn, args.repeat, args.warmup, setup), group=group)
+        print(f"{name:<44} median {results[name]['median_ms']:>9.2f} ms   p95 {results[name]['p95_ms']:>9.2f} ms")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "scale": scale._asdict(),
+        "dataset": dataset,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIR / f"db_hot_paths_{args.backend}.json"
+    failed = False
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get("scale") != report["scale"]:
+            print(f"\nBaseline {baseline_path} was recorded at a different scale; comparison skipped.")
+        else:
+            report["comparison"] = compare(results, baseline, args.threshold)
+            print(f"\nAgainst {baseline_path.relative_to(REPO_ROOT) if baseline_path.is_relative_to(REPO_ROOT) else baseline_path}:")
+            for name, ratio in sorted(report["comparison"]["ratios"].items(), key=lambda item: item[1], reverse=True):
+                flag = "REGRESSED" if name in report["comparison"]["regressed"] else ""
+                print(f"    {name:<40} x{ratio:<7.2f} {flag}")
+            failed = bool(report["comparison"]["regressed"])
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"db_hot_paths_{args.backend}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline saved to {baseline_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
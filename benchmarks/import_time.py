@@ -0,0 +1,154 @@
+"""
+Cold-start import benchmark.
+
+Imports each app module in a fresh interpreter under `python -X importtime` and reports
+the cumulative import time, the heaviest dependencies, and any heavy optional SDK that
+was loaded although the operator path never uses it (e.g. psycopg on SQLite).
+
+    python -m benchmarks.import_time                       # SQLite, default modules
+    python -m benchmarks.import_time --backend lakebase    # Lakebase mode (drivers still lazy)
+    python -m benchmarks.import_time --budget-ms 800 --output benchmarks/results/import_time.json
+
+Exits non-zero when a module exceeds the budget or loads a forbidden SDK.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = ["config", "statements", "db", "event_store"]
+
+# SDKs that must only load on the pages / backends that use them.
+FORBIDDEN = [
+    "psycopg",
+    "psycopg_pool",
+    "psycopg2",
+    "databricks",
+    "aiosqlite",
+    "duckdb",
+    "openai",
+    "tavily",
+    "altair",
+]
+
+DEFAULT_BUDGET_MS = 1000.0
+TOP_N = 10
+REPEAT = 3
+
+
+def _parse_importtime(stderr: str) -> list:
+    """[(name, depth, self_us, cumulative_us)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, raw_name = parts
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        rows.append((raw_name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _direct_imports(rows: list, module: str):
+    """The target's own row and the rows it imported directly (depth 1 just before it)."""
+    for index in range(len(rows) - 1, -1, -1):
+        name, depth, _, _ = rows[index]
+        if name == module and depth == 0:
+            children = []
+            for child in reversed(rows[:index]):
+                if child[1] == 0:
+                    break
+                if child[1] == 1:
+                    children.append(child)
+            return rows[index], children
+    return None, []
+
+
+def _run_once(module: str, env: dict):
+    probe = (
+        f"import {module}; import sys, json; "
+        f"print(json.dumps([m for m in {FORBIDDEN!r} if m in sys.modules]))"
+    )
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def measure(module: str, backend: str, repeat: int = REPEAT) -> dict:
+    """Import `module` in fresh interpreters and summarise the fastest run."""
+    env = dict(os.environ, DB_BACKEND=backend)
+    # The first run compiles bytecode; measured runs then reflect a warm container restart.
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=REPO_ROOT, env=env, capture_output=True)
+
+    best = None
+    for _ in range(repeat):
+        proc = _run_once(module, env)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+            return {"module": module, "error": error}
+        target, children = _direct_imports(_parse_importtime(proc.stderr), module)
+        if target is not None and (best is None or target[3] < best[0][3]):
+            best = (target, children, proc.stdout)
+
+    target, children, stdout = best
+    heaviest = sorted(children, key=lambda r: r[3], reverse=True)[:TOP_N]
+    return {
+        "module": module,
+        "total_ms": round(target[3] / 1000.0, 1),
+        "self_ms": round(target[2] / 1000.0, 1),
+        "heaviest_ms": {name: round(cumulative / 1000.0, 1) for name, _, _, cumulative in heaviest},
+        "forbidden_loaded": json.loads(stdout.strip().splitlines()[-1]),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "lakebase"])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Report the fastest of N runs.")
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    args = parser.parse_args(argv)
+
+    results = [measure(module, args.backend, args.repeat) for module in args.modules]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "budget_ms": args.budget_ms,
+        "results": results,
+    }
+
+    failed = False
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<14} skipped ({result['error']})")
+            continue
+        over = result["total_ms"] > args.budget_ms
+        failed |= over or bool(result["forbidden_loaded"])
+        flag = "OVER BUDGET" if over else "ok"
+        print(f"{result['module']:<14} {result['total_ms']:>8.1f} ms  {flag}")
+        for name, ms in result["heaviest_ms"].items():
+            print(f"    {name:<30} {ms:>8.1f} ms")
+        if result["forbidden_loaded"]:
+            print(f"    loaded unused SDKs: {', '.join(result['forbidden_loaded'])}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
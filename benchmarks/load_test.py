@@ -0,0 +1,367 @@
+"""
+Concurrent load generator for the operator write paths.
+
+Simulates one app instance serving many screens at once. Every session is a thread,
+as Streamlit runs each session's script on its own thread, and calls the real db.py
+functions against a scratch database built by benchmarks.datagen:
+- operator tablets: one machine each, load the Operator Panel snapshot, then start / end
+  downtime or log scrap and good counts;
+- Maintenance View pollers: reload the active calls queue every --poll seconds, and
+  acknowledge and resolve downtime;
+- supervisors: load the Supervisor or SQDC dashboard every --dashboard-interval seconds.
+
+For each step of --tablets, the run reports throughput and p50 / p95 / p99 latency per
+operation, errors split into lock waits (SQLite "database is locked") and pool timeouts,
+and Lakebase pool saturation sampled during the run. A step is "sustained" if it had no
+errors and its write p95 is under --slo-ms.
+
+    python -m benchmarks.load_test --tablets 10,25,50 --duration 60
+    python -m benchmarks.load_test --backend postgres --tablets 25,50,100 --think 2
+    python -m benchmarks.load_test --tablets 60 --write-queue      # journaled operator writes
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.datagen import add_scale_arguments, build, scale_from_args, use_scratch_database
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+WRITE_OPS = (
+    "operator.start_downtime", "operator.end_downtime", "operator.log_scrap", "operator.log_good",
+    "maintenance.acknowledge", "maintenance.resolve",
+)
+
+
+class Recorder:
+    """Latency samples and errors per operation, shared by all session threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def run(self, op: str, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:  # noqa: BLE001 - every failure is a data point
+            with self._lock:
+                self.errors[op][_error_kind(e)] += 1
+            return None
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.samples[op].append(elapsed_ms)
+        return result
+
+
+def _error_kind(e: Exception) -> str:
+    message = str(e).lower()
+    if "locked" in message or "busy" in message:
+        return "lock_wait"
+    if type(e).__name__ == "PoolTimeout":
+        return "pool_timeout"
+    return type(e).__name__
+
+
+class PoolSampler(threading.Thread):
+    """Samples db.pool_stats() while the step runs (Lakebase only; SQLite has no pool)."""
+
+    def __init__(self, stop: threading.Event, interval: float = 0.25):
+        super().__init__(name="load-pool-sampler", daemon=True)
+        self.stop, self.interval = stop, interval
+        self.samples = []
+
+    def run(self):
+        from db import pool_stats
+
+        while not self.stop.wait(self.interval):
+            self.samples.extend(pool_stats())
+
+    def summary(self) -> dict:
+        pools = defaultdict(list)
+        for sample in self.samples:
+            pools[sample["pool"]].append(sample)
+        return {
+            name: {
+                "max_size": max(s["size"] for s in samples),
+                "min_idle": min(s["available"] for s in samples),
+                "max_waiting": max(s["waiting"] for s in samples),
+                # Share of samples with requests queued for a connection.
+                "saturated_pct": round(100 * sum(s["waiting"] > 0 for s in samples) / len(samples), 1),
+            }
+            for name, samples in pools.items()
+        }
+
+
+def _pause(stop: threading.Event, mean_s: float):
+    """Think time: exponential around mean_s, like independent operators."""
+    stop.wait(random.expovariate(1 / mean_s) if mean_s > 0 else 0)
+
+
+def operator_session(rec: Recorder, stop: threading.Event, machine: dict, reasons: dict, args):
+    import db
+    import write_queue
+
+    # With --write-queue, taps are journaled and replayed in the background, as on the panel.
+    writer = write_queue if args.write_queue else db
+    machine_id, line_id = machine["id"], machine["line_id"]
+
+    def page_load():
+        master = db.get_master_data()
+        started = time.time()
+        snapshot = db.get_panel_snapshot(machine_id)
+        if args.write_queue:
+            snapshot = write_queue.overlay(snapshot, write_queue.unsynced(machine_id, started), master)
+        return snapshot
+
+    def end_downtime(active):
+        if args.write_queue:
+            write_queue.close_downtime_event(machine_id, event_id=active["id"], client_event_id=active.get("client_event_id"))
+        else:
+            db.close_downtime_event(active["id"])
+
+    _pause(stop, args.think)
+    while not stop.is_set():
+        # Page load: master data (cached per process) plus the one-query machine snapshot.
+        snapshot = rec.run("operator.page_load", page_load)
+        active_downtime = snapshot["active_downtime"] if snapshot else None
+        roll = random.random()
+        if active_downtime:
+            if roll < 0.5:
+                rec.run("operator.end_downtime", end_downtime, active_downtime)
+        elif roll < 0.05:
+            rec.run(
+                "operator.start_downtime", writer.create_downtime_event,
+                machine_id, line_id, None, 1, random.choice(reasons["downtime"]), "load test",
+            )
+        elif roll < 0.30:
+            rec.run(
+                "operator.log_scrap", writer.log_quality_event,
+                machine_id, line_id, None, 1, random.choice(reasons["quality"]), random.randint(1, 3),
+            )
+        else:
+            rec.run("operator.log_good", writer.log_production_count, machine_id, line_id, None, 1, random.randint(5, 50))
+        _pause(stop, args.think)
+
+
+def maintenance_session(rec: Recorder, stop: threading.Event, args):
+    import pandas as pd
+
+    import db
+
+    _pause(stop, args.poll)
+    while not stop.is_set():
+        calls = rec.run("maintenance.poll", lambda: (db.get_operators(), db.get_active_maintenance_events())[1])
+        if calls is not None and not calls.empty:
+            row = calls.iloc[random.randrange(len(calls))]
+            if pd.isnull(row["acknowledged_at"]):
+                if random.random() < 0.3:
+                    rec.run("maintenance.acknowledge", db.acknowledge_downtime_event, int(row["id"]), 1)
+            elif random.random() < 0.2:
+                rec.run("maintenance.resolve", db.resolve_downtime_event, int(row["id"]), "load test")
+        stop.wait(args.poll)
+
+
+def supervisor_session(rec: Recorder, stop: threading.Event, store, line_ids: list, args):
+    import db
+
+    def supervisor():
+        line_id = random.choice(line_ids)
+        end = datetime.now()
+        start = end - timedelta(hours=8)
+        db.get_lines()
+        events = store.sync()
+        events.machine_summary(start, end, line_id)
+        events.downtime_pareto(start, end, line_id)
+        events.scrap_pareto(start, end, line_id)
+
+    def sqdc():
+        line_id = random.choice(line_ids)
+        end = datetime.now()
+        start = end - timedelta(days=7)
+        db.fetch_many({
+            "targets": (db.get_targets, line_id),
+            "safety": (db.get_safety_incidents, line_id, start.date().isoformat(), end.date().isoformat()),
+        })
+        store.sync().line_totals(start, end)
+
+    _pause(stop, args.dashboard_interval)
+    while not stop.is_set():
+        if random.random() < 0.5:
+            rec.run("supervisor.dashboard", supervisor)
+        else:
+            rec.run("supervisor.sqdc", sqdc)
+        stop.wait(args.dashboard_interval)
+
+
+def run_step(tablets: int, args, machines: list, line_ids: list, reasons: dict) -> dict:
+    import event_store
+    import query_stats
+
+    query_stats.reset()
+    # One store per step, shared by all sessions as get_event_store() is in the app.
+    store = event_store.EventStore(event_store.EVENT_STORE_DAYS).sync(max_age=0)
+    rec, stop = Recorder(), threading.Event()
+    sampler = PoolSampler(stop)
+    threads = [
+        threading.Thread(
+            target=operator_session, args=(rec, stop, machines[i % len(machines)], reasons, args),
+            name=f"operator-{i}", daemon=True,
+        )
+        for i in range(tablets)
+    ]
+    threads += [
+        threading.Thread(target=maintenance_session, args=(rec, stop, args), name=f"maintenance-{i}", daemon=True)
+        for i in range(args.maintenance)
+    ]
+    threads += [
+        threading.Thread(target=supervisor_session, args=(rec, stop, store, line_ids, args), name=f"supervisor-{i}", daemon=True)
+        for i in range(args.supervisors)
+    ]
+    sampler.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    drain_s = None
+    if args.write_queue:
+        import write_queue
+
+        # Time for the background worker to catch up once the taps stop.
+        drain_started = time.perf_counter()
+        write_queue.flush(timeout=300)
+        drain_s = round(time.perf_counter() - drain_started, 2)
+
+    ops = {}
+    for op in sorted(set(rec.samples) | set(rec.errors)):
+        samples = np.array(rec.samples.get(op, []))
+        errors = dict(rec.errors.get(op, {}))
+        ops[op] = {
+            "count": int(samples.size),
+            "per_s": round(samples.size / elapsed, 2),
+            "p50_ms": round(float(np.percentile(samples, 50)), 2) if samples.size else None,
+            "p95_ms": round(float(np.percentile(samples, 95)), 2) if samples.size else None,
+            "p99_ms": round(float(np.percentile(samples, 99)), 2) if samples.size else None,
+            "max_ms": round(float(samples.max()), 2) if samples.size else None,
+            "errors": errors,
+        }
+    writes = np.concatenate([rec.samples[op] for op in WRITE_OPS if rec.samples.get(op)] or [np.empty(0)])
+    error_counts = defaultdict(int)
+    for per_op in rec.errors.values():
+        for kind, count in per_op.items():
+            error_counts[kind] += count
+    write_p95 = round(float(np.percentile(writes, 95)), 2) if writes.size else None
+    acquire = [row["acquire_ms"] for row in query_stats.summary()]
+    return {
+        "tablets": tablets,
+        "maintenance": args.maintenance,
+        "supervisors": args.supervisors,
+        "seconds": round(elapsed, 1),
+        "ops_per_s": round(sum(op["count"] for op in ops.values()) / elapsed, 2),
+        "writes_per_s": round(writes.size / elapsed, 2),
+        "write_p95_ms": write_p95,
+        "errors": dict(error_counts),
+        "max_mean_acquire_ms": max(acquire, default=0.0),
+        "pools": sampler.summary(),
+        "queue_drain_s": drain_s,
+        "sustained": not error_counts and write_p95 is not None and write_p95 <= args.slo_ms,
+        "operations": ops,
+    }
+
+
+def _print_step(step: dict):
+    print(
+        f"\n{step['tablets']} tablets, {step['maintenance']} maintenance, {step['supervisors']} supervisors: "
+        f"{step['ops_per_s']} ops/s, {step['writes_per_s']} writes/s, write p95 {step['write_p95_ms']} ms, "
+        f"errors {step['errors'] or 0} -> {'OK' if step['sustained'] else 'NOT SUSTAINED'}"
+    )
+    for op, row in step["operations"].items():
+        errors = sum(row["errors"].values())
+        print(
+            f"    {op:<26} {row['count']:>7} ({row['per_s']:>7}/s)  p50 {row['p50_ms']!s:>8}  "
+            f"p95 {row['p95_ms']!s:>8}  p99 {row['p99_ms']!s:>8} ms  errors {errors}"
+        )
+    if step["queue_drain_s"] is not None:
+        print(f"    write queue drained {step['queue_drain_s']} s after the step")
+    for name, pool in step["pools"].items():
+        print(
+            f"    pool {name}: size<={pool['max_size']} idle>={pool['min_idle']} "
+            f"waiting<={pool['max_waiting']} saturated {pool['saturated_pct']}% of samples"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "postgres"])
+    add_scale_arguments(parser)
+    parser.add_argument("--tablets", default="10,25,50", help="Comma-separated operator tablet counts, one step each.")
+    parser.add_argument("--maintenance", type=int, default=2, help="Maintenance View pollers.")
+    parser.add_argument("--supervisors", type=int, default=2, help="Supervisors loading dashboards.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per step.")
+    parser.add_argument("--think", type=float, default=3.0, help="Mean operator think time in seconds.")
+    parser.add_argument("--poll", type=float, default=5.0, help="Maintenance View refresh interval in seconds.")
+    parser.add_argument("--dashboard-interval", type=float, default=10.0, help="Seconds between dashboard loads.")
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="Write p95 a sustained step must stay under.")
+    parser.add_argument("--write-queue", action="store_true", help="Send operator writes through write_queue.py.")
+    parser.add_argument("--reuse", action="store_true", help="Keep the existing scratch data instead of regenerating.")
+    parser.add_argument("--output", help="Result JSON (default: benchmarks/results/load_test_<backend>.json).")
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.backend)
+    scale = scale_from_args(args)
+    if not args.reuse:
+        build(scale)
+    random.seed(scale.seed)
+
+    import db
+
+    machines = db.get_machines()[["id", "line_id"]].to_dict("records")
+    line_ids = db.get_lines()["id"].tolist()
+    reasons = {
+        "downtime": db.get_downtime_reasons()["id"].tolist(),
+        "quality": db.get_quality_reasons()["id"].tolist(),
+    }
+
+    steps = []
+    for tablets in (int(value) for value in args.tablets.split(",")):
+        steps.append(run_step(tablets, args, machines, line_ids, reasons))
+        _print_step(steps[-1])
+
+    sustained = [step["tablets"] for step in steps if step["sustained"]]
+    print(f"\nHighest sustained step: {max(sustained) if sustained else 'none'} tablets")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_test_{args.backend}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "scale": scale._asdict(),
+        "settings": {
+            key: getattr(args, key)
+            for key in ("maintenance", "supervisors", "duration", "think", "poll", "dashboard_interval", "slo_ms", "write_queue")
+        },
+        "steps": steps,
+    }
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+OEE grid benchmark.
+
+Times oee.compute() on synthetic in-memory event columns (no database): by default 1000
+machines x 365 days of hourly buckets, then the line rollup and daily resample a
+dashboard or backfill would do on top.
+
+    python -m benchmarks.oee_grid                          # 1000 machines, 1 year, 1h buckets
+    python -m benchmarks.oee_grid --machines 200 --days 90 --freq 15min
+
+Exits non-zero when the full compute takes longer than --budget-s.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+DEFAULT_BUDGET_S = 10.0
+
+
+def _events(machines: int, days: int, start: datetime, seed: int) -> SimpleNamespace:
+    """Event columns shaped like event_store.EventColumns: ~8 stops, ~40 counts, ~4 scrap logs per machine-day."""
+    rng = np.random.default_rng(seed)
+    origin = np.datetime64(start, "ms")
+    span_ms = days * 86_400_000
+
+    def stamps(per_day):
+        n = machines * days * per_day
+        ts = origin + np.sort(rng.integers(0, span_ms, size=n)).astype("timedelta64[ms]")
+        return rng.integers(1, machines + 1, size=n).astype(np.int32), ts
+
+    machine_id, start_time = stamps(8)
+    duration = np.maximum(rng.exponential(12 * 60_000, size=start_time.size), 30_000).astype("timedelta64[ms]")
+    downtime = {
+        "machine_id": machine_id,
+        "reason_id": rng.integers(1, 9, size=start_time.size).astype(np.int32),
+        "start_time": start_time,
+        "end_time": start_time + duration,
+    }
+    machine_id, ts = stamps(40)
+    production = {
+        "machine_id": machine_id,
+        "work_order_id": rng.integers(-1, 50, size=ts.size).astype(np.int32),
+        "good_quantity": rng.integers(5, 60, size=ts.size),
+        "timestamp": ts,
+    }
+    machine_id, ts = stamps(4)
+    quality = {
+        "machine_id": machine_id,
+        "work_order_id": rng.integers(-1, 50, size=ts.size).astype(np.int32),
+        "quantity": rng.integers(1, 10, size=ts.size),
+        "timestamp": ts,
+    }
+    return SimpleNamespace(downtime=downtime, production=production, quality=quality)
+
+
+def main(argv=None) -> int:
+    import oee
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--freq", default="1h", help="Bucket size (pandas offset alias).")
+    parser.add_argument("--lines", type=int, default=50, help="Lines for the rollup step.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget-s", type=float, default=DEFAULT_BUDGET_S)
+    parser.add_argument("--output", help="Result JSON (default: benchmarks/results/oee_grid.json).")
+    args = parser.parse_args(argv)
+
+    start = datetime.combine(datetime.now().date() - timedelta(days=args.days), datetime.min.time())
+    end = start + timedelta(days=args.days)
+    events = _events(args.machines, args.days, start, args.seed)
+    machine_ids = np.arange(1, args.machines + 1)
+    standards = oee.Standards(
+        machine_cycle={int(m): 40.0 + 2 * (m % 7) for m in machine_ids},
+        work_order_cycle={wo: 36.0 for wo in range(0, 50, 5)},
+        planned_reason_ids=frozenset({6, 7, 8}),
+    )
+    edges = oee.bucket_edges(start, end, args.freq)
+    n_events = sum(len(cols["machine_id"]) for cols in (events.downtime, events.production, events.quality))
+    print(f"{args.machines} machines x {edges.size - 1} buckets, {n_events:,} events")
+
+    timings = {}
+    t0 = time.perf_counter()
+    grid = oee.compute(events, machine_ids, edges, standards, now=end)
+    timings["compute_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lines = grid.rollup(groups=(machine_ids - 1) % args.lines)
+    daily = lines.resample(max(1, round(86400 / ((edges[1] - edges[0]) / np.timedelta64(1, "s")))))
+    plant = daily.rollup()
+    timings["rollup_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    daily.to_frame("line_id")
+    timings["to_frame_s"] = time.perf_counter() - t0
+
+    for name, seconds in timings.items():
+        print(f"{name:<12} {seconds:8.2f} s")
+    print(f"plant OEE over the period: {float(plant.resample(plant.bucket_min.shape[1]).oee[0, 0]):.1%}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machines": args.machines,
+        "buckets": int(edges.size - 1),
+        "events": n_events,
+        "timings_s": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "budget_s": args.budget_s,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / "oee_grid.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    if timings["compute_s"] > args.budget_s:
+        print(f"compute took longer than the {args.budget_s:g} s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
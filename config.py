@@ -10,6 +10,14 @@ SHIFTS = {
     "Shift 3": {"start": "22:00", "end": "06:00"},
 }
 
+# Shift Calendar
+# SHIFTS (minus "All Day") is the plant calendar. Shifts run on SHIFT_WORKDAYS (0 = Monday) except
+# HOLIDAYS (comma-separated ISO dates). LINE_CALENDARS_PATH may point to a JSON file of per-line
+# overrides: {"<line_id>": {"shifts": {...}, "workdays": [0, 1, 2, 3, 4], "holidays": ["2026-12-25"]}}.
+SHIFT_WORKDAYS = [int(day) for day in os.getenv("SHIFT_WORKDAYS", "0,1,2,3,4,5,6").split(",") if day.strip()]
+HOLIDAYS = [day.strip() for day in os.getenv("HOLIDAYS", "").split(",") if day.strip()]
+LINE_CALENDARS_PATH = os.getenv("LINE_CALENDARS_PATH", "")
+
 # Database Settings
 # Default to SQLite for local/dev; switch to Lakebase via env.
 DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").lower()
@@ -24,6 +32,123 @@ PG_USER = os.getenv("PGUSER")
 PG_PASSWORD = os.getenv("PGPASSWORD")
 PG_SSLMODE = os.getenv("PGSSLMODE", "require")
 PG_APPNAME = os.getenv("PGAPPNAME", "andon-app")
+# "oauth" (Lakebase, token from databricks-sdk) or "password" (PGPASSWORD; plain local Postgres,
+# e.g. for benchmarks with PGSSLMODE=disable).
+PG_AUTH = os.getenv("PG_AUTH", "oauth").lower()
+# Pooled psycopg 3 connections per endpoint; keep it above DB_READ_WORKERS.
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "10"))
+# A statement is prepared server-side after this many executions on one pooled connection.
+PG_PREPARE_THRESHOLD = int(os.getenv("PG_PREPARE_THRESHOLD", "2"))
+
+# Read Routing
+# Heavy, staleness-tolerant reads (historical windows, Lean Assistant SQL, exports) can be sent to a
+# Lakebase read replica (PGREADHOST) or, on SQLite, to a snapshot copy refreshed with the online
+# backup API (SQLITE_SNAPSHOT_NAME). Writes and read-your-writes paths always use the primary.
+PG_READ_HOST = os.getenv("PGREADHOST")
+SQLITE_SNAPSHOT_NAME = os.getenv("SQLITE_SNAPSHOT_NAME")
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+
+# Independent page reads are fanned out over this many worker threads (one connection each).
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "8"))
+
+# Connections per event loop for the async API in db_async.py.
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+
+# Operator Write Queue
+# Operator Panel writes are journaled to this local SQLite file and acknowledged at once; a
+# background worker replays them to the main database in batches of WRITE_QUEUE_BATCH.
+# Entries failing WRITE_QUEUE_MAX_ATTEMPTS times (e.g. constraint errors) are parked as failed.
+# Set WRITE_QUEUE_PATH empty to write directly.
+WRITE_QUEUE_PATH = os.getenv("WRITE_QUEUE_PATH", "andon_queue.db")
+WRITE_QUEUE_BATCH = int(os.getenv("WRITE_QUEUE_BATCH", "100"))
+WRITE_QUEUE_MAX_ATTEMPTS = int(os.getenv("WRITE_QUEUE_MAX_ATTEMPTS", "5"))
+
+# Query Instrumentation
+# Per-query timings, row counts and callers (Admin > Query Stats). Calls slower than
+# QUERY_SLOW_MS go to a bounded slow-query log with an EXPLAIN plan.
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() in ("1", "true", "yes")
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "250"))
+QUERY_SLOW_LOG_SIZE = int(os.getenv("QUERY_SLOW_LOG_SIZE", "200"))
+
+# Page Profiling
+# Opt-in per-page render profiler (also enabled per session with ?profile=1). Runs are kept
+# in a rolling window per page and summarized to PAGE_PROFILE_REPORT; pages whose p95 run
+# time exceeds PAGE_BUDGET_MS are flagged.
+PAGE_PROFILING = os.getenv("PAGE_PROFILING", "false").lower() in ("1", "true", "yes")
+PAGE_BUDGET_MS = float(os.getenv("PAGE_BUDGET_MS", "1000"))
+PAGE_PROFILE_WINDOW = int(os.getenv("PAGE_PROFILE_WINDOW", "200"))
+PAGE_PROFILE_REPORT = os.getenv("PAGE_PROFILE_REPORT", ".cache/page_profile.json")
+
+# DataFrame Settings
+# Store remaining text columns of _read_df results as Arrow-backed strings (needs pyarrow).
+DF_ARROW_STRINGS = os.getenv("DF_ARROW_STRINGS", "false").lower() in ("1", "true", "yes")
+
+# Master Data Cache
+# Lines, machines, operators and reason codes for the Operator Panel are read once per process
+# and reused for this long; adding them through db.py in the same process reloads them at once.
+MASTER_DATA_TTL_SECONDS = float(os.getenv("MASTER_DATA_TTL_SECONDS", "60"))
+
+# Andon Board
+# Every machine's RUNNING / DOWN state is read with one query per process at most this often,
+# however many floor screens are watching; screens pick up the shared copy on the same cadence.
+ANDON_BOARD_REFRESH_SECONDS = float(os.getenv("ANDON_BOARD_REFRESH_SECONDS", "5"))
+
+# Maintenance View
+# The queue of open calls is re-read this often while auto-refresh is on (a fragment rerun,
+# not the whole page); downtime timers tick in the browser in between.
+MAINTENANCE_REFRESH_SECONDS = float(os.getenv("MAINTENANCE_REFRESH_SECONDS", "15"))
+
+# SQDC Board Snapshots
+# Each line's SQDC state (today and last 7 days) is recomputed this often by one background
+# thread and shared by all board viewers (0 computes on every read). When SQDC_EXPORT_DIR is
+# set, the snapshot is also written there as static HTML for floor TVs; the default lives under
+# Streamlit's static folder (served at /app/static/sqdc/ with server.enableStaticServing).
+SQDC_SNAPSHOT_SECONDS = float(os.getenv("SQDC_SNAPSHOT_SECONDS", "60"))
+SQDC_EXPORT_DIR = os.getenv("SQDC_EXPORT_DIR", "static/sqdc")
+
+# Reports
+# Trend charts are aggregated server-side into at most REPORTS_SOURCE_BUCKETS time buckets per
+# series (the finest resolution that fits the range), then line series are downsampled with
+# LTTB so each chart sends at most REPORTS_MAX_POINTS points; stacked bars get REPORTS_MAX_BARS.
+# Events loaded for a range are reused for REPORTS_CACHE_SECONDS.
+REPORTS_SOURCE_BUCKETS = int(os.getenv("REPORTS_SOURCE_BUCKETS", "10000"))
+REPORTS_MAX_POINTS = int(os.getenv("REPORTS_MAX_POINTS", "2000"))
+REPORTS_MAX_BARS = int(os.getenv("REPORTS_MAX_BARS", "60"))
+REPORTS_CACHE_SECONDS = float(os.getenv("REPORTS_CACHE_SECONDS", "300"))
+
+# Machine Timeline
+# Downtime stops shorter than one of TIMELINE_COLUMNS slices of the window are drawn as
+# per-slice "Short stops" marks; longer ones (merged per machine and category) as their own
+# bars. The slice widens until the chart has at most TIMELINE_MAX_MARKS marks.
+TIMELINE_COLUMNS = int(os.getenv("TIMELINE_COLUMNS", "240"))
+TIMELINE_MAX_MARKS = int(os.getenv("TIMELINE_MAX_MARKS", "3000"))
+
+# Event Store Settings
+# Recent downtime / quality / production events are held in memory, shared by all sessions.
+EVENT_STORE_DAYS = int(os.getenv("EVENT_STORE_DAYS", "14"))
+EVENT_STORE_REFRESH_SECONDS = float(os.getenv("EVENT_STORE_REFRESH_SECONDS", "5"))
+# Each delta fetch re-reads this many ids below the watermark: Postgres hands out ids before
+# commit, so a row can become visible after a higher id has already been synced.
+EVENT_STORE_ID_OVERLAP = int(os.getenv("EVENT_STORE_ID_OVERLAP", "500"))
+# The store is snapshotted here (Arrow IPC, needs pyarrow) so restarts start warm; empty disables.
+WARM_CACHE_DIR = os.getenv("WARM_CACHE_DIR", ".cache")
+WARM_CACHE_SNAPSHOT_SECONDS = float(os.getenv("WARM_CACHE_SNAPSHOT_SECONDS", "300"))
+
+# Analytics Settings
+# Optional DuckDB engine that loads windows older than the event store (Reports, Supervisor).
+# It attaches the database read-only (or reads a Parquet archive when ANALYTICS_PARQUET_DIR is
+# set); without duckdb or its extension those windows are read from the database directly.
+ANALYTICS_PARQUET_DIR = os.getenv("ANALYTICS_PARQUET_DIR")
+ANALYTICS_THREADS = int(os.getenv("ANALYTICS_THREADS", "4"))
+
+# Metrics Endpoint
+# Prometheus text format at http://<host>:METRICS_PORT/metrics, started with the event store.
+# KPI gauges are recomputed at most every METRICS_KPI_SECONDS. Set METRICS_PORT=0 to disable.
+# The endpoint has no authentication, so it listens on localhost only; set METRICS_HOST=0.0.0.0
+# (or one interface address) to let a Prometheus on another host scrape it.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108") or 0)
+METRICS_KPI_SECONDS = float(os.getenv("METRICS_KPI_SECONDS", "15"))
 
 # Grafana Configuration (Default)
 GRAFANA_URL = "http://localhost:3000"
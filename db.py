@@ -1,102 +1,296 @@
+import json
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Iterable, Optional
+from typing import Any, Iterable, Optional, Union
 
 import pandas as pd
 
 from config import (
+    ANDON_BOARD_REFRESH_SECONDS,
     ANDON_SCHEMA,
     DB_BACKEND,
     DB_NAME,
+    DB_READ_WORKERS,
+    DF_ARROW_STRINGS,
+    MASTER_DATA_TTL_SECONDS,
     PG_APPNAME,
+    PG_AUTH,
     PG_DATABASE,
     PG_HOST,
+    PG_PASSWORD,
+    PG_POOL_SIZE,
     PG_PORT,
+    PG_PREPARE_THRESHOLD,
+    PG_READ_HOST,
     PG_SSLMODE,
     PG_USER,
+    SNAPSHOT_REFRESH_SECONDS,
+    SQLITE_SNAPSHOT_NAME,
 )
+import query_stats
+from statements import Compiled, Statement, compile_adhoc, register
 
-# Optional import for Lakebase (PostgreSQL)
-try:
-    import psycopg2
-    import psycopg2.extras
-except ImportError:  # pragma: no cover - handled at runtime if missing
-    psycopg2 = None
-
-# Optional import for Databricks SDK (used for token-based Lakebase auth)
-try:
-    from databricks.sdk import WorkspaceClient
-except ImportError:  # pragma: no cover
-    WorkspaceClient = None
+# Lakebase drivers (psycopg 3, psycopg_pool, databricks-sdk) are imported on first use
+# inside the functions below, so SQLite deployments and cold starts never load them.
 
 DB_PATH = Path(DB_NAME)
+SNAPSHOT_PATH = Path(SQLITE_SNAPSHOT_NAME) if SQLITE_SNAPSHOT_NAME else None
 IS_LAKEBASE = DB_BACKEND == "lakebase"
+DIALECT = "postgres" if IS_LAKEBASE else "sqlite"
+
+# A helper's SQL: a registered Statement, one compiled variant of it, or a one-off string.
+Query = Union[str, Statement, Compiled]
+
+
+# Lakebase OAuth tokens expire after an hour; recycle pooled connections before that.
+_LAKEBASE_MAX_LIFETIME = 45 * 60
 
 
-def _cursor_factory():
-    if IS_LAKEBASE and psycopg2:
-        return psycopg2.extras.RealDictCursor
-    return None
+@lru_cache(maxsize=None)
+def _require_psycopg():
+    """Import psycopg 3 and psycopg_pool (once) for the Lakebase path."""
+    try:
+        import psycopg
+        import psycopg_pool
+    except ImportError as e:  # pragma: no cover - handled at runtime if missing
+        raise RuntimeError("psycopg[binary] and psycopg-pool are required for Lakebase support.") from e
+    return psycopg, psycopg_pool
+
+
+def _cursor_kwargs() -> dict:
+    """Dict rows on Lakebase (sqlite3.Row already supports row["col"])."""
+    if IS_LAKEBASE:
+        from psycopg.rows import dict_row
+
+        return {"row_factory": dict_row}
+    return {}
 
 
 def _lakebase_password():
     """
     Resolve password for Lakebase using Databricks OAuth token.
-    PGPASSWORD is intentionally not used; we rely on token auth.
+    PGPASSWORD is only used with PG_AUTH=password (a plain Postgres, not Lakebase).
     """
-    if WorkspaceClient is None:
-        raise RuntimeError("databricks-sdk is required for Lakebase token authentication.")
+    if PG_AUTH == "password":
+        return PG_PASSWORD
+    try:
+        from databricks.sdk import WorkspaceClient
+    except ImportError as e:  # pragma: no cover
+        raise RuntimeError("databricks-sdk is required for Lakebase token authentication.") from e
     client = WorkspaceClient()
     return client.config.oauth_token().access_token
 
 
-def _ensure_schema(conn):
+def _ensure_schema(conn, create: bool = True):
     """Create and set search_path to the configured schema for Lakebase."""
     if not IS_LAKEBASE or not ANDON_SCHEMA:
         return
     with conn.cursor() as cur:
-        cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{ANDON_SCHEMA}"')
+        if create:
+            cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{ANDON_SCHEMA}"')
         cur.execute(f'SET search_path TO "{ANDON_SCHEMA}"')
 
 
+@lru_cache(maxsize=None)
+def _lakebase_connection_class():
+    psycopg, _ = _require_psycopg()
+
+    class _LakebaseConnection(psycopg.Connection):
+        """Fetches a fresh OAuth token for every new physical connection."""
+
+        @classmethod
+        def connect(cls, conninfo: str = "", **kwargs):
+            kwargs["password"] = _lakebase_password()
+            return super().connect(conninfo, **kwargs)
+
+    return _LakebaseConnection
+
+
+_pg_pools = {}
+_pg_pools_lock = threading.Lock()
+
+
+def _lakebase_pool(host: str, readonly: bool = False):
+    """
+    Process-wide psycopg 3 pool per endpoint. Connections are reused across calls, so
+    statements run more than PG_PREPARE_THRESHOLD times are prepared server-side once.
+    """
+    _, psycopg_pool = _require_psycopg()
+    required = {
+        "PGHOST": host,
+        "PGPORT": PG_PORT,
+        "PGDATABASE": PG_DATABASE,
+        "PGUSER": PG_USER,
+    }
+    missing = [name for name, value in required.items() if not value]
+    if missing:
+        raise RuntimeError(f"Missing Lakebase environment variables: {', '.join(missing)}")
+
+    with _pg_pools_lock:
+        pool = _pg_pools.get((host, readonly))
+        if pool is None:
+            def configure(conn):
+                # Autocommit: single statements need no BEGIN/COMMIT round trips;
+                # multi-statement writes use conn.transaction() explicitly.
+                conn.autocommit = True
+                conn.prepare_threshold = PG_PREPARE_THRESHOLD
+                # A replica cannot run CREATE SCHEMA; it only needs the search_path.
+                _ensure_schema(conn, create=not readonly)
+
+            pool = psycopg_pool.ConnectionPool(
+                kwargs={
+                    "host": host,
+                    "port": PG_PORT,
+                    "dbname": PG_DATABASE,
+                    "user": PG_USER,
+                    "sslmode": PG_SSLMODE,
+                    "application_name": PG_APPNAME,
+                    "options": "-c default_transaction_read_only=on" if readonly else None,
+                },
+                connection_class=_lakebase_connection_class(),
+                configure=configure,
+                min_size=1,
+                max_size=PG_POOL_SIZE,
+                max_lifetime=_LAKEBASE_MAX_LIFETIME,
+                name=f"andon-{'read' if readonly else 'primary'}",
+            )
+            _pg_pools[(host, readonly)] = pool
+    return pool
+
+
+def pool_stats() -> list:
+    """Usage of each Lakebase pool (empty on SQLite, which opens a connection per call)."""
+    with _pg_pools_lock:
+        pools = list(_pg_pools.items())
+    stats = []
+    for (host, readonly), pool in pools:
+        raw = pool.get_stats()
+        stats.append({
+            "pool": pool.name,
+            "size": raw.get("pool_size", 0),
+            "available": raw.get("pool_available", 0),
+            "waiting": raw.get("requests_waiting", 0),
+        })
+    return stats
+
+
+def _checkout(host: str, readonly: bool = False):
+    pool = _lakebase_pool(host, readonly)
+    conn = pool.getconn()
+    conn.andon_pool = pool
+    return conn
+
+
 def get_connection():
-    """Establishes a connection to the configured database."""
+    """
+    Establishes a connection to the configured (primary) database.
+    Hand it back with release_connection(conn) so Lakebase connections return to the pool.
+    """
     if IS_LAKEBASE:
-        if psycopg2 is None:
-            raise RuntimeError("psycopg2-binary is required for Lakebase support.")
-        required = {
-            "PGHOST": PG_HOST,
-            "PGPORT": PG_PORT,
-            "PGDATABASE": PG_DATABASE,
-            "PGUSER": PG_USER,
-        }
-        missing = [name for name, value in required.items() if not value]
-        if missing:
-            raise RuntimeError(f"Missing Lakebase environment variables: {', '.join(missing)}")
-        password = _lakebase_password()
-        conn = psycopg2.connect(
-            host=PG_HOST,
-            port=PG_PORT,
-            dbname=PG_DATABASE,
-            user=PG_USER,
-            password=password,
-            sslmode=PG_SSLMODE,
-            application_name=PG_APPNAME,
-        )
-        _ensure_schema(conn)
-        return conn
+        return _checkout(PG_HOST)
 
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def _prepare_query(query: str) -> str:
-    """Adjust placeholder style for the active backend."""
+def release_connection(conn):
+    """Return a Lakebase connection to its pool; close a SQLite connection."""
     if IS_LAKEBASE:
-        return query.replace("?", "%s")
-    return query
+        conn.andon_pool.putconn(conn)
+    else:
+        conn.close()
+
+
+def _pipeline(conn):
+    """
+    Pipeline mode on Lakebase: statements issued inside the block are sent without
+    waiting for each result, so a sequence costs about one network round trip.
+    """
+    if IS_LAKEBASE:
+        return conn.pipeline()
+    return nullcontext()
+
+
+_snapshot_lock = threading.Lock()
+_snapshot_taken_at = 0.0
+_snapshot_refreshing = False
+
+
+def _take_snapshot():
+    """Copy the primary SQLite file to SNAPSHOT_PATH with the online backup API."""
+    global _snapshot_taken_at, _snapshot_refreshing
+    try:
+        tmp_path = SNAPSHOT_PATH.with_name(SNAPSHOT_PATH.name + ".tmp")
+        src = sqlite3.connect(DB_PATH)
+        dst = sqlite3.connect(tmp_path)
+        # Copy in chunks so operator writes can interleave with the backup.
+        src.backup(dst, pages=256)
+        # The snapshot is opened read-only, which needs a rollback journal rather than WAL.
+        dst.execute("PRAGMA journal_mode=DELETE")
+        dst.close()
+        src.close()
+        os.replace(tmp_path, SNAPSHOT_PATH)
+        _snapshot_taken_at = time.monotonic()
+    finally:
+        _snapshot_refreshing = False
+
+
+def _refresh_snapshot():
+    """Take the first snapshot synchronously; refresh stale ones in the background."""
+    global _snapshot_refreshing
+    with _snapshot_lock:
+        if not SNAPSHOT_PATH.exists():
+            _snapshot_refreshing = True
+            _take_snapshot()
+            return
+        stale = time.monotonic() - _snapshot_taken_at > SNAPSHOT_REFRESH_SECONDS
+        if stale and not _snapshot_refreshing:
+            _snapshot_refreshing = True
+            threading.Thread(target=_take_snapshot, name="andon-snapshot", daemon=True).start()
+
+
+def get_read_connection():
+    """
+    Connection for heavy reads that tolerate slight staleness: the Lakebase read replica
+    or the SQLite snapshot when configured, otherwise the primary.
+    """
+    if IS_LAKEBASE:
+        return _checkout(PG_READ_HOST, readonly=True) if PG_READ_HOST else get_connection()
+    if SNAPSHOT_PATH is None:
+        return get_connection()
+    _refresh_snapshot()
+    conn = sqlite3.connect(f"file:{SNAPSHOT_PATH.resolve().as_posix()}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _prepare_query(query: Query) -> str:
+    """Query text for the active backend; every form is translated once and cached."""
+    if isinstance(query, Statement):
+        return query.compile(DIALECT).sql
+    if isinstance(query, Compiled):
+        return query.sql
+    return compile_adhoc(query, DIALECT)
+
+
+def _bind(statement: Statement, **filters):
+    """(compiled variant, filter params) for the filters that have values."""
+    return statement.bind(DIALECT, **filters)
+
+
+def _execute_options(query: Query) -> dict:
+    """Registered statements are prepared server-side on first use on Lakebase."""
+    if IS_LAKEBASE and not isinstance(query, str):
+        return {"prepare": True}
+    return {}
 
 
 def _normalize_params(params: Optional[Iterable[Any]]) -> list:
@@ -114,144 +308,236 @@ def _normalize_params(params: Optional[Iterable[Any]]) -> list:
     return normalized
 
 
-def _read_df(query: str, params: Optional[Iterable[Any]] = None) -> pd.DataFrame:
-    conn = get_connection()
-    sql = _prepare_query(query)
-    df = pd.read_sql(sql, conn, params=_normalize_params(params))
-    conn.close()
+# Column types applied to every _read_df result. Helpers select columns explicitly,
+# so these names are the schema of what reaches the dashboards.
+_ID_COLUMNS = {
+    "id", "line_id", "machine_id", "work_order_id", "operator_id", "reason_id",
+    "technician_id", "inspector_id", "quality_event_id", "assigned_to",
+}
+_TIMESTAMP_COLUMNS = {
+    "start_time", "end_time", "acknowledged_at", "timestamp",
+    "created_at", "updated_at", "start_date", "completed_date",
+}
+_CATEGORY_COLUMNS = {
+    "line_name", "machine_name", "operator_name", "technician_name", "inspector_name",
+    "assignee_name", "reason_code", "reason_description", "category",
+}
+
+
+def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert driver output (object columns) into compact, typed columns."""
+    for col in df.columns:
+        if col in _ID_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int32")
+        elif col in _TIMESTAMP_COLUMNS:
+            df[col] = pd.to_datetime(df[col], format="ISO8601", errors="coerce")
+        elif col in _CATEGORY_COLUMNS:
+            df[col] = df[col].astype("category")
+        elif DF_ARROW_STRINGS and df[col].dtype == object:
+            df[col] = df[col].astype("string[pyarrow]")
     return df
 
 
-def _fetch_one(query: str, params: Optional[Iterable[Any]] = None):
-    conn = get_connection()
-    cursor_kwargs = {}
-    factory = _cursor_factory()
-    if factory:
-        cursor_kwargs["cursor_factory"] = factory
-    cur = conn.cursor(**cursor_kwargs)
-    cur.execute(_prepare_query(query), _normalize_params(params))
-    row = cur.fetchone()
-    conn.close()
-    return row
+def _read_df(query: Query, params: Optional[Iterable[Any]] = None, readonly: bool = False) -> pd.DataFrame:
+    """Run a SELECT into a typed DataFrame; readonly=True routes it to the read endpoint."""
+    sql = _prepare_query(query)
+    params = _normalize_params(params)
+    with query_stats.probe(query, sql, params) as probe:
+        conn = get_read_connection() if readonly else get_connection()
+        probe.acquired()
+        try:
+            df = pd.read_sql(sql, conn, params=params)
+        finally:
+            release_connection(conn)
+        probe.rows = len(df)
+    return _coerce_types(df)
 
 
-def _execute(query: str, params: Optional[Iterable[Any]] = None):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(_prepare_query(query), _normalize_params(params))
-    conn.commit()
-    conn.close()
+def _fetch_one(query: Query, params: Optional[Iterable[Any]] = None):
+    sql = _prepare_query(query)
+    params = _normalize_params(params)
+    with query_stats.probe(query, sql, params) as probe:
+        conn = get_connection()
+        probe.acquired()
+        try:
+            cur = conn.cursor(**_cursor_kwargs())
+            cur.execute(sql, params, **_execute_options(query))
+            row = cur.fetchone()
+        finally:
+            release_connection(conn)
+        probe.rows = int(row is not None)
+    return row
 
 
-def _execute_returning_id(query: str, params: Optional[Iterable[Any]] = None) -> Any:
-    conn = get_connection()
-    cursor_kwargs = {}
-    factory = _cursor_factory()
-    if factory:
-        cursor_kwargs["cursor_factory"] = factory
-    cur = conn.cursor(**cursor_kwargs)
+def _execute(query: Query, params: Optional[Iterable[Any]] = None):
+    sql = _prepare_query(query)
+    params = _normalize_params(params)
+    with query_stats.probe(query, sql, params) as probe:
+        conn = get_connection()
+        probe.acquired()
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params, **_execute_options(query))
+            conn.commit()
+            probe.rows = max(cur.rowcount, 0)
+        finally:
+            release_connection(conn)
 
+
+def _execute_returning_id(query: Query, params: Optional[Iterable[Any]] = None) -> Any:
     sql = _prepare_query(query)
     if IS_LAKEBASE and "returning" not in sql.lower():
         sql = sql.rstrip().rstrip(";") + " RETURNING id"
+    params = _normalize_params(params)
 
-    cur.execute(sql, _normalize_params(params))
-    if IS_LAKEBASE:
-        row = cur.fetchone()
-        if isinstance(row, dict):
-            new_id = row.get("id") or list(row.values())[0]
-        else:
-            new_id = row[0]
-    else:
-        new_id = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with query_stats.probe(query, sql, params) as probe:
+        conn = get_connection()
+        probe.acquired()
+        try:
+            cur = conn.cursor(**_cursor_kwargs())
+            cur.execute(sql, params, **_execute_options(query))
+            if IS_LAKEBASE:
+                row = cur.fetchone()
+                new_id = row.get("id") or list(row.values())[0]
+            else:
+                new_id = cur.lastrowid
+            conn.commit()
+        finally:
+            release_connection(conn)
+        probe.rows = 1
     return new_id
 
 
-def _executemany(query: str, seq_of_params: Iterable[Iterable[Any]]):
-    conn = get_connection()
-    cur = conn.cursor()
+def _executemany(query: Query, seq_of_params: Iterable[Iterable[Any]]):
+    """Batch one statement over many rows; psycopg 3 pipelines these into one flight."""
+    sql = _prepare_query(query)
     normalized = [_normalize_params(params) for params in seq_of_params]
-    cur.executemany(_prepare_query(query), normalized)
-    conn.commit()
-    conn.close()
+    # The first row stands in for the batch in the slow-query log and its EXPLAIN.
+    with query_stats.probe(query, sql, normalized[0] if normalized else []) as probe:
+        conn = get_connection()
+        probe.acquired()
+        try:
+            cur = conn.cursor()
+            cur.executemany(sql, normalized)
+            conn.commit()
+        finally:
+            release_connection(conn)
+        probe.rows = len(normalized)
+
+
+def _explain(sql: str, params: list) -> str:
+    """Query plan for the slow-query log (EXPLAIN does not run the statement)."""
+    prefix = "EXPLAIN " if IS_LAKEBASE else "EXPLAIN QUERY PLAN "
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(prefix + sql, params)
+        rows = cur.fetchall()
+    finally:
+        release_connection(conn)
+    if IS_LAKEBASE:
+        return "\n".join(row[0] for row in rows)
+    # SQLite rows are (id, parent, notused, detail); indent children under their parent.
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
 
+query_stats.set_explainer(_explain)
 
-def _get_columns(cur, table_name: str):
+
+_read_pool = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix="andon-read")
+
+
+def fetch_many(calls: dict) -> dict:
+    """
+    Run independent read helpers concurrently and return their results by name.
+    `calls` maps a name to a tuple of (helper, *args), e.g. {"targets": (get_targets, line_id)}.
+    Page data time becomes roughly that of the slowest query instead of the sum.
+    """
+    origin = query_stats.caller_origin()
+    futures = {
+        name: _read_pool.submit(query_stats.with_origin, origin, call[0], *call[1:]) for name, call in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _get_all_columns(cur) -> dict:
+    """Map every table in the schema to its set of column names, in a single query."""
     if IS_LAKEBASE:
         cur.execute(
             """
-            SELECT column_name
+            SELECT table_name, column_name
             FROM information_schema.columns
-            WHERE table_schema = current_schema() AND table_name = %s
-            """,
-            (table_name,),
+            WHERE table_schema = current_schema()
+            """
         )
-        return [row["column_name"] if isinstance(row, dict) else row[0] for row in cur.fetchall()]
+        rows = [(row["table_name"], row["column_name"]) for row in cur.fetchall()]
     else:
-        cur.execute(f"PRAGMA table_info({table_name})")
-        return [row["name"] for row in cur.fetchall()]
+        cur.execute(
+            """
+            SELECT m.name, p.name
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table'
+            """
+        )
+        rows = [tuple(row) for row in cur.fetchall()]
+    columns = {}
+    for table_name, column_name in rows:
+        columns.setdefault(table_name, set()).add(column_name)
+    return columns
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+_SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+"""
 
-def init_db():
-    """Initializes the database with the required tables."""
-    conn = get_connection()
-    cursor_kwargs = {}
-    factory = _cursor_factory()
-    if factory:
-        cursor_kwargs["cursor_factory"] = factory
-    cur = conn.cursor(**cursor_kwargs)
-
-    pk_type = "SERIAL PRIMARY KEY" if IS_LAKEBASE else "INTEGER PRIMARY KEY AUTOINCREMENT"
-
-    # 3.1 lines
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS lines (
-            id {pk_type},
-            name TEXT NOT NULL,
-            description TEXT
-        );
-    """)
-
-    # 3.2 machines
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS machines (
-            id {pk_type},
-            name TEXT NOT NULL,
-            line_id INTEGER,
-            description TEXT,
-            FOREIGN KEY (line_id) REFERENCES lines(id)
-        );
-    """)
-
-    # 3.3 operators
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS operators (
-            id {pk_type},
-            name TEXT NOT NULL,
-            badge_id TEXT
-        );
-    """)
-
-    # 3.4 work_orders
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS work_orders (
-            id {pk_type},
-            wo_number TEXT NOT NULL,
-            part_number TEXT,
-            target_quantity INTEGER,
-            due_date TEXT,
-            line_id INTEGER,
-            status TEXT DEFAULT 'Scheduled',
-            start_date TEXT,
-            completed_date TEXT,
-            FOREIGN KEY (line_id) REFERENCES lines(id)
-        );
-    """)
-
-    # Migration for work_orders status
-    wo_columns = _get_columns(cur, "work_orders")
-    if "status" not in wo_columns:
+_schema_lock = threading.Lock()
+_schema_checked = False
+
+
+def _load_migrations():
+    """
+    Ordered (version, name, sql, transactional) tuples for the active dialect, read from
+    migrations/<dialect>/NNNN_name.sql. A file containing `-- migrate: no-transaction`
+    (needed for CREATE INDEX CONCURRENTLY) is applied one statement at a time.
+    """
+    migrations = []
+    for path in sorted((MIGRATIONS_DIR / DIALECT).glob("[0-9][0-9][0-9][0-9]_*.sql")):
+        sql = path.read_text()
+        migrations.append((int(path.name[:4]), path.stem, sql, "-- migrate: no-transaction" not in sql))
+    return migrations
+
+
+def _split_statements(sql: str) -> list:
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def _schema_version(cur) -> int:
+    """Highest applied migration, or 0 for a new (or pre-versioning) database."""
+    try:
+        cur.execute("SELECT MAX(version) AS version FROM schema_version")
+    except Exception:  # noqa: BLE001 - table missing: nothing applied yet (autocommit, so no aborted transaction)
+        return 0
+    row = cur.fetchone()
+    version = row["version"] if isinstance(row, dict) else row[0]
+    return version or 0
+
+
+def _upgrade_legacy_columns(cur):
+    """Add columns that databases created before versioned migrations may lack."""
+    columns = _get_all_columns(cur)
+
+    if "status" not in columns["work_orders"]:
         try:
             cur.execute("ALTER TABLE work_orders ADD COLUMN status TEXT DEFAULT 'Scheduled'")
             cur.execute("ALTER TABLE work_orders ADD COLUMN start_date TEXT")
@@ -259,55 +545,7 @@ def init_db():
         except Exception as e:  # noqa: BLE001
             print(f"Migration error (work_orders): {e}")
 
-    # 3.5 downtime_reasons
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS downtime_reasons (
-            id {pk_type},
-            code TEXT NOT NULL,
-            description TEXT NOT NULL,
-            category TEXT
-        );
-    """)
-
-    # 3.6 quality_reasons
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS quality_reasons (
-            id {pk_type},
-            code TEXT NOT NULL,
-            description TEXT NOT NULL,
-            category TEXT
-        );
-    """)
-
-    # 3.7 downtime_events
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS downtime_events (
-            id {pk_type},
-            machine_id INTEGER,
-            line_id INTEGER,
-            work_order_id INTEGER,
-            operator_id INTEGER,
-            reason_id INTEGER,
-            start_time TEXT,
-            end_time TEXT,
-            duration_minutes REAL,
-            notes TEXT,
-            technician_id INTEGER,
-            acknowledged_at TEXT,
-            resolution_notes TEXT,
-            FOREIGN KEY (machine_id) REFERENCES machines(id),
-            FOREIGN KEY (line_id) REFERENCES lines(id),
-            FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
-            FOREIGN KEY (operator_id) REFERENCES operators(id),
-            FOREIGN KEY (reason_id) REFERENCES downtime_reasons(id),
-            FOREIGN KEY (technician_id) REFERENCES operators(id)
-        );
-    """)
-
-    # Migration: Check if columns exist (for existing DB)
-    columns = _get_columns(cur, "downtime_events")
-
-    if "technician_id" not in columns:
+    if "technician_id" not in columns["downtime_events"]:
         try:
             cur.execute("ALTER TABLE downtime_events ADD COLUMN technician_id INTEGER REFERENCES operators(id)")
             cur.execute("ALTER TABLE downtime_events ADD COLUMN acknowledged_at TEXT")
@@ -315,310 +553,669 @@ def init_db():
         except Exception as e:  # noqa: BLE001
             print(f"Migration error (ignored if columns exist): {e}")
 
-    # 3.8 quality_events
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS quality_events (
-            id {pk_type},
-            machine_id INTEGER,
-            line_id INTEGER,
-            work_order_id INTEGER,
-            operator_id INTEGER,
-            reason_id INTEGER,
-            quantity INTEGER,
-            timestamp TEXT,
-            notes TEXT,
-            FOREIGN KEY (machine_id) REFERENCES machines(id),
-            FOREIGN KEY (line_id) REFERENCES lines(id),
-            FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
-            FOREIGN KEY (operator_id) REFERENCES operators(id),
-            FOREIGN KEY (reason_id) REFERENCES quality_reasons(id)
-        );
-    """)
-
-    # 3.9 production_counts
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS production_counts (
-            id {pk_type},
-            machine_id INTEGER,
-            line_id INTEGER,
-            work_order_id INTEGER,
-            operator_id INTEGER,
-            good_quantity INTEGER,
-            scrap_quantity INTEGER DEFAULT 0,
-            timestamp TEXT,
-            FOREIGN KEY (machine_id) REFERENCES machines(id),
-            FOREIGN KEY (line_id) REFERENCES lines(id),
-            FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
-            FOREIGN KEY (operator_id) REFERENCES operators(id)
-        );
-    """)
-
-    # 3.10 safety_incidents
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS safety_incidents (
-            id {pk_type},
-            line_id INTEGER,
-            date TEXT NOT NULL,
-            description TEXT,
-            FOREIGN KEY(line_id) REFERENCES lines(id)
-        );
-    """)
-
-    # 3.11 actions
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS actions (
-            id {pk_type},
-            timestamp TEXT NOT NULL,
-            line_id INTEGER,
-            category TEXT NOT NULL,
-            description TEXT NOT NULL,
-            assigned_to INTEGER,
-            status TEXT NOT NULL,
-            resolution_notes TEXT,
-            FOREIGN KEY(line_id) REFERENCES lines(id),
-            FOREIGN KEY(assigned_to) REFERENCES operators(id)
-        );
-    """)
-
-    # 3.12 targets
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS targets (
-            id {pk_type},
-            line_id INTEGER,
-            metric_type TEXT NOT NULL,
-            target_value REAL,
-            FOREIGN KEY(line_id) REFERENCES lines(id),
-            UNIQUE(line_id, metric_type)
-        );
-    """)
-
-    # 3.13 inspection_records
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS inspection_records (
-            id {pk_type},
-            work_order_id INTEGER,
-            line_id INTEGER,
-            inspector_id INTEGER,
-            result TEXT NOT NULL, 
-            measurements TEXT,
-            timestamp TEXT,
-            notes TEXT,
-            FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
-            FOREIGN KEY (line_id) REFERENCES lines(id),
-            FOREIGN KEY (inspector_id) REFERENCES operators(id)
-        );
-    """)
-
-    # 3.14 mrb_items
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS mrb_items (
-            id {pk_type},
-            part_number TEXT,
-            quantity INTEGER,
-            reason TEXT,
-            status TEXT DEFAULT 'Open',
-            disposition TEXT,
-            notes TEXT,
-            created_at TEXT,
-            updated_at TEXT,
-            quality_event_id INTEGER,
-            FOREIGN KEY (quality_event_id) REFERENCES quality_events(id)
-        );
-    """)
 
-    conn.commit()
-    conn.close()
+def _apply_migration(conn, cur, version, name, sql, transactional):
+    record = _prepare_query("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)")
+    record_params = (version, name, datetime.now().isoformat())
+    if not IS_LAKEBASE:
+        # executescript runs the whole file in one call; BEGIN makes it atomic with its version row.
+        cur.executescript(f"BEGIN;\n{sql}\n;")
+        cur.execute(record, record_params)
+        conn.commit()
+    elif transactional:
+        with conn.transaction(), conn.pipeline():
+            for stmt in _split_statements(sql):
+                cur.execute(stmt)
+            cur.execute(record, record_params)
+    else:
+        # Autocommit, one statement at a time (CREATE INDEX CONCURRENTLY).
+        for stmt in _split_statements(sql):
+            cur.execute(stmt)
+        cur.execute(record, record_params)
+
+
+def init_db() -> list:
+    """
+    Bring the schema up to date by applying pending migrations in order.
+    Returns the names of the migrations applied (empty when already current).
+    """
+    conn = get_connection()
+    try:
+        cur = conn.cursor(**_cursor_kwargs())
+        current = _schema_version(cur)
+        migrations = _load_migrations()
+        if migrations and current >= migrations[-1][0]:
+            return []
+
+        if IS_LAKEBASE:
+            # Serialize concurrent app instances starting against the same database.
+            cur.execute("SELECT pg_advisory_lock(hashtext('andon_schema_migrations'))")
+        else:
+            # WAL lets readers (dashboards, the DuckDB analytics attach) run alongside operator writes.
+            cur.execute("PRAGMA journal_mode=WAL")
+        try:
+            cur.execute(_SCHEMA_VERSION_DDL)
+            conn.commit()
+            current = _schema_version(cur)
+            pending = [m for m in migrations if m[0] > current]
+            for version, name, sql, transactional in pending:
+                _apply_migration(conn, cur, version, name, sql, transactional)
+                if version == 1:
+                    _upgrade_legacy_columns(cur)
+                    conn.commit()
+        finally:
+            if IS_LAKEBASE:
+                cur.execute("SELECT pg_advisory_unlock(hashtext('andon_schema_migrations'))")
+        return [name for _, name, _, _ in pending]
+    finally:
+        release_connection(conn)
+
+
+def ensure_database():
+    """
+    Once per process: a single schema version check, migrating (and seeding a brand-new
+    database) only when it is behind. Safe to call on every Streamlit script run.
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if _schema_checked:
+            return
+        applied = init_db()
+        if any(name.startswith("0001_") for name in applied):
+            seed_db()
+        _schema_checked = True
 
 # --- Helper Functions ---
+# Named statements, shared with the async API in db_async.py. Each is compiled once per
+# dialect (see statements.py); names identify them in logs and instrumentation.
+
+_SQL_LINES = register("get_lines", "SELECT id, name, description FROM lines")
+_SQL_MACHINES = register(
+    "get_machines",
+    "SELECT id, name, line_id, description, ideal_cycle_seconds FROM machines",
+    filters={"line_id": "line_id = ?"},
+)
+_SQL_OPERATORS = register("get_operators", "SELECT id, name, badge_id FROM operators")
+_SQL_WORK_ORDERS = register(
+    "get_work_orders",
+    """
+    SELECT id, wo_number, part_number, target_quantity, due_date, line_id, status, start_date, completed_date,
+           ideal_cycle_seconds
+    FROM work_orders
+    """,
+    filters={"line_id": "line_id = ?", "status": "status = ?"},
+)
+_SQL_DOWNTIME_REASONS = register("get_downtime_reasons", "SELECT id, code, description, category FROM downtime_reasons")
+_SQL_QUALITY_REASONS = register("get_quality_reasons", "SELECT id, code, description, category FROM quality_reasons")
+_SQL_TARGETS = register("get_targets", "SELECT metric_type, target_value FROM targets WHERE line_id = ?")
+
+_SQL_CREATE_DOWNTIME_EVENT = register(
+    "create_downtime_event",
+    """
+    INSERT INTO downtime_events (machine_id, line_id, work_order_id, operator_id, reason_id, start_time, end_time, duration_minutes, notes)
+    VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?)
+    """,
+)
+# Minutes between the bound end time and the stored start_time, computed by the database
+# so closing an event is a single UPDATE instead of a SELECT followed by an UPDATE.
+_DURATION_MINUTES = {
+    "sqlite": "(julianday(?) - julianday(start_time)) * 1440.0",
+    "postgres": "EXTRACT(EPOCH FROM (CAST(? AS TIMESTAMP) - CAST(start_time AS TIMESTAMP))) / 60.0",
+}
+_SQL_CLOSE_DOWNTIME_EVENT = register(
+    "close_downtime_event",
+    {
+        dialect: f"UPDATE downtime_events SET end_time = ?, duration_minutes = {duration} WHERE id = ?"
+        for dialect, duration in _DURATION_MINUTES.items()
+    },
+)
+_SQL_ACKNOWLEDGE_DOWNTIME_EVENT = register(
+    "acknowledge_downtime_event",
+    "UPDATE downtime_events SET technician_id = ?, acknowledged_at = ? WHERE id = ?",
+)
+_SQL_RESOLVE_DOWNTIME_EVENT = register(
+    "resolve_downtime_event",
+    {
+        dialect: f"UPDATE downtime_events SET end_time = ?, duration_minutes = {duration}, "
+        "resolution_notes = ? WHERE id = ?"
+        for dialect, duration in _DURATION_MINUTES.items()
+    },
+)
+_SQL_ACTIVE_MAINTENANCE_EVENTS = register(
+    "get_active_maintenance_events",
+    """
+    SELECT d.id, d.machine_id, d.line_id, d.start_time, d.notes, d.technician_id, d.acknowledged_at,
+           m.name as machine_name, l.name as line_name, r.description as reason_description, r.code as reason_code,
+           o.name as operator_name, t.name as technician_name
+    FROM downtime_events d
+    JOIN machines m ON d.machine_id = m.id
+    JOIN lines l ON d.line_id = l.id
+    JOIN downtime_reasons r ON d.reason_id = r.id
+    LEFT JOIN operators o ON d.operator_id = o.id
+    LEFT JOIN operators t ON d.technician_id = t.id
+    WHERE d.end_time IS NULL
+    ORDER BY d.start_time ASC
+    """,
+)
+_SQL_ANDON_BOARD = register(
+    "get_andon_board",
+    """
+    SELECT m.id as machine_id, m.name as machine_name, l.id as line_id, l.name as line_name,
+           d.id as event_id, d.start_time, d.acknowledged_at,
+           r.code as reason_code, r.description as reason_description, t.name as technician_name
+    FROM machines m
+    JOIN lines l ON m.line_id = l.id
+    LEFT JOIN downtime_events d ON d.machine_id = m.id AND d.end_time IS NULL
+    LEFT JOIN downtime_reasons r ON d.reason_id = r.id
+    LEFT JOIN operators t ON d.technician_id = t.id
+    ORDER BY l.name, m.name, d.start_time DESC
+    """,
+)
+_SQL_ACTIVE_DOWNTIME_EVENT = register(
+    "get_active_downtime_event",
+    """
+    SELECT id, machine_id, line_id, reason_id, start_time, acknowledged_at
+    FROM downtime_events WHERE machine_id = ? AND end_time IS NULL ORDER BY start_time DESC LIMIT 1
+    """,
+)
+_SQL_LOG_QUALITY_EVENT = register(
+    "log_quality_event",
+    """
+    INSERT INTO quality_events (machine_id, line_id, work_order_id, operator_id, reason_id, quantity, timestamp, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+)
+_SQL_LOG_PRODUCTION_COUNT = register(
+    "log_production_count",
+    """
+    INSERT INTO production_counts (machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+)
+_SQL_RECENT_DOWNTIME_EVENTS = register(
+    "get_recent_downtime_events",
+    """
+    SELECT d.id, d.machine_id, d.start_time, d.end_time, d.duration_minutes,
+           r.description as reason_description, o.name as operator_name
+    FROM downtime_events d
+    LEFT JOIN downtime_reasons r ON d.reason_id = r.id
+    LEFT JOIN operators o ON d.operator_id = o.id
+    """,
+    filters={"machine_id": "d.machine_id = ?"},
+    tail="ORDER BY start_time DESC LIMIT ?",
+)
+_SQL_RECENT_QUALITY_EVENTS = register(
+    "get_recent_quality_events",
+    """
+    SELECT q.id, q.machine_id, q.quantity, q.timestamp, r.description as reason_description
+    FROM quality_events q
+    LEFT JOIN quality_reasons r ON q.reason_id = r.id
+    """,
+    filters={"machine_id": "q.machine_id = ?"},
+    tail="ORDER BY timestamp DESC LIMIT ?",
+)
+# Simple overlap check: event starts before window ends AND event ends after window starts (or is ongoing)
+_SQL_DOWNTIME_SUMMARY = register(
+    "get_downtime_summary",
+    """
+    SELECT d.id, d.machine_id, d.line_id, d.reason_id, d.operator_id, d.start_time, d.end_time, d.duration_minutes,
+           m.name as machine_name, l.name as line_name, r.description as reason_description
+    FROM downtime_events d
+    JOIN machines m ON d.machine_id = m.id
+    JOIN lines l ON d.line_id = l.id
+    JOIN downtime_reasons r ON d.reason_id = r.id
+    WHERE (d.end_time IS NULL OR d.end_time >= ?) AND d.start_time <= ?
+    """,
+)
+_SQL_QUALITY_SUMMARY = register(
+    "get_quality_summary",
+    """
+    SELECT q.id, q.machine_id, q.line_id, q.work_order_id, q.reason_id, q.quantity, q.timestamp,
+           m.name as machine_name, l.name as line_name, r.description as reason_description
+    FROM quality_events q
+    JOIN machines m ON q.machine_id = m.id
+    JOIN lines l ON q.line_id = l.id
+    JOIN quality_reasons r ON q.reason_id = r.id
+    WHERE q.timestamp >= ? AND q.timestamp <= ?
+    """,
+)
+_SQL_PRODUCTION_SUMMARY = register(
+    "get_production_summary",
+    """
+    SELECT p.id, p.machine_id, p.line_id, p.work_order_id, p.good_quantity, p.scrap_quantity, p.timestamp,
+           m.name as machine_name, l.name as line_name
+    FROM production_counts p
+    JOIN machines m ON p.machine_id = m.id
+    JOIN lines l ON p.line_id = l.id
+    WHERE p.timestamp >= ? AND p.timestamp <= ?
+    """,
+)
+_SQL_DOWNTIME_EVENTS_SINCE = register(
+    "get_downtime_events_since",
+    """
+    SELECT id, machine_id, line_id, reason_id, operator_id, start_time, end_time
+    FROM downtime_events
+    WHERE id > ? AND (end_time IS NULL OR end_time >= ?)
+    ORDER BY id
+    """,
+)
+_SQL_QUALITY_EVENTS_SINCE = register(
+    "get_quality_events_since",
+    """
+    SELECT id, machine_id, line_id, work_order_id, reason_id, quantity, timestamp
+    FROM quality_events
+    WHERE id > ? AND timestamp >= ?
+    ORDER BY id
+    """,
+)
+_SQL_PRODUCTION_COUNTS_SINCE = register(
+    "get_production_counts_since",
+    """
+    SELECT id, machine_id, line_id, work_order_id, good_quantity, timestamp
+    FROM production_counts
+    WHERE id > ? AND timestamp >= ?
+    ORDER BY id
+    """,
+)
+# Cheap per-table version markers used to validate cache snapshots: highest id and row count
+# for the small master tables, highest id only (a primary-key lookup) for the event tables.
+_VERSIONED_TABLES = ("schema_version", "lines", "machines", "operators", "downtime_reasons", "quality_reasons")
+_WATERMARKED_TABLES = ("downtime_events", "quality_events", "production_counts")
+_SQL_TABLE_VERSIONS = register(
+    "get_table_versions",
+    "\nUNION ALL\n".join(
+        [
+            f"SELECT '{table}' AS table_name, MAX({'version' if table == 'schema_version' else 'id'}) AS max_id, "
+            f"COUNT(*) AS row_count FROM {table}"
+            for table in _VERSIONED_TABLES
+        ] + [
+            f"SELECT '{table}' AS table_name, MAX(id) AS max_id, NULL AS row_count FROM {table}"
+            for table in _WATERMARKED_TABLES
+        ]
+    ),
+)
+_SQL_SAFETY_INCIDENTS = register(
+    "get_safety_incidents",
+    "SELECT id, line_id, date FROM safety_incidents WHERE line_id = ? AND date >= ? AND date <= ?",
+)
+_SQL_ACTIONS = register(
+    "get_actions",
+    """
+    SELECT a.id, a.timestamp, a.line_id, a.category, a.description, a.assigned_to, a.status,
+           l.name as line_name, o.name as assignee_name
+    FROM actions a
+    LEFT JOIN lines l ON a.line_id = l.id
+    LEFT JOIN operators o ON a.assigned_to = o.id
+    """,
+    filters={"status": "a.status = ?"},
+    tail="ORDER BY timestamp DESC",
+)
+_SQL_SET_TARGET = register(
+    "set_target",
+    {
+        "sqlite": "INSERT OR REPLACE INTO targets (line_id, metric_type, target_value) VALUES (?, ?, ?)",
+        "postgres": """
+            INSERT INTO targets (line_id, metric_type, target_value)
+            VALUES (?, ?, ?)
+            ON CONFLICT (line_id, metric_type) DO UPDATE SET target_value = EXCLUDED.target_value
+        """,
+    },
+)
+_SQL_WORK_ORDER_STATUS = {
+    None: register("update_work_order_status", "UPDATE work_orders SET status = ? WHERE id = ?"),
+    "Active": register(
+        "update_work_order_status[start]",
+        "UPDATE work_orders SET status = ?, start_date = ? WHERE id = ?",
+    ),
+    "Completed": register(
+        "update_work_order_status[complete]",
+        "UPDATE work_orders SET status = ?, completed_date = ? WHERE id = ?",
+    ),
+}
+_SQL_INSPECTION_RECORDS = register(
+    "get_inspection_records",
+    """
+    SELECT i.id, i.work_order_id, i.line_id, i.inspector_id, i.result, i.measurements, i.timestamp, i.notes,
+           o.name as inspector_name, l.name as line_name, w.wo_number
+    FROM inspection_records i
+    LEFT JOIN operators o ON i.inspector_id = o.id
+    LEFT JOIN lines l ON i.line_id = l.id
+    LEFT JOIN work_orders w ON i.work_order_id = w.id
+    """,
+    filters={"wo_id": "i.work_order_id = ?"},
+    tail="ORDER BY i.timestamp DESC",
+)
+_SQL_MRB_ITEMS = register(
+    "get_mrb_items",
+    """
+    SELECT id, part_number, quantity, reason, status, disposition, notes, created_at, updated_at, quality_event_id
+    FROM mrb_items
+    """,
+    filters={"status": "status = ?"},
+    tail="ORDER BY created_at DESC",
+)
+
+# Replays of journaled operator writes (write_queue.py). Inserts carry the entry's
+# client_event_id, so an entry applied twice (e.g. commit succeeded, ack lost) is a no-op.
+_SQL_REPLAY = {
+    "create_downtime": register(
+        "replay_create_downtime_event",
+        """
+        INSERT INTO downtime_events (machine_id, line_id, work_order_id, operator_id, reason_id, start_time, end_time, duration_minutes, notes, client_event_id)
+        VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?)
+        ON CONFLICT (client_event_id) DO NOTHING
+        """,
+    ),
+    "log_quality": register(
+        "replay_log_quality_event",
+        """
+        INSERT INTO quality_events (machine_id, line_id, work_order_id, operator_id, reason_id, quantity, timestamp, notes, client_event_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (client_event_id) DO NOTHING
+        """,
+    ),
+    "log_production": register(
+        "replay_log_production_count",
+        """
+        INSERT INTO production_counts (machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity, timestamp, client_event_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (client_event_id) DO NOTHING
+        """,
+    ),
+    # Close an event by row id, or by the client_event_id of a start that was itself queued.
+    # Only still-open events are closed, so a replay cannot move an end time.
+    "close_downtime": register(
+        "replay_close_downtime_event",
+        {
+            dialect: f"UPDATE downtime_events SET end_time = ?, duration_minutes = {duration} "
+            "WHERE end_time IS NULL AND (id = ? OR client_event_id = ?)"
+            for dialect, duration in _DURATION_MINUTES.items()
+        },
+    ),
+}
+
+# Operator Panel snapshot: everything machine-specific the panel renders, as one row of
+# JSON columns. Each part is (columns, FROM ... clause, order); a part with order None
+# is a single object (or NULL), the others are arrays in that order.
+_PANEL_WORK_ORDER_RANK = "CASE status WHEN 'Active' THEN 0 WHEN 'Scheduled' THEN 1 WHEN 'Completed' THEN 2 ELSE 3 END"
+_PANEL_PARTS = {
+    "active_downtime": (
+        [("id", "d.id"), ("client_event_id", "d.client_event_id"), ("machine_id", "d.machine_id"),
+         ("line_id", "d.line_id"), ("reason_id", "d.reason_id"),
+         ("start_time", "d.start_time"), ("acknowledged_at", "d.acknowledged_at"),
+         ("reason_code", "r.code"), ("reason_description", "r.description")],
+        """FROM downtime_events d LEFT JOIN downtime_reasons r ON d.reason_id = r.id
+        WHERE d.machine_id = ? AND d.end_time IS NULL ORDER BY d.start_time DESC LIMIT 1""",
+        None,
+    ),
+    "recent_downtime": (
+        [("start_time", "d.start_time"), ("duration_minutes", "d.duration_minutes"),
+         ("reason_description", "r.description"), ("operator_name", "o.name")],
+        """FROM downtime_events d
+        LEFT JOIN downtime_reasons r ON d.reason_id = r.id
+        LEFT JOIN operators o ON d.operator_id = o.id
+        WHERE d.machine_id = ? ORDER BY d.start_time DESC LIMIT ?""",
+        "start_time DESC",
+    ),
+    "recent_quality": (
+        [("timestamp", "q.timestamp"), ("quantity", "q.quantity"), ("reason_description", "r.description")],
+        """FROM quality_events q LEFT JOIN quality_reasons r ON q.reason_id = r.id
+        WHERE q.machine_id = ? ORDER BY q.timestamp DESC LIMIT ?""",
+        "timestamp DESC",
+    ),
+    "work_orders": (
+        [(name, name) for name in (
+            "id", "wo_number", "part_number", "target_quantity", "due_date", "line_id", "status",
+            "start_date", "completed_date",
+        )] + [("status_rank", _PANEL_WORK_ORDER_RANK)],
+        f"""FROM work_orders WHERE line_id = (SELECT line_id FROM machines WHERE id = ?)
+        ORDER BY {_PANEL_WORK_ORDER_RANK}, id DESC""",
+        "status_rank, id DESC",
+    ),
+}
+
+
+def _panel_snapshot_sql(dialect: str) -> str:
+    parts = []
+    for name, (columns, from_clause, order) in _PANEL_PARTS.items():
+        inner = "SELECT " + ", ".join(f"{expr} AS {alias}" for alias, expr in columns) + " " + from_clause
+        if dialect == "postgres":
+            value = "row_to_json(x)" if order is None else f"COALESCE(json_agg(x ORDER BY {order}), '[]'::json)"
+        else:
+            obj = "json_object(" + ", ".join(f"'{alias}', x.{alias}" for alias, _ in columns) + ")"
+            value = obj if order is None else f"json_group_array({obj})"
+        parts.append(f"(SELECT {value} FROM ({inner}) x) AS {name}")
+    return "SELECT " + ",\n       ".join(parts)
+
+
+_SQL_PANEL_SNAPSHOT = register(
+    "get_panel_snapshot", {dialect: _panel_snapshot_sql(dialect) for dialect in ("sqlite", "postgres")},
+)
+
 
 def get_lines():
-    return _read_df("SELECT * FROM lines")
+    return _read_df(_SQL_LINES)
 
 def get_machines(line_id=None):
-    query = "SELECT * FROM machines"
-    params = []
-    if line_id:
-        query += " WHERE line_id = ?"
-        params.append(line_id)
+    query, params = _bind(_SQL_MACHINES, line_id=line_id)
     return _read_df(query, params=params)
 
 def get_operators():
-    return _read_df("SELECT * FROM operators")
+    return _read_df(_SQL_OPERATORS)
 
 def get_work_orders(line_id=None, status=None):
-    query = "SELECT * FROM work_orders WHERE 1=1"
-    params = []
-    if line_id:
-        query += " AND line_id = ?"
-        params.append(line_id)
-    if status:
-        query += " AND status = ?"
-        params.append(status)
+    query, params = _bind(_SQL_WORK_ORDERS, line_id=line_id, status=status)
     return _read_df(query, params=params)
 
 def get_downtime_reasons():
-    return _read_df("SELECT * FROM downtime_reasons")
+    return _read_df(_SQL_DOWNTIME_REASONS)
 
 def get_quality_reasons():
-    return _read_df("SELECT * FROM quality_reasons")
+    return _read_df(_SQL_QUALITY_REASONS)
 
 def create_downtime_event(machine_id, line_id, work_order_id, operator_id, reason_id, notes=""):
     start_time = datetime.now().isoformat()
     return _execute_returning_id(
-        """
-        INSERT INTO downtime_events (machine_id, line_id, work_order_id, operator_id, reason_id, start_time, end_time, duration_minutes, notes)
-        VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?)
-        """,
+        _SQL_CREATE_DOWNTIME_EVENT,
         (machine_id, line_id, work_order_id, operator_id, reason_id, start_time, notes),
     )
 
 def close_downtime_event(event_id):
-    end_time = datetime.now()
-    
-    # Fetch start time to calculate duration
-    row = _fetch_one("SELECT start_time FROM downtime_events WHERE id = ?", (event_id,))
-    
-    if row:
-        start_time = datetime.fromisoformat(row["start_time"])
-        duration = (end_time - start_time).total_seconds() / 60.0
-        
-        _execute(
-            "UPDATE downtime_events SET end_time = ?, duration_minutes = ? WHERE id = ?",
-            (end_time.isoformat(), duration, event_id),
-        )
+    end_time = datetime.now().isoformat()
+    _execute(_SQL_CLOSE_DOWNTIME_EVENT, (end_time, end_time, event_id))
 
 def acknowledge_downtime_event(event_id, technician_id):
     now = datetime.now().isoformat()
-    _execute(
-        "UPDATE downtime_events SET technician_id = ?, acknowledged_at = ? WHERE id = ?",
-        (technician_id, now, event_id)
-    )
+    _execute(_SQL_ACKNOWLEDGE_DOWNTIME_EVENT, (technician_id, now, event_id))
 
 def resolve_downtime_event(event_id, resolution_notes):
-    end_time = datetime.now()
-    
-    # Fetch start time to calculate duration
-    row = _fetch_one("SELECT start_time FROM downtime_events WHERE id = ?", (event_id,))
-    
-    if row:
-        start_time = datetime.fromisoformat(row["start_time"])
-        duration = (end_time - start_time).total_seconds() / 60.0
-        
-        _execute(
-            "UPDATE downtime_events SET end_time = ?, duration_minutes = ?, resolution_notes = ? WHERE id = ?",
-            (end_time.isoformat(), duration, resolution_notes, event_id),
-        )
+    end_time = datetime.now().isoformat()
+    _execute(_SQL_RESOLVE_DOWNTIME_EVENT, (end_time, end_time, resolution_notes, event_id))
 
 def get_active_maintenance_events():
-    query = """
-        SELECT d.*, m.name as machine_name, l.name as line_name, r.description as reason_description, r.code as reason_code,
-               o.name as operator_name, t.name as technician_name
-        FROM downtime_events d
-        JOIN machines m ON d.machine_id = m.id
-        JOIN lines l ON d.line_id = l.id
-        JOIN downtime_reasons r ON d.reason_id = r.id
-        LEFT JOIN operators o ON d.operator_id = o.id
-        LEFT JOIN operators t ON d.technician_id = t.id
-        WHERE d.end_time IS NULL
-        ORDER BY d.start_time ASC
-    """
-    return _read_df(query)
+    return _read_df(_SQL_ACTIVE_MAINTENANCE_EVENTS)
 
 def get_active_downtime_event(machine_id):
-    return _fetch_one(
-        "SELECT * FROM downtime_events WHERE machine_id = ? AND end_time IS NULL ORDER BY start_time DESC LIMIT 1",
-        (machine_id,)
-    )
+    return _fetch_one(_SQL_ACTIVE_DOWNTIME_EVENT, (machine_id,))
+
+_master_lock = threading.Lock()
+_master_data = None
+_master_loaded_at = 0.0
+
+def get_master_data() -> dict:
+    """
+    Lines, machines, operators and both reason lists, shared by all sessions and reloaded
+    every MASTER_DATA_TTL_SECONDS. The frames are shared: filter or copy them, do not modify.
+    """
+    global _master_data, _master_loaded_at
+    with _master_lock:
+        if _master_data is None or time.monotonic() - _master_loaded_at >= MASTER_DATA_TTL_SECONDS:
+            _master_data = fetch_many({
+                "lines": (get_lines,),
+                "machines": (get_machines,),
+                "operators": (get_operators,),
+                "downtime_reasons": (get_downtime_reasons,),
+                "quality_reasons": (get_quality_reasons,),
+            })
+            _master_loaded_at = time.monotonic()
+        return _master_data
+
+def invalidate_master_data():
+    """Drop the cached master data so the next get_master_data() reloads it."""
+    global _master_data
+    with _master_lock:
+        _master_data = None
+
+def get_andon_board():
+    """Every machine with its line and open downtime event (None columns when running)."""
+    board = _read_df(_SQL_ANDON_BOARD)
+    # A machine with several open events shows its latest one.
+    return board.drop_duplicates("machine_id").reset_index(drop=True)
+
+_board_lock = threading.Lock()
+_board_state = None
+
+def get_andon_board_state() -> dict:
+    """
+    The plant-wide board shared by all viewers: {"machines": DataFrame, "as_of": datetime}.
+    Reloaded at most every ANDON_BOARD_REFRESH_SECONDS; concurrent callers wait for one load.
+    """
+    global _board_state
+    with _board_lock:
+        if _board_state is None or (datetime.now() - _board_state["as_of"]).total_seconds() >= ANDON_BOARD_REFRESH_SECONDS:
+            _board_state = {"machines": get_andon_board(), "as_of": datetime.now()}
+        return _board_state
+
+def _json_value(value):
+    # psycopg decodes json columns itself; SQLite returns the text.
+    return json.loads(value) if isinstance(value, str) else value
+
+def get_panel_snapshot(machine_id, limit=10) -> dict:
+    """
+    Everything machine-specific the Operator Panel renders, in one query: the active
+    downtime event with its reason joined (or None), the recent downtime and quality
+    events, and the machine's line's work orders, Active first.
+    """
+    row = _fetch_one(_SQL_PANEL_SNAPSHOT, (machine_id, machine_id, limit, machine_id, limit, machine_id))
+    snapshot = {"active_downtime": _json_value(row["active_downtime"])}
+    for name in ("recent_downtime", "recent_quality", "work_orders"):
+        columns = [alias for alias, _ in _PANEL_PARTS[name][0] if alias != "status_rank"]
+        snapshot[name] = _coerce_types(pd.DataFrame(_json_value(row[name]) or [], columns=columns))
+    return snapshot
 
 def log_quality_event(machine_id, line_id, work_order_id, operator_id, reason_id, quantity, notes=""):
     timestamp = datetime.now().isoformat()
     _execute(
-        """
-        INSERT INTO quality_events (machine_id, line_id, work_order_id, operator_id, reason_id, quantity, timestamp, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        _SQL_LOG_QUALITY_EVENT,
         (machine_id, line_id, work_order_id, operator_id, reason_id, quantity, timestamp, notes)
     )
 
 def log_production_count(machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity=0):
     timestamp = datetime.now().isoformat()
     _execute(
-        """
-        INSERT INTO production_counts (machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
+        _SQL_LOG_PRODUCTION_COUNT,
         (machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity, timestamp)
     )
 
-def get_recent_downtime_events(limit=10, machine_id=None):
-    query = """
-        SELECT d.*, r.description as reason_description, o.name as operator_name 
-        FROM downtime_events d
-        LEFT JOIN downtime_reasons r ON d.reason_id = r.id
-        LEFT JOIN operators o ON d.operator_id = o.id
+def _replay_params(op: str, payload: dict) -> tuple:
+    p = payload
+    if op == "create_downtime":
+        return (p["machine_id"], p["line_id"], p["work_order_id"], p["operator_id"], p["reason_id"],
+                p["start_time"], p["notes"], p["client_event_id"])
+    if op == "log_quality":
+        return (p["machine_id"], p["line_id"], p["work_order_id"], p["operator_id"], p["reason_id"],
+                p["quantity"], p["timestamp"], p["notes"], p["client_event_id"])
+    if op == "log_production":
+        return (p["machine_id"], p["line_id"], p["work_order_id"], p["operator_id"], p["good_quantity"],
+                p["scrap_quantity"], p["timestamp"], p["client_event_id"])
+    if op == "close_downtime":
+        return (p["end_time"], p["end_time"], p["event_id"], p["start_client_event_id"])
+    raise ValueError(f"Unknown queued operation '{op}'.")
+
+def apply_queued_writes(entries):
     """
-    params = []
-    if machine_id:
-        query += " WHERE d.machine_id = ?"
-        params.append(machine_id)
-        
-    query += " ORDER BY start_time DESC LIMIT ?"
-    params.append(limit)
-    
-    return _read_df(query, params=params)
+    Apply journaled operator writes, given as (op, payload) pairs, in order and in one
+    transaction (one pipelined flight on Lakebase). Safe to repeat: see _SQL_REPLAY.
+    """
+    statements = [(_prepare_query(_SQL_REPLAY[op]), _normalize_params(_replay_params(op, payload))) for op, payload in entries]
+    if not statements:
+        return
+    # The first entry stands in for the batch in the slow-query log and its EXPLAIN.
+    with query_stats.probe(_SQL_REPLAY[entries[0][0]], *statements[0]) as probe:
+        conn = get_connection()
+        probe.acquired()
+        try:
+            cur = conn.cursor()
+            if IS_LAKEBASE:
+                with conn.transaction(), conn.pipeline():
+                    for sql, params in statements:
+                        cur.execute(sql, params, prepare=True)
+            else:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                conn.commit()
+        finally:
+            release_connection(conn)
+        probe.rows = len(statements)
+
+def get_recent_downtime_events(limit=10, machine_id=None):
+    query, params = _bind(_SQL_RECENT_DOWNTIME_EVENTS, machine_id=machine_id)
+    return _read_df(query, params=params + [limit])
 
 def get_recent_quality_events(limit=10, machine_id=None):
-    query = """
-        SELECT q.*, r.description as reason_description 
-        FROM quality_events q
-        LEFT JOIN quality_reasons r ON q.reason_id = r.id
-    """
-    params = []
-    if machine_id:
-        query += " WHERE q.machine_id = ?"
-        params.append(machine_id)
-        
-    query += " ORDER BY timestamp DESC LIMIT ?"
-    params.append(limit)
-    
-    return _read_df(query, params=params)
+    query, params = _bind(_SQL_RECENT_QUALITY_EVENTS, machine_id=machine_id)
+    return _read_df(query, params=params + [limit])
 
 # For dashboard: Get downtime within a time window
 def get_downtime_summary(start_time_str, end_time_str):
-    # Simple overlap check: event starts before window ends AND event ends after window starts (or is ongoing)
-    # For MVP we can just query start_time between window or something simple
-    # The requirement says "whose time intersects the window".
-    
-    query = """
-        SELECT d.*, m.name as machine_name, l.name as line_name, r.description as reason_description
-        FROM downtime_events d
-        JOIN machines m ON d.machine_id = m.id
-        JOIN lines l ON d.line_id = l.id
-        JOIN downtime_reasons r ON d.reason_id = r.id
-        WHERE (d.end_time IS NULL OR d.end_time >= ?) AND d.start_time <= ?
-    """
-    return _read_df(query, params=(start_time_str, end_time_str))
+    return _read_df(_SQL_DOWNTIME_SUMMARY, params=(start_time_str, end_time_str), readonly=True)
 
 def get_quality_summary(start_time_str, end_time_str):
-    query = """
-        SELECT q.*, m.name as machine_name, l.name as line_name, r.description as reason_description
-        FROM quality_events q
-        JOIN machines m ON q.machine_id = m.id
-        JOIN lines l ON q.line_id = l.id
-        JOIN quality_reasons r ON q.reason_id = r.id
-        WHERE q.timestamp >= ? AND q.timestamp <= ?
-    """
-    return _read_df(query, params=(start_time_str, end_time_str))
+    return _read_df(_SQL_QUALITY_SUMMARY, params=(start_time_str, end_time_str), readonly=True)
 
 def get_production_summary(start_time_str, end_time_str):
-    query = """
-        SELECT p.*, m.name as machine_name, l.name as line_name
-        FROM production_counts p
-        JOIN machines m ON p.machine_id = m.id
-        JOIN lines l ON p.line_id = l.id
-        WHERE p.timestamp >= ? AND p.timestamp <= ?
+    return _read_df(_SQL_PRODUCTION_SUMMARY, params=(start_time_str, end_time_str), readonly=True)
+
+# For the shared event store: incremental feeds keyed on an id watermark
+def get_downtime_events_since(after_id, since_str):
+    """Downtime events with id > after_id that are still open or ended after since_str."""
+    return _read_df(_SQL_DOWNTIME_EVENTS_SINCE, params=(after_id, since_str))
+
+def get_downtime_events_by_ids(event_ids):
+    """Re-read specific downtime events (used to pick up end_time on events that were open)."""
+    if not event_ids:
+        return _read_df(
+            "SELECT id, machine_id, line_id, reason_id, operator_id, start_time, end_time FROM downtime_events WHERE 1=0"
+        )
+    placeholders = ", ".join("?" for _ in event_ids)
+    query = f"""
+        SELECT id, machine_id, line_id, reason_id, operator_id, start_time, end_time
+        FROM downtime_events
+        WHERE id IN ({placeholders})
+    """
+    return _read_df(query, params=list(event_ids))
+
+def get_quality_events_since(after_id, since_str):
+    return _read_df(_SQL_QUALITY_EVENTS_SINCE, params=(after_id, since_str))
+
+def get_production_counts_since(after_id, since_str):
+    return _read_df(_SQL_PRODUCTION_COUNTS_SINCE, params=(after_id, since_str))
+
+def get_table_versions():
+    """
+    {table: (max id, row count)} for master data and schema_version, and {table: (max id, None)}
+    for the event tables (never counted), in one query.
     """
-    return _read_df(query, params=(start_time_str, end_time_str))
+    rows = _read_df(_SQL_TABLE_VERSIONS)
+    return {
+        row.table_name: (
+            int(row.max_id) if pd.notnull(row.max_id) else 0,
+            int(row.row_count) if pd.notnull(row.row_count) else None,
+        )
+        for row in rows.itertuples(index=False)
+    }
 
 def log_safety_incident(line_id, date, description):
     _execute(
@@ -627,8 +1224,7 @@ def log_safety_incident(line_id, date, description):
     )
 
 def get_safety_incidents(line_id, start_date, end_date):
-    query = "SELECT * FROM safety_incidents WHERE line_id = ? AND date >= ? AND date <= ?"
-    return _read_df(query, params=(line_id, start_date, end_date))
+    return _read_df(_SQL_SAFETY_INCIDENTS, params=(line_id, start_date, end_date))
 
 def create_action(line_id, category, description, assigned_to):
     timestamp = datetime.now().isoformat()
@@ -641,19 +1237,7 @@ def create_action(line_id, category, description, assigned_to):
     )
 
 def get_actions(status=None):
-    query = """
-        SELECT a.*, l.name as line_name, o.name as assignee_name 
-        FROM actions a
-        LEFT JOIN lines l ON a.line_id = l.id
-        LEFT JOIN operators o ON a.assigned_to = o.id
-    """
-    params = []
-    if status:
-        query += " WHERE a.status = ?"
-        params.append(status)
-    
-    query += " ORDER BY timestamp DESC"
-    
+    query, params = _bind(_SQL_ACTIONS, status=status)
     return _read_df(query, params=params)
 
 def close_action(action_id, resolution_notes):
@@ -663,23 +1247,14 @@ def close_action(action_id, resolution_notes):
     )
 
 def set_target(line_id, metric_type, value):
-    if IS_LAKEBASE:
-        _execute(
-            """
-            INSERT INTO targets (line_id, metric_type, target_value)
-            VALUES (?, ?, ?)
-            ON CONFLICT (line_id, metric_type) DO UPDATE SET target_value = EXCLUDED.target_value
-            """,
-            (line_id, metric_type, value),
-        )
-    else:
-        _execute(
-            "INSERT OR REPLACE INTO targets (line_id, metric_type, target_value) VALUES (?, ?, ?)",
-            (line_id, metric_type, value),
-        )
+    _execute(_SQL_SET_TARGET, (line_id, metric_type, value))
+
+def set_targets(line_id, targets):
+    """Upsert several {metric_type: value} targets for a line in one batch."""
+    _executemany(_SQL_SET_TARGET, [(line_id, metric_type, value) for metric_type, value in targets.items()])
 
 def get_targets(line_id):
-    rows = _read_df("SELECT metric_type, target_value FROM targets WHERE line_id = ?", params=(line_id,))
+    rows = _read_df(_SQL_TARGETS, params=(line_id,))
     targets = {}
     for _, row in rows.iterrows():
         targets[row["metric_type"]] = row["target_value"]
@@ -687,55 +1262,47 @@ def get_targets(line_id):
 
 def add_line(name, description=""):
     _execute("INSERT INTO lines (name, description) VALUES (?, ?)", (name, description))
+    invalidate_master_data()
 
-def add_machine(name, line_id, description=""):
-    _execute("INSERT INTO machines (name, line_id, description) VALUES (?, ?, ?)", (name, line_id, description))
+def add_machine(name, line_id, description="", ideal_cycle_seconds=None):
+    _execute(
+        "INSERT INTO machines (name, line_id, description, ideal_cycle_seconds) VALUES (?, ?, ?, ?)",
+        (name, line_id, description, ideal_cycle_seconds),
+    )
+    invalidate_master_data()
+
+def set_ideal_cycle_seconds(machine_id, seconds):
+    """Standard seconds per unit for OEE performance (None clears it)."""
+    _execute("UPDATE machines SET ideal_cycle_seconds = ? WHERE id = ?", (seconds, machine_id))
+    invalidate_master_data()
 
 def add_operator(name, badge_id=""):
     _execute("INSERT INTO operators (name, badge_id) VALUES (?, ?)", (name, badge_id))
+    invalidate_master_data()
 
 def add_downtime_reason(code, description, category):
     _execute("INSERT INTO downtime_reasons (code, description, category) VALUES (?, ?, ?)", (code, description, category))
+    invalidate_master_data()
 
-def create_work_order(wo_number, part_number, target_quantity, due_date, line_id, status="Scheduled"):
+def create_work_order(wo_number, part_number, target_quantity, due_date, line_id, status="Scheduled",
+                      ideal_cycle_seconds=None):
     _execute(
         """
-        INSERT INTO work_orders (wo_number, part_number, target_quantity, due_date, line_id, status)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO work_orders (wo_number, part_number, target_quantity, due_date, line_id, status, ideal_cycle_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
         """,
-        (wo_number, part_number, target_quantity, due_date, line_id, status)
+        (wo_number, part_number, target_quantity, due_date, line_id, status, ideal_cycle_seconds)
     )
 
 def update_work_order_status(wo_id, status):
-    update_query = "UPDATE work_orders SET status = ?"
-    params = [status]
-    
-    if status == "Active":
-        update_query += ", start_date = ?"
-        params.append(datetime.now().isoformat())
-    elif status == "Completed":
-        update_query += ", completed_date = ?"
-        params.append(datetime.now().isoformat())
-        
-    update_query += " WHERE id = ?"
-    params.append(wo_id)
-    
-    _execute(update_query, params)
+    # Active / Completed also stamp start_date / completed_date.
+    if status in _SQL_WORK_ORDER_STATUS:
+        _execute(_SQL_WORK_ORDER_STATUS[status], (status, datetime.now().isoformat(), wo_id))
+    else:
+        _execute(_SQL_WORK_ORDER_STATUS[None], (status, wo_id))
 
 def get_inspection_records(wo_id=None):
-    query = """
-        SELECT i.*, o.name as inspector_name, l.name as line_name, w.wo_number
-        FROM inspection_records i
-        LEFT JOIN operators o ON i.inspector_id = o.id
-        LEFT JOIN lines l ON i.line_id = l.id
-        LEFT JOIN work_orders w ON i.work_order_id = w.id
-    """
-    params = []
-    if wo_id:
-        query += " WHERE i.work_order_id = ?"
-        params.append(wo_id)
-        
-    query += " ORDER BY i.timestamp DESC"
+    query, params = _bind(_SQL_INSPECTION_RECORDS, wo_id=wo_id)
     return _read_df(query, params=params)
 
 def create_inspection_record(work_order_id, line_id, inspector_id, result, measurements="", notes=""):
@@ -749,12 +1316,7 @@ def create_inspection_record(work_order_id, line_id, inspector_id, result, measu
     )
 
 def get_mrb_items(status=None):
-    query = "SELECT * FROM mrb_items"
-    params = []
-    if status:
-        query += " WHERE status = ?"
-        params.append(status)
-    query += " ORDER BY created_at DESC"
+    query, params = _bind(_SQL_MRB_ITEMS, status=status)
     return _read_df(query, params=params)
 
 def create_mrb_item(part_number, quantity, reason, notes="", quality_event_id=None):
@@ -781,18 +1343,14 @@ def update_mrb_disposition(item_id, disposition, notes=""):
 def seed_db():
     """Populates the database with initial sample data."""
     conn = get_connection()
-    cursor_kwargs = {}
-    factory = _cursor_factory()
-    if factory:
-        cursor_kwargs["cursor_factory"] = factory
-    cur = conn.cursor(**cursor_kwargs)
+    cur = conn.cursor(**_cursor_kwargs())
 
     # Check if lines exist
     cur.execute(_prepare_query("SELECT COUNT(*) as cnt FROM lines"))
     existing = cur.fetchone()
     existing_count = existing["cnt"] if isinstance(existing, dict) else existing[0]
     if existing_count > 0:
-        conn.close()
+        release_connection(conn)
         return
 
     # Lines
@@ -810,47 +1368,49 @@ def seed_db():
     for row in cur.fetchall():
         line_map[row["name"]] = row["id"]
 
-    # Machines
-    machines = [
-        ("Conveyor_1", line_map["Line_A"], "Infeed Conveyor"),
-        ("Robot_Arm_1", line_map["Line_A"], "Assembly Robot"),
-        ("Packer_1", line_map["Line_B"], "Box Packer"),
-    ]
-    cur.executemany(_prepare_query("INSERT INTO machines (name, line_id, description) VALUES (?, ?, ?)"), machines)
-
-    # Operators
-    operators = [
-        ("John_Doe", "OP001"),
-        ("Jane_Smith", "OP002"),
-        ("Mike_Johnson", "OP003"),
-    ]
-    cur.executemany(_prepare_query("INSERT INTO operators (name, badge_id) VALUES (?, ?)"), operators)
-
-    # Work Orders
-    work_orders = [
-        ("WO-1001", "PN-A001", 500, "2023-12-31", line_map["Line_A"]),
-        ("WO-1002", "PN-B002", 1000, "2023-12-31", line_map["Line_B"]),
-    ]
-    cur.executemany(_prepare_query("INSERT INTO work_orders (wo_number, part_number, target_quantity, due_date, line_id) VALUES (?, ?, ?, ?, ?)"), work_orders)
-
-    # Downtime Reasons
-    dt_reasons = [
-        ("NO_MAT", "No Material", "Unplanned"),
-        ("JAM", "Machine Jam", "Unplanned"),
-        ("MECH", "Mechanical Failure", "Unplanned"),
-        ("BRK", "Break", "Planned"),
-        ("CHG", "Changeover", "Planned"),
-    ]
-    cur.executemany(_prepare_query("INSERT INTO downtime_reasons (code, description, category) VALUES (?, ?, ?)"), dt_reasons)
-
-    # Quality Reasons
-    q_reasons = [
-        ("DIM", "Dimension Out of Spec", "Defect"),
-        ("SCR", "Scratch/Dent", "Defect"),
-        ("MAT", "Material Defect", "Defect"),
-        ("REW", "Rework", "Rework"),
-    ]
-    cur.executemany(_prepare_query("INSERT INTO quality_reasons (code, description, category) VALUES (?, ?, ?)"), q_reasons)
+    # The remaining master data does not depend on earlier results: one pipeline on Lakebase.
+    with _pipeline(conn):
+        # Machines
+        machines = [
+            ("Conveyor_1", line_map["Line_A"], "Infeed Conveyor"),
+            ("Robot_Arm_1", line_map["Line_A"], "Assembly Robot"),
+            ("Packer_1", line_map["Line_B"], "Box Packer"),
+        ]
+        cur.executemany(_prepare_query("INSERT INTO machines (name, line_id, description) VALUES (?, ?, ?)"), machines)
+
+        # Operators
+        operators = [
+            ("John_Doe", "OP001"),
+            ("Jane_Smith", "OP002"),
+            ("Mike_Johnson", "OP003"),
+        ]
+        cur.executemany(_prepare_query("INSERT INTO operators (name, badge_id) VALUES (?, ?)"), operators)
+
+        # Work Orders
+        work_orders = [
+            ("WO-1001", "PN-A001", 500, "2023-12-31", line_map["Line_A"]),
+            ("WO-1002", "PN-B002", 1000, "2023-12-31", line_map["Line_B"]),
+        ]
+        cur.executemany(_prepare_query("INSERT INTO work_orders (wo_number, part_number, target_quantity, due_date, line_id) VALUES (?, ?, ?, ?, ?)"), work_orders)
+
+        # Downtime Reasons
+        dt_reasons = [
+            ("NO_MAT", "No Material", "Unplanned"),
+            ("JAM", "Machine Jam", "Unplanned"),
+            ("MECH", "Mechanical Failure", "Unplanned"),
+            ("BRK", "Break", "Planned"),
+            ("CHG", "Changeover", "Planned"),
+        ]
+        cur.executemany(_prepare_query("INSERT INTO downtime_reasons (code, description, category) VALUES (?, ?, ?)"), dt_reasons)
+
+        # Quality Reasons
+        q_reasons = [
+            ("DIM", "Dimension Out of Spec", "Defect"),
+            ("SCR", "Scratch/Dent", "Defect"),
+            ("MAT", "Material Defect", "Defect"),
+            ("REW", "Rework", "Rework"),
+        ]
+        cur.executemany(_prepare_query("INSERT INTO quality_reasons (code, description, category) VALUES (?, ?, ?)"), q_reasons)
 
     conn.commit()
-    conn.close()
+    release_connection(conn)
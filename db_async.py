@@ -0,0 +1,271 @@
+"""
+Async database access for non-Streamlit callers (API handlers, sync workers, load tools).
+
+Uses aiosqlite for the local SQLite file and a psycopg 3 AsyncConnectionPool for
+Lakebase. Statements, parameter handling and DataFrame typing are shared with db.py,
+so both APIs return the same rows and dtypes. Pools are per event loop.
+"""
+import asyncio
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+import pandas as pd
+
+import db
+from config import (
+    DB_ASYNC_POOL_SIZE,
+    PG_APPNAME,
+    PG_DATABASE,
+    PG_HOST,
+    PG_PORT,
+    PG_SSLMODE,
+    PG_USER,
+)
+
+# The async drivers (aiosqlite, psycopg 3) are imported when the first pool is created.
+
+# Lakebase OAuth tokens expire after an hour; recycle pooled connections before that.
+_LAKEBASE_MAX_LIFETIME = 45 * 60
+
+_pools = {}
+
+
+@lru_cache(maxsize=None)
+def _lakebase_connection_class():
+    psycopg, _ = db._require_psycopg()
+
+    class _LakebaseConnection(psycopg.AsyncConnection):
+        """Fetches a fresh OAuth token for every new physical connection."""
+
+        @classmethod
+        async def connect(cls, conninfo: str = "", **kwargs):
+            kwargs["password"] = await asyncio.to_thread(db._lakebase_password)
+            return await super().connect(conninfo, **kwargs)
+
+    return _LakebaseConnection
+
+
+async def _configure_lakebase(conn):
+    await conn.set_autocommit(True)
+    if db.ANDON_SCHEMA:
+        await conn.execute(f'SET search_path TO "{db.ANDON_SCHEMA}"')
+    await conn.set_autocommit(False)
+
+
+class _SQLitePool:
+    """Fixed-size pool of aiosqlite connections handed out through an asyncio.Queue."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._created = 0
+        self._idle = asyncio.Queue()
+        self._all = []
+
+    async def _open(self):
+        import aiosqlite
+
+        conn = await aiosqlite.connect(db.DB_PATH)
+        conn.row_factory = sqlite3.Row
+        await conn.execute("PRAGMA busy_timeout=5000")
+        self._all.append(conn)
+        return conn
+
+    async def acquire(self):
+        if self._idle.empty() and self._created < self._size:
+            self._created += 1
+            return await self._open()
+        return await self._idle.get()
+
+    def release(self, conn):
+        self._idle.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._all:
+            await conn.close()
+        self._all.clear()
+
+
+async def _get_pool():
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is not None:
+        return pool
+    if db.IS_LAKEBASE:
+        _, psycopg_pool = db._require_psycopg()
+        from psycopg.rows import dict_row
+
+        pool = psycopg_pool.AsyncConnectionPool(
+            kwargs={
+                "host": PG_HOST,
+                "port": PG_PORT,
+                "dbname": PG_DATABASE,
+                "user": PG_USER,
+                "sslmode": PG_SSLMODE,
+                "application_name": PG_APPNAME,
+                "row_factory": dict_row,
+            },
+            connection_class=_lakebase_connection_class(),
+            configure=_configure_lakebase,
+            min_size=1,
+            max_size=DB_ASYNC_POOL_SIZE,
+            max_lifetime=_LAKEBASE_MAX_LIFETIME,
+            open=False,
+        )
+        await pool.open()
+    else:
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError as e:  # pragma: no cover - handled at runtime if missing
+            raise RuntimeError("aiosqlite is required for async SQLite access.") from e
+        pool = _SQLitePool(DB_ASYNC_POOL_SIZE)
+    _pools[loop] = pool
+    return pool
+
+
+class _connection:
+    """`async with _connection() as conn:` borrows a pooled connection for one statement."""
+
+    async def __aenter__(self):
+        self._pool = await _get_pool()
+        if db.IS_LAKEBASE:
+            self._ctx = self._pool.connection()
+            return await self._ctx.__aenter__()
+        self._conn = await self._pool.acquire()
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if db.IS_LAKEBASE:
+            return await self._ctx.__aexit__(exc_type, exc, tb)
+        if exc_type is not None:
+            await self._conn.rollback()
+        self._pool.release(self._conn)
+        return False
+
+
+async def close_pool():
+    """Close the pool bound to the running event loop."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+# --- Primitives ---
+
+async def read_df(query: str, params: Optional[Iterable[Any]] = None) -> pd.DataFrame:
+    async with _connection() as conn:
+        cur = await conn.execute(db._prepare_query(query), db._normalize_params(params))
+        rows = await cur.fetchall()
+        columns = [col[0] for col in cur.description]
+    records = [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in rows]
+    return db._coerce_types(pd.DataFrame(records, columns=columns))
+
+
+async def fetch_one(query: str, params: Optional[Iterable[Any]] = None):
+    async with _connection() as conn:
+        cur = await conn.execute(db._prepare_query(query), db._normalize_params(params))
+        row = await cur.fetchone()
+    return row
+
+
+async def execute(query: str, params: Optional[Iterable[Any]] = None):
+    async with _connection() as conn:
+        await conn.execute(db._prepare_query(query), db._normalize_params(params))
+        await conn.commit()
+
+
+async def execute_returning_id(query: str, params: Optional[Iterable[Any]] = None) -> Any:
+    sql = db._prepare_query(query)
+    if db.IS_LAKEBASE and "returning" not in sql.lower():
+        sql = sql.rstrip().rstrip(";") + " RETURNING id"
+    async with _connection() as conn:
+        cur = await conn.execute(sql, db._normalize_params(params))
+        if db.IS_LAKEBASE:
+            new_id = (await cur.fetchone())["id"]
+        else:
+            new_id = cur.lastrowid
+        await conn.commit()
+    return new_id
+
+
+async def executemany(query: str, seq_of_params: Iterable[Iterable[Any]]):
+    normalized = [db._normalize_params(params) for params in seq_of_params]
+    async with _connection() as conn:
+        if db.IS_LAKEBASE:
+            async with conn.cursor() as cur:
+                await cur.executemany(db._prepare_query(query), normalized)
+        else:
+            await conn.executemany(db._prepare_query(query), normalized)
+        await conn.commit()
+
+
+# --- Helpers (same names and results as db.py) ---
+
+async def get_lines():
+    return await read_df(db._SQL_LINES)
+
+async def get_machines(line_id=None):
+    query, params = db._bind(db._SQL_MACHINES, line_id=line_id)
+    return await read_df(query, params)
+
+async def get_operators():
+    return await read_df(db._SQL_OPERATORS)
+
+async def get_downtime_reasons():
+    return await read_df(db._SQL_DOWNTIME_REASONS)
+
+async def get_quality_reasons():
+    return await read_df(db._SQL_QUALITY_REASONS)
+
+async def create_downtime_event(machine_id, line_id, work_order_id, operator_id, reason_id, notes=""):
+    start_time = datetime.now().isoformat()
+    return await execute_returning_id(
+        db._SQL_CREATE_DOWNTIME_EVENT,
+        (machine_id, line_id, work_order_id, operator_id, reason_id, start_time, notes),
+    )
+
+async def close_downtime_event(event_id):
+    end_time = datetime.now().isoformat()
+    await execute(db._SQL_CLOSE_DOWNTIME_EVENT, (end_time, end_time, event_id))
+
+async def acknowledge_downtime_event(event_id, technician_id):
+    now = datetime.now().isoformat()
+    await execute(db._SQL_ACKNOWLEDGE_DOWNTIME_EVENT, (technician_id, now, event_id))
+
+async def resolve_downtime_event(event_id, resolution_notes):
+    end_time = datetime.now().isoformat()
+    await execute(db._SQL_RESOLVE_DOWNTIME_EVENT, (end_time, end_time, resolution_notes, event_id))
+
+async def get_active_maintenance_events():
+    return await read_df(db._SQL_ACTIVE_MAINTENANCE_EVENTS)
+
+async def get_active_downtime_event(machine_id):
+    return await fetch_one(db._SQL_ACTIVE_DOWNTIME_EVENT, (machine_id,))
+
+async def log_quality_event(machine_id, line_id, work_order_id, operator_id, reason_id, quantity, notes=""):
+    timestamp = datetime.now().isoformat()
+    await execute(
+        db._SQL_LOG_QUALITY_EVENT,
+        (machine_id, line_id, work_order_id, operator_id, reason_id, quantity, timestamp, notes),
+    )
+
+async def log_production_count(machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity=0):
+    timestamp = datetime.now().isoformat()
+    await execute(
+        db._SQL_LOG_PRODUCTION_COUNT,
+        (machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity, timestamp),
+    )
+
+async def get_downtime_summary(start_time_str, end_time_str):
+    return await read_df(db._SQL_DOWNTIME_SUMMARY, (start_time_str, end_time_str))
+
+async def get_quality_summary(start_time_str, end_time_str):
+    return await read_df(db._SQL_QUALITY_SUMMARY, (start_time_str, end_time_str))
+
+async def get_production_summary(start_time_str, end_time_str):
+    return await read_df(db._SQL_PRODUCTION_SUMMARY, (start_time_str, end_time_str))
+
+async def get_targets(line_id):
+    rows = await read_df(db._SQL_TARGETS, (line_id,))
+    return dict(zip(rows["metric_type"], rows["target_value"]))
@@ -0,0 +1,484 @@
+"""
+Process-wide columnar store of recent downtime, quality and production events.
+
+One EventStore is shared by every session (via st.cache_resource). It keeps the
+last EVENT_STORE_DAYS days of events as NumPy columns and is extended from an id
+watermark, so the database only sees small delta fetches. Each fetch re-reads the last
+EVENT_STORE_ID_OVERLAP ids below the watermark and keeps the rows it has not seen, so rows
+committed out of id order (Postgres) are still picked up. Dashboards aggregate
+with boolean masks and np.bincount instead of re-querying the event tables.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from config import EVENT_STORE_DAYS, EVENT_STORE_ID_OVERLAP, EVENT_STORE_REFRESH_SECONDS
+from db import (
+    fetch_many,
+    get_downtime_events_by_ids,
+    get_downtime_events_since,
+    get_downtime_reasons,
+    get_downtime_summary,
+    get_lines,
+    get_machines,
+    get_operators,
+    get_production_counts_since,
+    get_production_summary,
+    get_quality_events_since,
+    get_quality_reasons,
+    get_quality_summary,
+)
+
+# Column layouts (name -> NumPy dtype). Missing IDs are stored as -1, open end times as NaT.
+DOWNTIME_COLUMNS = {
+    "id": "int64",
+    "machine_id": "int32",
+    "line_id": "int32",
+    "reason_id": "int32",
+    "operator_id": "int32",
+    "start_time": "datetime64[ms]",
+    "end_time": "datetime64[ms]",
+}
+QUALITY_COLUMNS = {
+    "id": "int64",
+    "machine_id": "int32",
+    "line_id": "int32",
+    "work_order_id": "int32",
+    "reason_id": "int32",
+    "quantity": "int64",
+    "timestamp": "datetime64[ms]",
+}
+PRODUCTION_COLUMNS = {
+    "id": "int64",
+    "machine_id": "int32",
+    "line_id": "int32",
+    "work_order_id": "int32",
+    "good_quantity": "int64",
+    "timestamp": "datetime64[ms]",
+}
+
+_MINUTE = np.timedelta64(60, "s")
+# Process-wide cache counters (exported by metrics.py); plain increments, approximate under threads.
+_cache_counts = Counter(aggregate_hit=0, aggregate_miss=0, window_hit=0, window_miss=0)
+_NAMES_TTL_SECONDS = 60
+
+
+def _empty(layout: dict) -> dict:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in layout.items()}
+
+
+def _to_columns(df: pd.DataFrame, layout: dict) -> dict:
+    """Convert a typed _read_df frame into NumPy columns."""
+    cols = {}
+    for name, dtype in layout.items():
+        if dtype.startswith("datetime64"):
+            cols[name] = df[name].to_numpy(dtype=dtype)
+        else:
+            missing = -1 if name == "id" or name.endswith("_id") else 0
+            cols[name] = df[name].to_numpy(dtype=dtype, na_value=missing)
+    return cols
+
+
+def _concat(cols: dict, new: dict) -> dict:
+    return {name: np.concatenate([cols[name], new[name]]) for name in cols}
+
+
+def _take(cols: dict, selector) -> dict:
+    return {name: values[selector] for name, values in cols.items()}
+
+
+def _unseen(cols: dict, new: dict) -> dict:
+    """Rows of `new` whose id is not in `cols` (whose ids are sorted)."""
+    ids = cols["id"]
+    if ids.size == 0 or new["id"].size == 0:
+        return new
+    pos = np.minimum(np.searchsorted(ids, new["id"]), ids.size - 1)
+    return _take(new, ids[pos] != new["id"])
+
+
+def _merge(cols: dict, new: dict) -> dict:
+    """Append `new`, keeping rows sorted by id (a late commit can land below the newest id)."""
+    merged = _concat(cols, new)
+    if cols["id"].size and new["id"].size and new["id"].min() < cols["id"][-1]:
+        merged = _take(merged, np.argsort(merged["id"], kind="stable"))
+    return merged
+
+
+def _bincount(keys: np.ndarray, weights: Optional[np.ndarray] = None):
+    """Sum `weights` (or count rows) per non-negative integer key; returns (keys present, totals)."""
+    keys = keys.astype(np.int64)
+    valid = keys >= 0
+    keys = keys[valid]
+    if keys.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    counts = np.bincount(keys)
+    present = np.flatnonzero(counts)
+    if weights is None:
+        return present, counts[present]
+    return present, np.bincount(keys, weights=weights[valid])[present]
+
+
+def _window(start: datetime, end: datetime):
+    return np.datetime64(start, "ms"), np.datetime64(end, "ms")
+
+
+# Master data needed to label aggregates: frame name -> (helper,)
+_NAME_SOURCES = {
+    "lines": (get_lines,),
+    "machines": (get_machines,),
+    "operators": (get_operators,),
+    "downtime_reasons": (get_downtime_reasons,),
+    "quality_reasons": (get_quality_reasons,),
+}
+
+
+def _names_from_frames(frames: dict) -> dict:
+    """id -> name lookups built from master data frames."""
+    def lookup(df, label="name"):
+        return dict(zip(df["id"].astype(int), df[label]))
+
+    machines = frames["machines"]
+    return {
+        "line_id": lookup(frames["lines"]),
+        "machine_line": dict(zip(machines["id"].astype(int), machines["line_id"].fillna(-1).astype(int))),
+        "machine_id": lookup(frames["machines"]),
+        "operator_id": lookup(frames["operators"]),
+        "downtime_reason_id": lookup(frames["downtime_reasons"], "description"),
+        "quality_reason_id": lookup(frames["quality_reasons"], "description"),
+    }
+
+
+def _load_names() -> dict:
+    return _names_from_frames(fetch_many(_NAME_SOURCES))
+
+
+class EventColumns:
+    """Columnar downtime / quality / production events with vectorized aggregations."""
+
+    def __init__(self, downtime=None, quality=None, production=None, names=None):
+        self.downtime = downtime if downtime is not None else _empty(DOWNTIME_COLUMNS)
+        self.quality = quality if quality is not None else _empty(QUALITY_COLUMNS)
+        self.production = production if production is not None else _empty(PRODUCTION_COLUMNS)
+        self.names = names if names is not None else {}
+        # Aggregates computed on this exact set of columns, shared until the next sync swaps them.
+        self._memo = {}
+
+    def _memoized(self, key: tuple, compute) -> pd.DataFrame:
+        df = self._memo.get(key)
+        if df is None:
+            _cache_counts["aggregate_miss"] += 1
+            df = self._memo[key] = compute()
+        else:
+            _cache_counts["aggregate_hit"] += 1
+        return df.copy()
+
+    @classmethod
+    def from_db(cls, start: datetime, end: datetime) -> "EventColumns":
+        """Load one window straight from the database (for ranges older than the store)."""
+        start_str, end_str = start.isoformat(), end.isoformat()
+        frames = fetch_many({
+            "downtime": (get_downtime_summary, start_str, end_str),
+            "quality": (get_quality_summary, start_str, end_str),
+            "production": (get_production_summary, start_str, end_str),
+            **_NAME_SOURCES,
+        })
+        return cls(
+            downtime=_to_columns(frames["downtime"], DOWNTIME_COLUMNS),
+            quality=_to_columns(frames["quality"], QUALITY_COLUMNS),
+            production=_to_columns(frames["production"], PRODUCTION_COLUMNS),
+            names=_names_from_frames(frames),
+        )
+
+    @classmethod
+    def from_history(cls, start: datetime, end: datetime) -> "EventColumns":
+        """Like from_db, but scanned by the DuckDB analytics engine when it is available."""
+        import analytics  # optional engine; imported only for historical windows
+
+        if analytics.is_available():
+            try:
+                frames = {**analytics.event_frames(start, end), **fetch_many(_NAME_SOURCES)}
+                return cls(
+                    downtime=_to_columns(frames["downtime"], DOWNTIME_COLUMNS),
+                    quality=_to_columns(frames["quality"], QUALITY_COLUMNS),
+                    production=_to_columns(frames["production"], PRODUCTION_COLUMNS),
+                    names=_names_from_frames(frames),
+                )
+            except Exception as e:
+                print(f"Analytics: history load failed, reading the database directly ({e})")
+        return cls.from_db(start, end)
+
+    # --- Aggregations ---
+
+    def _label(self, df: pd.DataFrame, key: str, column: str, lookup: Optional[str] = None) -> pd.DataFrame:
+        df[column] = df[key].map(self.names.get(lookup or key, {}))
+        return df
+
+    def downtime_by(self, key: str, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        """Downtime minutes inside [start, end] and event count per `key` (machine_id, line_id, reason_id)."""
+        cols = self.downtime
+        w_start, w_end = _window(start, end)
+        now = np.datetime64(datetime.now(), "ms")
+        starts, ends = cols["start_time"], cols["end_time"]
+        is_open = np.isnat(ends)
+
+        mask = (starts <= w_end) & (is_open | (ends >= w_start))
+        if line_id is not None:
+            mask &= cols["line_id"] == int(line_id)
+
+        # Open events run until now (capped at the window end); closed ones are clipped to the window.
+        clipped_end = np.where(is_open, min(now, w_end), np.minimum(ends, w_end))
+        minutes = np.clip((clipped_end - np.maximum(starts, w_start)) / _MINUTE, 0, None)
+
+        keys = cols[key][mask]
+        ids, total = _bincount(keys, minutes[mask])
+        _, count = _bincount(keys)
+        return pd.DataFrame({key: ids, "downtime_min": total, "events": count.astype(np.int64)})
+
+    def quantity_by(self, kind: str, key: str, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        """Scrap (kind="scrap") or good (kind="good") quantity inside [start, end] per `key`."""
+        if kind == "scrap":
+            cols, qty_col = self.quality, "quantity"
+        else:
+            cols, qty_col = self.production, "good_quantity"
+        w_start, w_end = _window(start, end)
+        ts = cols["timestamp"]
+        mask = (ts >= w_start) & (ts <= w_end)
+        if line_id is not None:
+            mask &= cols["line_id"] == int(line_id)
+        ids, total = _bincount(cols[key][mask], cols[qty_col][mask])
+        return pd.DataFrame({key: ids, kind: total.astype(np.int64)})
+
+    def _combined(self, key: str, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        df = self.downtime_by(key, start, end, line_id)
+        for kind in ("scrap", "good"):
+            df = df.merge(self.quantity_by(kind, key, start, end, line_id), on=key, how="outer")
+        df = df.fillna(0)
+        return df.astype({"events": np.int64, "scrap": np.int64, "good": np.int64})
+
+    def machine_summary(self, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        """Per-machine downtime minutes, downtime events, scrap and good quantity."""
+        return self._memoized(
+            ("machine_summary", start, end, line_id),
+            lambda: self._label(self._combined("machine_id", start, end, line_id), "machine_id", "machine_name"),
+        )
+
+    def line_totals(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """Per-line downtime minutes, scrap and good quantity (SQDC inputs)."""
+        return self._memoized(
+            ("line_totals", start, end),
+            lambda: self._label(self._combined("line_id", start, end), "line_id", "line_name"),
+        )
+
+    def downtime_pareto(self, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        df = self.downtime_by("reason_id", start, end, line_id)
+        df = self._label(df, "reason_id", "reason_description", "downtime_reason_id")
+        return df.sort_values("downtime_min", ascending=False)
+
+    def scrap_pareto(self, start: datetime, end: datetime, line_id=None) -> pd.DataFrame:
+        df = self.quantity_by("scrap", "reason_id", start, end, line_id)
+        df = self._label(df, "reason_id", "reason_description", "quality_reason_id")
+        return df.sort_values("scrap", ascending=False)
+
+    def open_downtime_machines(self) -> set:
+        """Machines with a downtime event that has not ended."""
+        cols = self.downtime
+        return set(cols["machine_id"][np.isnat(cols["end_time"])].tolist())
+
+    def recent_downtime(self, machine_id, limit: int = 10) -> pd.DataFrame:
+        """Latest downtime events for a machine (same columns the Operator Panel shows)."""
+        cols = self.downtime
+        idx = np.flatnonzero(cols["machine_id"] == int(machine_id))
+        idx = idx[np.argsort(cols["start_time"][idx], kind="stable")[::-1][:limit]]
+        rows = _take(cols, idx)
+        df = pd.DataFrame({
+            "start_time": rows["start_time"],
+            "duration_minutes": (rows["end_time"] - rows["start_time"]) / _MINUTE,
+            "reason_id": rows["reason_id"],
+            "operator_id": rows["operator_id"],
+        })
+        df = self._label(df, "reason_id", "reason_description", "downtime_reason_id")
+        df = self._label(df, "operator_id", "operator_name")
+        return df[["start_time", "duration_minutes", "reason_description", "operator_name"]]
+
+    def recent_quality(self, machine_id, limit: int = 10) -> pd.DataFrame:
+        """Latest quality events for a machine."""
+        cols = self.quality
+        idx = np.flatnonzero(cols["machine_id"] == int(machine_id))
+        idx = idx[np.argsort(cols["timestamp"][idx], kind="stable")[::-1][:limit]]
+        rows = _take(cols, idx)
+        df = pd.DataFrame({
+            "timestamp": rows["timestamp"],
+            "quantity": rows["quantity"],
+            "reason_id": rows["reason_id"],
+        })
+        df = self._label(df, "reason_id", "reason_description", "quality_reason_id")
+        return df[["timestamp", "quantity", "reason_description"]]
+
+
+class EventStore(EventColumns):
+    """EventColumns kept current for the last `days` days by id-watermarked delta fetches."""
+
+    def __init__(self, days: int = EVENT_STORE_DAYS):
+        super().__init__()
+        self.days = days
+        self.horizon: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._synced_at = 0.0
+        self._names_at = 0.0
+        self._watermarks = {"downtime": 0, "quality": 0, "production": 0}
+        # Bumped whenever the memoized aggregates are dropped, so warmers know to recompute.
+        self.generation = 0
+
+    def covers(self, start: datetime) -> bool:
+        """True if a window starting at `start` is fully held in memory."""
+        return self.horizon is not None and start >= self.horizon
+
+    def sync(self, max_age: float = EVENT_STORE_REFRESH_SECONDS) -> "EventStore":
+        """Fetch rows added since the last sync and re-read events that were still open."""
+        if time.monotonic() - self._synced_at < max_age:
+            return self
+        with self._lock:
+            # Another session may have synced while we waited for the lock.
+            if time.monotonic() - self._synced_at < max_age:
+                return self
+            self._sync()
+        return self
+
+    def _rescan_from(self, table: str) -> int:
+        """Fetch ids above this: the watermark minus an overlap for rows that committed late."""
+        return max(self._watermarks[table] - EVENT_STORE_ID_OVERLAP, 0)
+
+    def _sync(self):
+        horizon = datetime.combine(datetime.now().date() - timedelta(days=self.days), datetime.min.time())
+        since = horizon.isoformat()
+        cutoff = np.datetime64(horizon, "ms")
+
+        # Downtime: pick up end times of open events, then append new rows.
+        downtime = self.downtime
+        closed = False
+        open_ids = downtime["id"][np.isnat(downtime["end_time"])]
+        if open_ids.size:
+            updated = _to_columns(get_downtime_events_by_ids(open_ids.tolist()), DOWNTIME_COLUMNS)
+            closed = bool((~np.isnat(updated["end_time"])).any())
+            if closed:
+                downtime = {name: values.copy() for name, values in downtime.items()}
+                positions = np.searchsorted(downtime["id"], updated["id"])
+                downtime["end_time"][positions] = updated["end_time"]
+        new_downtime = _unseen(downtime, _to_columns(
+            get_downtime_events_since(self._rescan_from("downtime"), since), DOWNTIME_COLUMNS
+        ))
+        downtime = _merge(downtime, new_downtime)
+        downtime = _take(downtime, np.isnat(downtime["end_time"]) | (downtime["end_time"] >= cutoff))
+
+        new_quality = _unseen(self.quality, _to_columns(
+            get_quality_events_since(self._rescan_from("quality"), since), QUALITY_COLUMNS
+        ))
+        quality = _merge(self.quality, new_quality)
+        quality = _take(quality, quality["timestamp"] >= cutoff)
+
+        new_production = _unseen(self.production, _to_columns(
+            get_production_counts_since(self._rescan_from("production"), since), PRODUCTION_COLUMNS
+        ))
+        production = _merge(self.production, new_production)
+        production = _take(production, production["timestamp"] >= cutoff)
+
+        # Rows only leave the window when the horizon moves (a new day).
+        changed = (
+            closed
+            or horizon != self.horizon
+            or any(new["id"].size for new in (new_downtime, new_quality, new_production))
+        )
+
+        for table, new in (("downtime", new_downtime), ("quality", new_quality), ("production", new_production)):
+            if new["id"].size:
+                self._watermarks[table] = max(self._watermarks[table], int(new["id"].max()))
+
+        names = self.names
+        unknown_machine = not set(np.unique(new_downtime["machine_id"])).issubset(names.get("machine_id", {}))
+        if unknown_machine or time.monotonic() - self._names_at > _NAMES_TTL_SECONDS:
+            names = _load_names()
+            self._names_at = time.monotonic()
+            changed = changed or names != self.names
+
+        # Swap in complete snapshots; readers holding the old dicts keep a consistent view.
+        self.downtime, self.quality, self.production, self.names = downtime, quality, production, names
+        # Memoized aggregates stay valid until the columns change. Open downtime grows with the
+        # clock, so while any is open they are refreshed every sync (warm_cache recomputes them).
+        if changed or np.isnat(downtime["end_time"]).any():
+            self._memo = {}
+            self.generation += 1
+        self.horizon = horizon
+        self._synced_at = time.monotonic()
+
+    # --- Snapshot state (see warm_cache.py) ---
+
+    def state(self) -> dict:
+        """Columns, names and watermarks as of the last sync, for writing a snapshot."""
+        with self._lock:
+            return {
+                "downtime": self.downtime,
+                "quality": self.quality,
+                "production": self.production,
+                "names": self.names,
+                "horizon": self.horizon,
+                "watermarks": dict(self._watermarks),
+            }
+
+    def restore(self, state: dict, names_current: bool) -> bool:
+        """
+        Adopt a validated snapshot before the first sync; that sync then only fetches rows
+        past the restored watermarks and re-reads events that were still open.
+        """
+        with self._lock:
+            if self.horizon is not None:
+                return False
+            self.downtime, self.quality, self.production = state["downtime"], state["quality"], state["production"]
+            self.names = state["names"]
+            self._watermarks = dict(state["watermarks"])
+            self.horizon = state["horizon"]
+            # Stale master data is reloaded on the first sync.
+            self._names_at = time.monotonic() if names_current else 0.0
+            self._memo = {}
+            self.generation += 1
+            return True
+
+
+@st.cache_resource
+def get_event_store() -> EventStore:
+    """
+    The process-wide event store shared by all sessions, restored and warmed at creation.
+    The /metrics endpoint and the SQDC snapshot scheduler, which read from this store, start with it,
+    as does the write queue replay, so pages opened directly (without app.py) still drain the journal.
+    """
+    from metrics import start_server
+    from sqdc_snapshots import start_scheduler
+    from warm_cache import start_warmup
+    from write_queue import start_worker
+
+    store = EventStore(EVENT_STORE_DAYS)
+    start_warmup(store)
+    start_server()
+    start_scheduler()
+    start_worker()
+    return store
+
+
+def events_for_window(start: datetime, end: datetime) -> EventColumns:
+    """Store-backed events when the window lies within the store horizon, else a one-off DB load."""
+    store = get_event_store().sync()
+    if store.covers(start):
+        _cache_counts["window_hit"] += 1
+        return store
+    _cache_counts["window_miss"] += 1
+    return EventColumns.from_db(start, end)
+
+
+def cache_counts() -> dict:
+    """Hit / miss counts of the aggregate memo and of windows served by the store."""
+    return dict(_cache_counts)
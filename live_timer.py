@@ -0,0 +1,86 @@
+"""
+Downtime timers that tick in the browser.
+
+An elapsed-time readout computed in the page script is frozen until the next rerun, and
+rerunning every few seconds to move it costs a snapshot query per tablet. These helpers
+render a tiny HTML component that carries only the event's start instant (epoch ms) and
+counts up with `setInterval`, so a live timer costs no server work after the first render:
+
+    live_timer.elapsed(active_downtime["start_time"])                 # metric-style, Operator Panel
+    live_timer.elapsed(row["start_time"], label="Down for", compact=True)  # card line, Maintenance View
+
+Larger boards embed `live_timer.span(start_time)` in their own markup and pass it to
+`live_timer.render(body, height)`, so one iframe and one interval drive every timer on it.
+
+The HTML depends only on the start time, so reruns that leave the event unchanged keep the
+same iframe (and its running timer) instead of reloading it. Naive timestamps (strings,
+datetimes or the pandas Timestamps _read_df returns) are taken as server-local time, which is
+how db.py writes them.
+"""
+import html
+from datetime import datetime
+from typing import Optional, Union
+
+import pandas as pd
+import streamlit.components.v1 as components
+
+_HEIGHT = 72
+_COMPACT_HEIGHT = 28
+
+# Fills every [data-start] element with the time elapsed since its epoch-ms start.
+_TICK_SCRIPT = """
+<script>
+  const pad = (n) => String(n).padStart(2, "0");
+  const timers = document.querySelectorAll("[data-start]");
+  function tick() {
+    const now = Date.now();
+    for (const el of timers) {
+      const s = Math.max(0, Math.floor((now - Number(el.dataset.start)) / 1000));
+      const d = Math.floor(s / 86400), h = Math.floor(s / 3600) % 24;
+      el.textContent = (d ? d + "d " : "") + pad(h) + ":" + pad(Math.floor(s / 60) % 60) + ":" + pad(s % 60);
+    }
+  }
+  tick();
+  setInterval(tick, 1000);
+</script>
+"""
+
+
+def _epoch_ms(start_time: Union[str, datetime]) -> int:
+    # pd.Timestamp.timestamp() reads a naive value as UTC; datetime.timestamp() as local time.
+    start_time = pd.Timestamp(start_time).to_pydatetime()
+    return int(start_time.timestamp() * 1000)
+
+
+def span(start_time: Union[str, datetime], style: str = "") -> str:
+    """Markup for one timer; only ticks inside `render()`."""
+    return (
+        f'<span data-start="{_epoch_ms(start_time)}" '
+        f'style="font-variant-numeric: tabular-nums; {style}">--:--:--</span>'
+    )
+
+
+def render(body: str, height: int) -> None:
+    """Render `body` in one component iframe with all of its timers ticking."""
+    components.html(body + _TICK_SCRIPT, height=height)
+
+
+def elapsed(
+    start_time: Union[str, datetime],
+    label: str = "Elapsed Time",
+    compact: bool = False,
+    color: Optional[str] = None,
+) -> None:
+    """Render a HH:MM:SS counter from `start_time` that updates client-side every second."""
+    color = color or "#31333F"
+    if compact:
+        layout = "display: flex; gap: 0.4em; align-items: baseline;"
+        label_style, value_style = "font-size: 1rem; font-weight: 600;", "font-size: 1rem;"
+    else:
+        layout = "display: flex; flex-direction: column;"
+        label_style, value_style = "font-size: 0.875rem;", "font-size: 2.25rem;"
+    body = (
+        f"<div style=\"font-family: 'Source Sans Pro', sans-serif; color: {color}; {layout}\">"
+        f'<span style="{label_style}">{html.escape(label)}</span>{span(start_time, value_style)}</div>'
+    )
+    render(body, _COMPACT_HEIGHT if compact else _HEIGHT)
@@ -0,0 +1,216 @@
+"""
+Prometheus text-format metrics endpoint, served next to Streamlit.
+
+A small stdlib HTTP server (one per process, started with the event store) answers
+GET /metrics with:
+- app internals: query latency histograms, Lakebase pool usage, cache hit counters,
+  active Streamlit sessions and page run durations;
+- plant KPIs per line and machine: current state, downtime minutes, good and scrap counts
+  for today.
+
+KPIs come from the shared event store's memoized aggregates and are recomputed at most
+every METRICS_KPI_SECONDS. A recompute syncs the store, which runs its small id-watermarked
+delta queries unless a page synced it recently; scrapes in between are served from the
+cached text, so database load does not grow with how often Grafana polls.
+"""
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import event_store
+import page_profiler
+import query_stats
+import write_queue
+from config import METRICS_HOST, METRICS_KPI_SECONDS, METRICS_PORT
+from db import pool_stats
+
+_started = False
+_start_lock = threading.Lock()
+_kpi_lock = threading.Lock()
+_kpi_text = ""
+_kpi_at = 0.0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Writer:
+    """Accumulates exposition lines, writing HELP / TYPE once per metric family."""
+
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {value}")
+
+    def histogram(self, name: str, help_text: str, buckets: list, sum_ms: float, count: int, **labels):
+        """A histogram from per-bucket counts in query_stats.BUCKETS_MS (exported in seconds)."""
+        self.declare(name, "histogram", help_text)
+        cumulative = 0
+        for bound, bucket_count in zip(query_stats.BUCKETS_MS, buckets):
+            cumulative += bucket_count
+            self.sample(f"{name}_bucket", cumulative, **labels, le=f"{bound / 1000:g}")
+        self.sample(f"{name}_bucket", count, **labels, le="+Inf")
+        self.sample(f"{name}_sum", round(sum_ms / 1000, 6), **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _session_count():
+    """Active Streamlit sessions, or None outside a Streamlit server (internal API)."""
+    try:
+        from streamlit.runtime import get_instance
+
+        return get_instance()._session_mgr.num_active_sessions()
+    except Exception:  # noqa: BLE001 - not all Streamlit versions expose this
+        return None
+
+
+def _internals() -> str:
+    out = _Writer()
+    for name, (buckets, sum_ms, count) in sorted(query_stats.histograms().items()):
+        out.histogram("andon_query_duration_seconds", "Database query latency by statement.", buckets, sum_ms, count, query=name)
+    out.declare("andon_query_errors_total", "counter", "Queries that raised, by statement.")
+    for row in query_stats.summary():
+        out.sample("andon_query_errors_total", row["errors"], query=row["query"])
+
+    for pool in pool_stats():
+        out.declare("andon_db_pool_connections", "gauge", "Lakebase pool connections by state.")
+        out.sample("andon_db_pool_connections", pool["size"], pool=pool["pool"], state="open")
+        out.sample("andon_db_pool_connections", pool["available"], pool=pool["pool"], state="idle")
+        out.declare("andon_db_pool_waiting", "gauge", "Requests waiting for a pooled connection.")
+        out.sample("andon_db_pool_waiting", pool["waiting"], pool=pool["pool"])
+
+    out.declare("andon_cache_requests_total", "counter", "Event store cache lookups by result.")
+    for key, count in sorted(event_store.cache_counts().items()):
+        cache, result = key.rsplit("_", 1)
+        out.sample("andon_cache_requests_total", count, cache=cache, result=result)
+
+    sessions = _session_count()
+    if sessions is not None:
+        out.declare("andon_sessions", "gauge", "Active Streamlit sessions.")
+        out.sample("andon_sessions", sessions)
+
+    queue = write_queue.stats()
+    out.declare("andon_write_queue_entries", "gauge", "Journaled operator writes by status.")
+    out.sample("andon_write_queue_entries", queue["pending"], status="pending")
+    out.sample("andon_write_queue_entries", queue["failed"], status="failed")
+    out.declare("andon_write_queue_oldest_pending_seconds", "gauge", "Age of the oldest operator write not yet in the database.")
+    out.sample("andon_write_queue_oldest_pending_seconds", queue["oldest_pending_seconds"])
+
+    for page, (buckets, sum_ms, count) in sorted(page_profiler.run_histograms().items()):
+        out.histogram("andon_page_run_duration_seconds", "Streamlit script run duration by page.", buckets, sum_ms, count, page=page)
+    return out.text()
+
+
+def _kpis() -> str:
+    """Per-line and per-machine KPIs for today from the shared event store."""
+    store = event_store.get_event_store().sync(max_age=METRICS_KPI_SECONDS)
+    now = datetime.now()
+    start = datetime.combine(now.date(), datetime.min.time())
+    end = datetime.combine(now.date(), datetime.max.time())
+    names = store.names
+    line_names = names.get("line_id", {})
+    machine_names = names.get("machine_id", {})
+    machine_line = names.get("machine_line", {})
+    down = store.open_downtime_machines()
+
+    out = _Writer()
+    out.declare("andon_machine_down", "gauge", "1 while the machine has an open downtime event.")
+    for machine_id, machine in sorted(machine_names.items()):
+        line = line_names.get(machine_line.get(machine_id), "")
+        out.sample("andon_machine_down", int(machine_id in down), line=line, machine=machine)
+
+    machines = store.machine_summary(start, end)
+    for metric, column, help_text in (
+        ("andon_machine_downtime_minutes_today", "downtime_min", "Downtime minutes today per machine."),
+        ("andon_machine_good_today", "good", "Good quantity today per machine."),
+        ("andon_machine_scrap_today", "scrap", "Scrap quantity today per machine."),
+    ):
+        out.declare(metric, "gauge", help_text)
+        for machine_id, value in zip(machines["machine_id"], machines[column]):
+            line = line_names.get(machine_line.get(int(machine_id)), "")
+            out.sample(metric, round(float(value), 2), line=line, machine=machine_names.get(int(machine_id), machine_id))
+
+    lines = store.line_totals(start, end)
+    for metric, column, help_text in (
+        ("andon_line_downtime_minutes_today", "downtime_min", "Downtime minutes today per line."),
+        ("andon_line_good_today", "good", "Good quantity today per line."),
+        ("andon_line_scrap_today", "scrap", "Scrap quantity today per line."),
+    ):
+        out.declare(metric, "gauge", help_text)
+        for line_id, value in zip(lines["line_id"], lines[column]):
+            out.sample(metric, round(float(value), 2), line=line_names.get(int(line_id), line_id))
+
+    out.declare("andon_kpi_computed_timestamp_seconds", "gauge", "When the KPI block was computed.")
+    out.sample("andon_kpi_computed_timestamp_seconds", round(time.time(), 3))
+    return out.text()
+
+
+def _cached_kpis() -> str:
+    global _kpi_text, _kpi_at
+    with _kpi_lock:
+        if time.monotonic() - _kpi_at >= METRICS_KPI_SECONDS:
+            _kpi_text = _kpis()
+            _kpi_at = time.monotonic()
+        return _kpi_text
+
+
+def render() -> str:
+    """The full /metrics body."""
+    return _internals() + _cached_kpis()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = render().encode()
+        except Exception as e:  # noqa: BLE001 - report, do not kill the server thread
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the Streamlit log.
+        pass
+
+
+def start_server():
+    """Serve /metrics on METRICS_HOST:METRICS_PORT once per process (no-op when the port is 0)."""
+    global _started
+    with _start_lock:
+        if _started or not METRICS_PORT:
+            return
+        _started = True
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), _Handler)
+    except OSError as e:
+        # E.g. a second app process on the same host; metrics stay with the first one.
+        print(f"Metrics endpoint not started on port {METRICS_PORT}: {e}")
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="andon-metrics", daemon=True).start()
@@ -0,0 +1,19 @@
+-- 0002 indexes for the operator and dashboard hot paths (Postgres / Lakebase)
+-- migrate: no-transaction
+-- CONCURRENTLY builds do not block operator writes, but cannot run inside a
+-- transaction, so each statement is applied on its own.
+
+-- Active downtime per machine (Operator Panel) and open events (Maintenance View).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_downtime_events_machine_open
+    ON downtime_events (machine_id, start_time) WHERE end_time IS NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_downtime_events_start_time ON downtime_events (start_time);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_downtime_events_end_time ON downtime_events (end_time);
+
+-- Time-window summaries and shift totals.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quality_events_timestamp ON quality_events (timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_production_counts_timestamp ON production_counts (timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_safety_incidents_line_date ON safety_incidents (line_id, date);
+
+-- Filtered master / workflow lists.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_line_status ON work_orders (line_id, status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_actions_status ON actions (status, timestamp);
@@ -0,0 +1,176 @@
+-- 0001 initial schema (SQLite)
+-- Every statement is idempotent (IF NOT EXISTS) so databases created before
+-- versioned migrations are adopted without changes.
+
+-- 3.1 lines
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+
+-- 3.2 machines
+CREATE TABLE IF NOT EXISTS machines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    line_id INTEGER,
+    description TEXT,
+    FOREIGN KEY (line_id) REFERENCES lines(id)
+);
+
+-- 3.3 operators
+CREATE TABLE IF NOT EXISTS operators (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    badge_id TEXT
+);
+
+-- 3.4 work_orders
+CREATE TABLE IF NOT EXISTS work_orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    wo_number TEXT NOT NULL,
+    part_number TEXT,
+    target_quantity INTEGER,
+    due_date TEXT,
+    line_id INTEGER,
+    status TEXT DEFAULT 'Scheduled',
+    start_date TEXT,
+    completed_date TEXT,
+    FOREIGN KEY (line_id) REFERENCES lines(id)
+);
+
+-- 3.5 downtime_reasons
+CREATE TABLE IF NOT EXISTS downtime_reasons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT
+);
+
+-- 3.6 quality_reasons
+CREATE TABLE IF NOT EXISTS quality_reasons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT
+);
+
+-- 3.7 downtime_events
+CREATE TABLE IF NOT EXISTS downtime_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_id INTEGER,
+    line_id INTEGER,
+    work_order_id INTEGER,
+    operator_id INTEGER,
+    reason_id INTEGER,
+    start_time TEXT,
+    end_time TEXT,
+    duration_minutes REAL,
+    notes TEXT,
+    technician_id INTEGER,
+    acknowledged_at TEXT,
+    resolution_notes TEXT,
+    FOREIGN KEY (machine_id) REFERENCES machines(id),
+    FOREIGN KEY (line_id) REFERENCES lines(id),
+    FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
+    FOREIGN KEY (operator_id) REFERENCES operators(id),
+    FOREIGN KEY (reason_id) REFERENCES downtime_reasons(id),
+    FOREIGN KEY (technician_id) REFERENCES operators(id)
+);
+
+-- 3.8 quality_events
+CREATE TABLE IF NOT EXISTS quality_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_id INTEGER,
+    line_id INTEGER,
+    work_order_id INTEGER,
+    operator_id INTEGER,
+    reason_id INTEGER,
+    quantity INTEGER,
+    timestamp TEXT,
+    notes TEXT,
+    FOREIGN KEY (machine_id) REFERENCES machines(id),
+    FOREIGN KEY (line_id) REFERENCES lines(id),
+    FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
+    FOREIGN KEY (operator_id) REFERENCES operators(id),
+    FOREIGN KEY (reason_id) REFERENCES quality_reasons(id)
+);
+
+-- 3.9 production_counts
+CREATE TABLE IF NOT EXISTS production_counts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_id INTEGER,
+    line_id INTEGER,
+    work_order_id INTEGER,
+    operator_id INTEGER,
+    good_quantity INTEGER,
+    scrap_quantity INTEGER DEFAULT 0,
+    timestamp TEXT,
+    FOREIGN KEY (machine_id) REFERENCES machines(id),
+    FOREIGN KEY (line_id) REFERENCES lines(id),
+    FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
+    FOREIGN KEY (operator_id) REFERENCES operators(id)
+);
+
+-- 3.10 safety_incidents
+CREATE TABLE IF NOT EXISTS safety_incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    line_id INTEGER,
+    date TEXT NOT NULL,
+    description TEXT,
+    FOREIGN KEY(line_id) REFERENCES lines(id)
+);
+
+-- 3.11 actions
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    line_id INTEGER,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    assigned_to INTEGER,
+    status TEXT NOT NULL,
+    resolution_notes TEXT,
+    FOREIGN KEY(line_id) REFERENCES lines(id),
+    FOREIGN KEY(assigned_to) REFERENCES operators(id)
+);
+
+-- 3.12 targets
+CREATE TABLE IF NOT EXISTS targets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    line_id INTEGER,
+    metric_type TEXT NOT NULL,
+    target_value REAL,
+    FOREIGN KEY(line_id) REFERENCES lines(id),
+    UNIQUE(line_id, metric_type)
+);
+
+-- 3.13 inspection_records
+CREATE TABLE IF NOT EXISTS inspection_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    work_order_id INTEGER,
+    line_id INTEGER,
+    inspector_id INTEGER,
+    result TEXT NOT NULL,
+    measurements TEXT,
+    timestamp TEXT,
+    notes TEXT,
+    FOREIGN KEY (work_order_id) REFERENCES work_orders(id),
+    FOREIGN KEY (line_id) REFERENCES lines(id),
+    FOREIGN KEY (inspector_id) REFERENCES operators(id)
+);
+
+-- 3.14 mrb_items
+CREATE TABLE IF NOT EXISTS mrb_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    part_number TEXT,
+    quantity INTEGER,
+    reason TEXT,
+    status TEXT DEFAULT 'Open',
+    disposition TEXT,
+    notes TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    quality_event_id INTEGER,
+    FOREIGN KEY (quality_event_id) REFERENCES quality_events(id)
+);
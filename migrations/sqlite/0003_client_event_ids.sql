@@ -0,0 +1,11 @@
+-- 0003 client-generated event ids for idempotent replay of queued operator writes (SQLite)
+
+-- Set by write_queue.py when an operator action is journaled; NULL for direct writes.
+ALTER TABLE downtime_events ADD COLUMN client_event_id TEXT;
+ALTER TABLE quality_events ADD COLUMN client_event_id TEXT;
+ALTER TABLE production_counts ADD COLUMN client_event_id TEXT;
+
+-- Replays insert with ON CONFLICT (client_event_id) DO NOTHING; NULLs never conflict.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_downtime_events_client_event_id ON downtime_events (client_event_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_quality_events_client_event_id ON quality_events (client_event_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_production_counts_client_event_id ON production_counts (client_event_id);
@@ -0,0 +1,6 @@
+-- 0004 standard rates for OEE performance (SQLite)
+
+-- Ideal seconds per unit on a machine; a work order's value (its part number's standard on
+-- that line) overrides it for counts logged against the order. NULL means no standard yet.
+ALTER TABLE machines ADD COLUMN ideal_cycle_seconds REAL;
+ALTER TABLE work_orders ADD COLUMN ideal_cycle_seconds REAL;
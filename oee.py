@@ -0,0 +1,306 @@
+"""
+Vectorized OEE (Overall Equipment Effectiveness) for machine x time-bucket grids.
+
+Per cell (one machine, one bucket):
+
+    planned time  = bucket length - planned downtime (reasons in the "Planned" category)
+    run time      = planned time - unplanned downtime
+    Availability  = run time / planned time
+    Performance   = ideal cycle time x (good + scrap) / run time
+    Quality       = good / (good + scrap)
+    OEE           = A x P x Q  (= ideal cycle time x good / planned time)
+
+The ideal cycle time of a unit is its work order's `ideal_cycle_seconds` (the part's
+standard) when set, else the machine's. Cells holding units with no standard have no
+Performance / OEE (NaN) rather than a silently inflated one.
+
+An OeeGrid stores the additive parts (minutes and counts), not the ratios, so grids can be
+rolled up over machines (lines, plant) or coarser buckets without averaging percentages:
+
+    grid = oee.compute(events, machine_ids, oee.bucket_edges(start, end, "1h"), oee.load_standards())
+    grid.rollup(groups=line_of_machine).resample(24).to_frame()    # daily OEE per line
+
+Downtime overlap with every bucket is found with prefix sums over sorted event boundaries
+(searchsorted), and counts with np.bincount, so 1000 machines x a year of hourly buckets
+takes seconds. `backfill()` walks long ranges in chunks straight from the database.
+"""
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from db import fetch_many, get_downtime_reasons, get_machines, get_work_orders
+
+_MS_PER_MIN = 60_000
+# Machines per block in the downtime pass; bounds the (machines x edges) temporaries.
+_MACHINE_BLOCK = 256
+
+
+class Standards(NamedTuple):
+    """Ideal cycle seconds by machine id and by work order id, and the planned reason ids."""
+    machine_cycle: dict
+    work_order_cycle: dict
+    planned_reason_ids: frozenset
+
+
+def load_standards(machines: Optional[pd.DataFrame] = None, downtime_reasons: Optional[pd.DataFrame] = None) -> Standards:
+    """Standards from the database; pass cached master data frames to skip re-reading them."""
+    calls = {"work_orders": (get_work_orders,)}
+    if machines is None:
+        calls["machines"] = (get_machines,)
+    if downtime_reasons is None:
+        calls["downtime_reasons"] = (get_downtime_reasons,)
+    frames = fetch_many(calls)
+    machines = machines if machines is not None else frames["machines"]
+    reasons = downtime_reasons if downtime_reasons is not None else frames["downtime_reasons"]
+
+    def cycles(df):
+        df = df[df["ideal_cycle_seconds"].notnull() & (df["ideal_cycle_seconds"] > 0)]
+        return dict(zip(df["id"].astype(int), df["ideal_cycle_seconds"].astype(float)))
+
+    planned = reasons.loc[reasons["category"].astype(str).str.lower() == "planned", "id"]
+    return Standards(cycles(machines), cycles(frames["work_orders"]), frozenset(planned.astype(int)))
+
+
+def bucket_edges(start: datetime, end: datetime, freq: str = "1h") -> np.ndarray:
+    """Bucket boundaries from `start` up to `end` (the last bucket may be shorter)."""
+    edges = pd.date_range(start, end, freq=freq).to_numpy(dtype="datetime64[ms]")
+    end = np.datetime64(end, "ms")
+    if edges.size == 0 or edges[-1] < end:
+        edges = np.append(edges, end)
+    return edges
+
+
+def _dense(lookup: dict, fill=np.nan) -> np.ndarray:
+    """id -> value dict as an array indexed by id (ids missing from the dict get `fill`)."""
+    size = max(lookup, default=-1) + 1
+    table = np.full(size + 1, fill, dtype=np.float64)
+    if lookup:
+        table[np.fromiter(lookup.keys(), dtype=np.int64)] = np.fromiter(lookup.values(), dtype=np.float64)
+    return table
+
+
+def _index(ids: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """Look ids up in a dense table; negative or out-of-range ids hit its last slot (the fill)."""
+    ids = ids.astype(np.int64)
+    ids = np.where((ids < 0) | (ids >= table.size - 1), table.size - 1, ids)
+    return table[ids]
+
+
+def _overlap_minutes(machine_idx, starts, ends, edges, n_machines) -> np.ndarray:
+    """
+    Minutes of [starts, ends) intervals inside each bucket, per machine: (n_machines, buckets).
+
+    With F_m(x) = sum over machine m's intervals of clip(x - start, 0, length), the time in
+    bucket [x0, x1) is F_m(x1) - F_m(x0). F is evaluated at every edge at once from prefix
+    counts and sums of the sorted starts and ends, keyed by (machine, offset) so a single
+    sorted array serves all machines.
+    """
+    origin = edges[0]
+    span = int((edges[-1] - origin) / np.timedelta64(1, "ms"))
+    offsets = ((edges - origin) / np.timedelta64(1, "ms")).astype(np.int64)
+    s = np.clip(((starts - origin) / np.timedelta64(1, "ms")).astype(np.int64), 0, span)
+    e = np.clip(((ends - origin) / np.timedelta64(1, "ms")).astype(np.int64), 0, span)
+    keep = e > s
+    m, s, e = machine_idx[keep].astype(np.int64), s[keep], e[keep]
+    width = span + 1
+
+    def prefix(values):
+        keys = m * width + values
+        order = np.argsort(keys, kind="stable")
+        sums = np.concatenate([[0], np.cumsum(values[order])])
+        return keys[order], sums
+
+    start_keys, start_sums = prefix(s)
+    end_keys, end_sums = prefix(e)
+
+    out = np.empty((n_machines, offsets.size - 1), dtype=np.float64)
+    for lo in range(0, n_machines, _MACHINE_BLOCK):
+        block = np.arange(lo, min(lo + _MACHINE_BLOCK, n_machines), dtype=np.int64)[:, None]
+        base, query = block * width, block * width + offsets[None, :]
+        f = np.zeros(query.shape, dtype=np.int64)
+        for keys, sums, sign in ((start_keys, start_sums, 1), (end_keys, end_sums, -1)):
+            first = np.searchsorted(keys, base, side="left")
+            upto = np.searchsorted(keys, query, side="left")
+            f += sign * ((upto - first) * offsets[None, :] - (sums[upto] - sums[first]))
+        out[lo:lo + block.shape[0]] = np.diff(f, axis=1) / _MS_PER_MIN
+    return out
+
+
+class OeeGrid:
+    """Additive OEE parts on a (machines or groups) x buckets grid, with derived ratios."""
+
+    PARTS = ("bucket_min", "planned_downtime_min", "unplanned_downtime_min", "good", "scrap", "ideal_min", "unrated")
+
+    def __init__(self, keys, edges, **parts):
+        self.keys = np.asarray(keys)
+        self.edges = np.asarray(edges, dtype="datetime64[ms]")
+        for name in self.PARTS:
+            setattr(self, name, parts[name])
+
+    # --- Ratios ---
+
+    @property
+    def planned_min(self) -> np.ndarray:
+        return np.clip(self.bucket_min - self.planned_downtime_min, 0, None)
+
+    @property
+    def run_min(self) -> np.ndarray:
+        return np.clip(self.planned_min - self.unplanned_downtime_min, 0, None)
+
+    @staticmethod
+    def _ratio(num, den) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(den > 0, num / den, np.nan)
+
+    @property
+    def availability(self) -> np.ndarray:
+        return self._ratio(self.run_min, self.planned_min)
+
+    @property
+    def performance(self) -> np.ndarray:
+        perf = self._ratio(self.ideal_min, self.run_min)
+        return np.where(self.unrated > 0, np.nan, perf)
+
+    @property
+    def quality(self) -> np.ndarray:
+        return self._ratio(self.good, self.good + self.scrap)
+
+    @property
+    def oee(self) -> np.ndarray:
+        # Planned time with no output at all is 0% OEE, not undefined.
+        idle = (self.good + self.scrap == 0) & (self.planned_min > 0)
+        return np.where(idle, 0.0, self.availability * self.performance * self.quality)
+
+    # --- Reshaping ---
+
+    def rollup(self, groups=None) -> "OeeGrid":
+        """Sum rows into groups: `groups` maps each key to a group (e.g. machine -> line); None = one total row."""
+        if self.keys.size == 0:
+            return OeeGrid(self.keys, self.edges, **{name: getattr(self, name) for name in self.PARTS})
+        groups = np.zeros(self.keys.size, dtype=np.int64) if groups is None else np.asarray(groups)
+        group_keys, inverse = np.unique(groups, return_inverse=True)
+        # Sort rows by group and sum each contiguous run (np.add.at is far slower on wide grids).
+        order = np.argsort(inverse, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+        parts = {name: np.add.reduceat(getattr(self, name)[order], starts, axis=0) for name in self.PARTS}
+        return OeeGrid(group_keys, self.edges, **parts)
+
+    def resample(self, every: int) -> "OeeGrid":
+        """Merge each run of `every` consecutive buckets (e.g. 24 hourly -> daily)."""
+        n = self.bucket_min.shape[1]
+        starts = np.arange(0, n, every)
+        parts = {name: np.add.reduceat(getattr(self, name), starts, axis=1) for name in self.PARTS}
+        return OeeGrid(self.keys, np.append(self.edges[starts], self.edges[-1]), **parts)
+
+    def to_frame(self, key_name: str = "machine_id") -> pd.DataFrame:
+        """Long format: one row per key and bucket, with the parts and the ratios."""
+        n_keys, n_buckets = self.bucket_min.shape
+        frame = {
+            key_name: np.repeat(self.keys, n_buckets),
+            "bucket_start": np.tile(self.edges[:-1], n_keys),
+        }
+        for name in self.PARTS:
+            frame[name] = getattr(self, name).ravel()
+        for name in ("availability", "performance", "quality", "oee"):
+            frame[name] = getattr(self, name).ravel()
+        return pd.DataFrame(frame)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, key_name: str = "machine_id") -> "OeeGrid":
+        """Rebuild a grid from `to_frame()` output (e.g. a stored backfill)."""
+        keys = np.unique(df[key_name].to_numpy())
+        starts = np.unique(df["bucket_start"].to_numpy(dtype="datetime64[ms]"))
+        row = np.searchsorted(keys, df[key_name].to_numpy())
+        col = np.searchsorted(starts, df["bucket_start"].to_numpy(dtype="datetime64[ms]"))
+        parts = {}
+        for name in cls.PARTS:
+            values = np.zeros((keys.size, starts.size), dtype=np.float64)
+            values[row, col] = df[name].to_numpy(dtype=np.float64)
+            parts[name] = values
+        # The last bucket ends after its (elapsed) length.
+        last_min = parts["bucket_min"][:, -1].max() if starts.size else 0
+        edges = np.append(starts, starts[-1:] + np.timedelta64(int(last_min * _MS_PER_MIN), "ms"))
+        return cls(keys, edges, **parts)
+
+
+def compute(events, machine_ids, edges: np.ndarray, standards: Standards, now: Optional[datetime] = None) -> OeeGrid:
+    """
+    OEE parts for `machine_ids` x the buckets between `edges`, from event columns
+    (an event_store.EventColumns, or anything with the same downtime / quality / production dicts).
+    Open downtime runs until `now`, and buckets after `now` count only the elapsed part.
+    """
+    machine_ids = np.asarray(machine_ids, dtype=np.int64)
+    edges = np.asarray(edges, dtype="datetime64[ms]")
+    n_machines, n_buckets = machine_ids.size, edges.size - 1
+    now = np.datetime64(now or datetime.now(), "ms")
+
+    # Machine id -> row (or the fill slot -1 for machines outside the grid).
+    row_of = _dense(dict(zip(machine_ids.tolist(), range(n_machines))), fill=-1)
+
+    # Elapsed minutes per bucket (future time is not planned production time yet).
+    clipped_edges = np.minimum(edges, max(now, edges[0]))
+    bucket_min = np.broadcast_to(np.diff(clipped_edges) / np.timedelta64(1, "m"), (n_machines, n_buckets)).copy()
+
+    # Downtime, split into planned and unplanned by reason.
+    dt = events.downtime
+    rows = _index(dt["machine_id"], row_of).astype(np.int64)
+    ends = np.where(np.isnat(dt["end_time"]), now, dt["end_time"])
+    planned = np.isin(dt["reason_id"], list(standards.planned_reason_ids))
+    downtime = {}
+    for name, mask in (("planned_downtime_min", planned), ("unplanned_downtime_min", ~planned)):
+        mask = mask & (rows >= 0)
+        minutes = _overlap_minutes(rows[mask], dt["start_time"][mask], ends[mask], edges, n_machines)
+        downtime[name] = np.minimum(minutes, bucket_min)
+
+    machine_cycle = _dense(standards.machine_cycle)
+    wo_cycle = _dense(standards.work_order_cycle)
+
+    def counts(cols, qty_col):
+        """(units, ideal minutes of rated units, unrated units) per cell."""
+        rows = _index(cols["machine_id"], row_of).astype(np.int64)
+        bucket = np.searchsorted(edges, cols["timestamp"], side="right") - 1
+        inside = (rows >= 0) & (bucket >= 0) & (bucket < n_buckets)
+        cell = rows[inside] * n_buckets + bucket[inside]
+        qty = cols[qty_col][inside].astype(np.float64)
+        cycle = _index(cols["work_order_id"][inside], wo_cycle)
+        cycle = np.where(np.isnan(cycle), _index(cols["machine_id"][inside], machine_cycle), cycle)
+        rated = ~np.isnan(cycle)
+        size = n_machines * n_buckets
+
+        def total(weights):
+            return np.bincount(cell, weights=weights, minlength=size).reshape(n_machines, n_buckets)
+
+        return total(qty), total(np.where(rated, qty * cycle / 60.0, 0.0)), total(np.where(rated, 0.0, qty))
+
+    good, good_ideal, good_unrated = counts(events.production, "good_quantity")
+    scrap, scrap_ideal, scrap_unrated = counts(events.quality, "quantity")
+    return OeeGrid(
+        machine_ids, edges,
+        bucket_min=bucket_min,
+        good=good,
+        scrap=scrap,
+        ideal_min=good_ideal + scrap_ideal,
+        unrated=good_unrated + scrap_unrated,
+        **downtime,
+    )
+
+
+def backfill(start: datetime, end: datetime, freq: str = "1h", chunk_days: int = 7, machine_ids=None,
+             standards: Optional[Standards] = None):
+    """
+    Yield `to_frame()` chunks covering [start, end), each loaded straight from the database
+    (EventColumns.from_db), for batch jobs that store OEE history.
+    """
+    from event_store import EventColumns
+
+    standards = standards or load_standards()
+    if machine_ids is None:
+        machine_ids = get_machines()["id"].astype(int).to_numpy()
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days), end)
+        events = EventColumns.from_db(chunk_start, chunk_end)
+        yield compute(events, machine_ids, bucket_edges(chunk_start, chunk_end, freq), standards).to_frame()
+        chunk_start = chunk_end
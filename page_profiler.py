@@ -0,0 +1,346 @@
+"""
+Opt-in render profiler for Streamlit pages.
+
+Streamlit reruns the whole page script on every interaction. This splits one run into
+named sections and records, per section, wall time, CPU time (of the script thread),
+database time (from query_stats) and the size of DataFrames handed to the frontend:
+
+    prof = page_profiler.start("Operator Panel")
+    prof.mark("master data")             # sequential top-level sections
+    with prof.section("recent downtime"):  # optional nested spans
+        st.dataframe(prof.frame(df))     # records rows / bytes sent
+    prof.finish()
+
+Profiling is on when PAGE_PROFILING is set, or for one browser session after opening a
+page with `?profile=1`. When it is off, `start()` returns a stand-in that only feeds the
+always-on run duration histogram exported by metrics.py. Profiled runs feed rolling
+per-page percentiles, a breakdown in the sidebar, and the JSON report at
+PAGE_PROFILE_REPORT. Pages whose p95 exceeds PAGE_BUDGET_MS are flagged there.
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import streamlit as st
+
+import query_stats
+from config import PAGE_BUDGET_MS, PAGE_PROFILE_REPORT, PAGE_PROFILE_WINDOW, PAGE_PROFILING
+
+_SESSION_KEY = "_page_profiler"
+_history = {}
+_budgets = {}
+_lock = threading.Lock()
+# Always-on run duration histograms per page (metrics.py), in query_stats.BUCKETS_MS buckets.
+_run_histograms = {}
+
+
+def _percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class _Span:
+    __slots__ = ("name", "depth", "start_ms", "wall_ms", "cpu_ms", "db_ms", "frames", "closed", "_t0", "_cpu0", "_db0")
+
+    def __init__(self, name: str, depth: int, origin: float):
+        self.name = name
+        self.depth = depth
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.thread_time()
+        self._db0 = query_stats.thread_db_ms()
+        self.start_ms = (self._t0 - origin) * 1000
+        self.wall_ms = self.cpu_ms = self.db_ms = 0.0
+        self.frames = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        self.wall_ms = (time.perf_counter() - self._t0) * 1000
+        self.cpu_ms = (time.thread_time() - self._cpu0) * 1000
+        self.db_ms = query_stats.thread_db_ms() - self._db0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "start_ms": round(self.start_ms, 2),
+            "wall_ms": round(self.wall_ms, 2),
+            "cpu_ms": round(self.cpu_ms, 2),
+            "db_ms": round(self.db_ms, 2),
+            "frames": self.frames,
+        }
+
+
+class PageProfiler:
+    """One profiled run of a page script."""
+
+    def __init__(self, page: str, budget_ms: float):
+        self.page = page
+        self.budget_ms = budget_ms
+        self._origin = time.perf_counter()
+        self._cpu0 = time.thread_time()
+        self._db0 = query_stats.thread_db_ms()
+        self._spans = []
+        self._stack = []
+        self._finished = False
+        self.mark("setup")
+
+    def _open(self, name: str) -> _Span:
+        span = _Span(name, len(self._stack), self._origin)
+        self._spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def _close(self):
+        self._stack.pop().close()
+
+    def mark(self, name: str):
+        """End the current top-level section and start `name`."""
+        while self._stack:
+            self._close()
+        self._open(name)
+
+    @contextmanager
+    def section(self, name: str):
+        """A nested span inside the current section."""
+        self._open(name)
+        try:
+            yield
+        finally:
+            self._close()
+
+    def frame(self, df, label: Optional[str] = None):
+        """Record the size of a DataFrame sent to the frontend and return it unchanged."""
+        if self._stack:
+            self._stack[-1].frames.append({
+                "label": label or self._stack[-1].name,
+                "rows": int(len(df)),
+                "columns": int(len(df.columns)),
+                "bytes": int(df.memory_usage(deep=True).sum()),
+            })
+        return df
+
+    def _summary(self, interrupted: bool) -> dict:
+        self._finished = True
+        if interrupted:
+            # Finalized from the next run, possibly on another thread: only sections that
+            # closed before st.rerun / st.stop have meaningful timings.
+            spans = [span for span in self._spans if span.closed]
+            top = [span for span in spans if span.depth == 0]
+            wall_ms = max((span.start_ms + span.wall_ms for span in spans), default=0.0)
+            cpu_ms = sum(span.cpu_ms for span in top)
+            db_ms = sum(span.db_ms for span in top)
+        else:
+            while self._stack:
+                self._close()
+            spans = self._spans
+            wall_ms = (time.perf_counter() - self._origin) * 1000
+            cpu_ms = (time.thread_time() - self._cpu0) * 1000
+            db_ms = query_stats.thread_db_ms() - self._db0
+        return {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "interrupted": interrupted,
+            "wall_ms": round(wall_ms, 2),
+            "cpu_ms": round(cpu_ms, 2),
+            "db_ms": round(db_ms, 2),
+            "frame_bytes": sum(f["bytes"] for span in spans for f in span.frames),
+            "spans": [span.as_dict() for span in spans],
+        }
+
+    def finish(self, interrupted: bool = False):
+        """Close the run, record it, write the report and (unless interrupted) render the sidebar."""
+        if self._finished:
+            return
+        run = self._summary(interrupted)
+        _record(self.page, self.budget_ms, run)
+        if not interrupted:
+            _observe_run(self.page, run["wall_ms"])
+            _render(self.page, self.budget_ms, run)
+
+
+def _observe_run(page: str, wall_ms: float):
+    with _lock:
+        hist = _run_histograms.get(page)
+        if hist is None:
+            hist = _run_histograms[page] = [[0] * (len(query_stats.BUCKETS_MS) + 1), 0.0, 0]
+        hist[0][bisect_left(query_stats.BUCKETS_MS, wall_ms)] += 1
+        hist[1] += wall_ms
+        hist[2] += 1
+
+
+def run_histograms() -> dict:
+    """{page: (bucket counts, sum ms, runs)} for completed page runs."""
+    with _lock:
+        return {page: (list(hist[0]), hist[1], hist[2]) for page, hist in _run_histograms.items()}
+
+
+class _NullProfiler:
+    """Stand-in used when profiling is off; only the run's total duration is kept."""
+
+    def __init__(self, page: str):
+        self.page = page
+        self._origin = time.perf_counter()
+        self._finished = False
+
+    def mark(self, name: str):
+        pass
+
+    def section(self, name: str):
+        return nullcontext()
+
+    def frame(self, df, label: Optional[str] = None):
+        return df
+
+    def finish(self, interrupted: bool = False):
+        if not self._finished and not interrupted:
+            _observe_run(self.page, (time.perf_counter() - self._origin) * 1000)
+        self._finished = True
+
+
+def _enabled() -> bool:
+    if PAGE_PROFILING:
+        return True
+    try:
+        flag = st.query_params.get("profile")
+    except AttributeError:
+        flag = (st.experimental_get_query_params().get("profile") or [None])[0]
+    if flag is not None:
+        st.session_state["_page_profiling"] = flag.lower() in ("1", "true", "yes")
+    return st.session_state.get("_page_profiling", False)
+
+
+def start(page: str, budget_ms: Optional[float] = None):
+    """
+    Begin profiling this run of `page`. A previous run in this session that never reached
+    finish() (st.rerun / st.stop) is recorded as interrupted first.
+    """
+    pending = st.session_state.get(_SESSION_KEY)
+    if pending is not None:
+        pending.finish(interrupted=True)
+        st.session_state[_SESSION_KEY] = None
+    if not _enabled():
+        return _NullProfiler(page)
+    profiler = PageProfiler(page, budget_ms if budget_ms is not None else PAGE_BUDGET_MS)
+    st.session_state[_SESSION_KEY] = profiler
+    return profiler
+
+
+def _record(page: str, budget_ms: float, run: dict):
+    with _lock:
+        _history.setdefault(page, deque(maxlen=PAGE_PROFILE_WINDOW)).append(run)
+        _budgets[page] = budget_ms
+        report = _report()
+    if PAGE_PROFILE_REPORT:
+        _write_report(report)
+
+
+def page_stats(page: str) -> dict:
+    """Rolling percentiles for one page (completed runs only)."""
+    with _lock:
+        runs = [run for run in _history.get(page, ()) if not run["interrupted"]]
+    return _page_report(runs, _budgets.get(page, PAGE_BUDGET_MS))
+
+
+def _page_report(runs: list, budget_ms: float) -> dict:
+    sections = {}
+    for run in runs:
+        for span in run["spans"]:
+            if span["depth"] == 0:
+                sections.setdefault(span["name"], []).append(span["wall_ms"])
+    wall = [run["wall_ms"] for run in runs]
+    p95 = _percentile(wall, 0.95)
+    return {
+        "runs": len(runs),
+        "budget_ms": budget_ms,
+        "over_budget": bool(runs) and p95 > budget_ms,
+        "wall_ms": {"p50": _percentile(wall, 0.50), "p95": p95, "max": max(wall, default=0.0)},
+        "cpu_ms": {"p50": _percentile([r["cpu_ms"] for r in runs], 0.50), "p95": _percentile([r["cpu_ms"] for r in runs], 0.95)},
+        "db_ms": {"p50": _percentile([r["db_ms"] for r in runs], 0.50), "p95": _percentile([r["db_ms"] for r in runs], 0.95)},
+        "frame_bytes_p95": _percentile([r["frame_bytes"] for r in runs], 0.95),
+        "sections": {
+            name: {"p50": _percentile(values, 0.50), "p95": _percentile(values, 0.95)}
+            for name, values in sections.items()
+        },
+    }
+
+
+def _report() -> dict:
+    """Whole-process report; the caller holds _lock."""
+    pages = {}
+    for page, history in _history.items():
+        runs = list(history)
+        completed = [run for run in runs if not run["interrupted"]]
+        entry = _page_report(completed, _budgets[page])
+        entry["interrupted_runs"] = len(runs) - len(completed)
+        entry["last_run"] = runs[-1]
+        pages[page] = entry
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "window": PAGE_PROFILE_WINDOW,
+        "default_budget_ms": PAGE_BUDGET_MS,
+        "over_budget": sorted(page for page, entry in pages.items() if entry["over_budget"]),
+        "pages": pages,
+    }
+
+
+def _write_report(report: dict):
+    path = Path(PAGE_PROFILE_REPORT)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(report, indent=2))
+    os.replace(tmp, path)
+
+
+def _bar_color(span: dict) -> str:
+    # Blue when the section is mostly database time, orange when mostly Python CPU, grey otherwise.
+    if span["db_ms"] >= span["wall_ms"] / 2:
+        return "#4c78a8"
+    if span["cpu_ms"] >= span["wall_ms"] / 2:
+        return "#f58518"
+    return "#9d9d9d"
+
+
+def _render(page: str, budget_ms: float, run: dict):
+    stats = page_stats(page)
+    total = max(run["wall_ms"], 0.001)
+    with st.sidebar.expander("⏱ Page Profile", expanded=True):
+        st.caption(
+            f"This run: {run['wall_ms']:.0f} ms wall · {run['cpu_ms']:.0f} ms CPU · {run['db_ms']:.0f} ms DB · "
+            f"{run['frame_bytes'] / 1024:.0f} KiB of DataFrames"
+        )
+        st.caption(
+            f"Last {stats['runs']} runs: p50 {stats['wall_ms']['p50']:.0f} ms · "
+            f"p95 {stats['wall_ms']['p95']:.0f} ms · budget {budget_ms:.0f} ms"
+        )
+        if run["wall_ms"] > budget_ms:
+            st.error(f"This run exceeded the {budget_ms:.0f} ms budget.")
+        elif stats["over_budget"]:
+            st.warning(f"p95 is over the {budget_ms:.0f} ms budget.")
+
+        bars = []
+        for span in run["spans"]:
+            left = span["start_ms"] / total * 100
+            width = max(span["wall_ms"] / total * 100, 0.5)
+            left = min(left, 100 - width)
+            bars.append(
+                f'<div style="margin-left:{left:.1f}%;width:{width:.1f}%;background:{_bar_color(span)};'
+                f'color:#fff;font-size:11px;white-space:nowrap;overflow:visible;margin-bottom:1px;padding:0 2px">'
+                f'{span["name"]} {span["wall_ms"]:.0f} ms</div>'
+            )
+        st.markdown("".join(bars), unsafe_allow_html=True)
+        st.caption("Blue: mostly DB · Orange: mostly CPU · Grey: other (rendering, waits)")
+
+        frames = [frame for span in run["spans"] for frame in span["frames"]]
+        if frames:
+            st.dataframe(frames, hide_index=True)
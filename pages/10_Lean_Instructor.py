@@ -1,6 +1,4 @@
 import streamlit as st
-import openai
-from tavily import TavilyClient
 import os
 
 st.set_page_config(page_title="Lean Instructor (Web)", layout="wide")
@@ -40,6 +38,10 @@ if not tavily_api_key:
     st.stop()
 
 # --- Clients ---
+# Deferred until the keys are known to be present, so a misconfigured page never loads the SDKs.
+import openai
+from tavily import TavilyClient
+
 client = openai.OpenAI(api_key=openai_api_key)
 tavily = TavilyClient(api_key=tavily_api_key)
 
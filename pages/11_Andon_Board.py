@@ -0,0 +1,118 @@
+import html
+import math
+
+import pandas as pd
+import streamlit as st
+
+from config import ANDON_BOARD_REFRESH_SECONDS
+from db import get_andon_board_state
+import live_timer
+from write_queue import start_worker
+
+st.set_page_config(page_title="Andon Board", layout="wide", initial_sidebar_state="collapsed")
+# Floor screens open this page directly, so app.py never runs; replay journaled writes from here too.
+start_worker()
+
+# --- Display Options (URL parameters, so each floor TV is configured by its bookmark) ---
+# ?kiosk=1          hide Streamlit chrome (combine with &embed=true to drop the toolbar too)
+# ?line=Line A      show only these lines (repeat the parameter for several)
+# ?cols=8           machine tiles per row
+kiosk = st.query_params.get("kiosk", "0").lower() in ("1", "true", "yes")
+line_filter = st.query_params.get_all("line")
+try:
+    tiles_per_row = max(1, int(st.query_params.get("cols", "6")))
+except ValueError:
+    tiles_per_row = 6
+
+if kiosk:
+    st.markdown("""
+    <style>
+        header, footer, [data-testid="stSidebar"], [data-testid="collapsedControl"] {display: none;}
+        .block-container {padding: 0.5rem 1rem; max-width: 100%;}
+    </style>
+    """, unsafe_allow_html=True)
+else:
+    st.title("Andon Board")
+    st.caption(
+        "For floor screens open this page with `?kiosk=1&embed=true` "
+        "(optionally `&line=<name>` and `&cols=<n>`). "
+        f"All screens share one machine-state query every {ANDON_BOARD_REFRESH_SECONDS:g}s."
+    )
+
+# Tile styles: running, down and waiting for maintenance, down with a technician on it.
+COLORS = {"RUNNING": "#21c354", "DOWN": "#ff2b2b", "ACK": "#ff8c00"}
+TILE_HEIGHT = 118
+LINE_HEADER_HEIGHT = 46
+SUMMARY_HEIGHT = 64
+
+STYLE = """
+<style>
+  body {margin: 0; font-family: 'Source Sans Pro', sans-serif; color: #fff; background: #0e1117;}
+  .summary {display: flex; gap: 2rem; align-items: baseline; height: 52px; font-size: 1.6rem;}
+  .line {font-size: 1.3rem; font-weight: 700; margin: 8px 0 6px; height: 32px;}
+  .grid {display: grid; gap: 8px;}
+  .tile {height: 110px; border-radius: 8px; padding: 8px 10px; box-sizing: border-box; overflow: hidden;}
+  .tile .name {font-size: 1.25rem; font-weight: 700; white-space: nowrap; text-overflow: ellipsis; overflow: hidden;}
+  .tile .state {font-size: 1rem; font-weight: 600;}
+  .tile .timer {font-size: 1.6rem; font-weight: 700;}
+  .tile .detail {font-size: 0.85rem; white-space: nowrap; text-overflow: ellipsis; overflow: hidden;}
+  .unacked {animation: flash 1s steps(1) infinite;}
+  @keyframes flash {50% {filter: brightness(0.55);}}
+</style>
+"""
+
+
+def _tile(row) -> str:
+    name = html.escape(str(row["machine_name"]))
+    if pd.isnull(row["event_id"]):
+        return (
+            f'<div class="tile" style="background: {COLORS["RUNNING"]};">'
+            f'<div class="name">{name}</div><div class="state">RUNNING</div></div>'
+        )
+    acknowledged = pd.notnull(row["acknowledged_at"])
+    reason = html.escape(f"{row['reason_code']} - {row['reason_description']}")
+    detail = html.escape(f"Tech: {row['technician_name']}") if acknowledged else "Waiting for maintenance"
+    return (
+        f'<div class="tile{"" if acknowledged else " unacked"}" '
+        f'style="background: {COLORS["ACK"] if acknowledged else COLORS["DOWN"]};">'
+        f'<div class="name">{name}</div>'
+        f'<div class="state">DOWN <span class="timer">{live_timer.span(row["start_time"])}</span></div>'
+        f'<div class="detail">{reason}</div><div class="detail">{detail}</div></div>'
+    )
+
+
+@st.fragment(run_every=ANDON_BOARD_REFRESH_SECONDS)
+def show_board():
+    # Only this fragment reruns on the interval, and it reads the process-wide snapshot,
+    # so the database sees one query per interval however many screens are open.
+    state = get_andon_board_state()
+    board = state["machines"]
+    if line_filter:
+        board = board[board["line_name"].astype(str).isin(line_filter)]
+    if board.empty:
+        st.info("No machines configured." if not line_filter else f"No machines on {', '.join(line_filter)}.")
+        return
+
+    down = board["event_id"].notnull()
+    unacked = down & board["acknowledged_at"].isnull()
+    parts = [
+        STYLE,
+        '<div class="summary">'
+        f'<span style="color: {COLORS["RUNNING"]};">{int((~down).sum())} running</span>'
+        f'<span style="color: {COLORS["DOWN"]};">{int(down.sum())} down</span>'
+        f'<span style="color: {COLORS["ACK"]};">{int(unacked.sum())} unacknowledged</span></div>',
+    ]
+    height = SUMMARY_HEIGHT
+    for line_name, machines in board.groupby("line_name", sort=False, observed=True):
+        parts.append(f'<div class="line">{html.escape(str(line_name))}</div>')
+        parts.append(f'<div class="grid" style="grid-template-columns: repeat({tiles_per_row}, 1fr);">')
+        parts.extend(_tile(row) for _, row in machines.iterrows())
+        parts.append("</div>")
+        height += LINE_HEADER_HEIGHT + math.ceil(len(machines) / tiles_per_row) * TILE_HEIGHT
+    # One iframe for the whole board; its timers tick in the browser between refreshes. The
+    # markup only changes when a machine does, so quiet refreshes keep the same iframe.
+    live_timer.render("".join(parts), height=height)
+    st.caption(f"Updated {state['as_of']:%H:%M:%S}")
+
+
+show_board()
@@ -0,0 +1,110 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from datetime import datetime, date, timedelta
+from config import REPORTS_MAX_BARS, REPORTS_MAX_POINTS
+from db import get_master_data
+import page_profiler
+import reports
+
+st.set_page_config(page_title="Reports", layout="wide")
+st.title("Reports")
+prof = page_profiler.start("Reports")
+
+# --- 1. Filters ---
+st.sidebar.header("Filters")
+PRESETS = {"Last 7 Days": 7, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365, "Custom": None}
+preset = st.sidebar.selectbox("Range", list(PRESETS), index=1)
+if PRESETS[preset] is None:
+    picked = st.sidebar.date_input("Dates", (date.today() - timedelta(days=29), date.today()))
+    first_day, last_day = (picked[0], picked[-1]) if isinstance(picked, (list, tuple)) else (picked, picked)
+else:
+    first_day, last_day = date.today() - timedelta(days=PRESETS[preset] - 1), date.today()
+
+master = get_master_data()
+line_names = dict(zip(master["lines"]["id"].astype(int), master["lines"]["name"].astype(str)))
+selected_line_name = st.sidebar.selectbox("Line", ["All"] + list(line_names.values()))
+selected_line_id = next((lid for lid, name in line_names.items() if name == selected_line_name), None)
+
+# Whole days, so the cache key (and the buckets) stay put between reruns.
+start_dt = datetime.combine(first_day, datetime.min.time())
+end_dt = datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+
+# Resolution follows the zoom: the finest bucket that keeps each series a bounded size.
+auto_freq = reports.pick_resolution(start_dt, end_dt)
+allowed = list(reports.RESOLUTIONS[reports.RESOLUTIONS.index(auto_freq):])
+freq = st.sidebar.selectbox("Resolution", ["Auto"] + allowed)
+freq = auto_freq if freq == "Auto" else freq
+bar_freq = max(freq, reports.pick_resolution(start_dt, end_dt, REPORTS_MAX_BARS), key=reports.RESOLUTIONS.index)
+
+# --- 2. Aggregation (server-side; raw events never reach the browser) ---
+machines = master["machines"]
+machines = machines[machines["line_id"].notnull()]
+if selected_line_id is not None:
+    machines = machines[machines["line_id"] == selected_line_id]
+if machines.empty:
+    st.info("No machines on this line yet." if selected_line_id is not None else "No machines configured.")
+    prof.finish()
+    st.stop()
+
+prof.mark("aggregate")
+events = reports.load_events(start_dt, end_dt)
+grid = reports.line_grid(events, start_dt, end_dt, freq, selected_line_id)
+categories_df = reports.downtime_by_category(events, start_dt, end_dt, bar_freq, selected_line_id)
+
+# bucket_min is summed over a line's machines; the rate is per elapsed clock hour of the bucket.
+now = np.datetime64(datetime.now(), "ms")
+elapsed_min = np.diff(np.minimum(grid.edges, max(now, grid.edges[0]))) / np.timedelta64(1, "m")
+with np.errstate(divide="ignore", invalid="ignore"):
+    rate = np.where(elapsed_min > 0, grid.good / elapsed_min * 60, np.nan)
+charts = {
+    "Production Rate (good units / hour)": reports.series_frame(grid, rate, line_names),
+    "First Pass Yield (%)": reports.series_frame(grid, grid.quality * 100, line_names),
+    "OEE (%)": reports.series_frame(grid, grid.oee * 100, line_names),
+}
+st.caption(
+    f"{first_day} to {last_day} | {freq} buckets for trends, {bar_freq} for downtime | "
+    f"at most {REPORTS_MAX_POINTS:,} points per trend chart (LTTB)"
+)
+
+# --- 3. Charts ---
+prof.mark("charts")
+import altair as alt  # deferred: only the chart section needs it
+
+st.subheader("Downtime by Category")
+if not categories_df.empty:
+    c = alt.Chart(categories_df).mark_bar().encode(
+        x=alt.X('bucket_start:T', title="Period"),
+        y=alt.Y('downtime_min:Q', title="Minutes"),
+        color=alt.Color('category:N', title="Category"),
+        tooltip=['bucket_start:T', 'category', 'downtime_min']
+    )
+    st.altair_chart(c, theme="streamlit")
+else:
+    st.write("No downtime in this range.")
+
+for title, df in charts.items():
+    st.subheader(title)
+    if df.empty:
+        st.write("No data in this range.")
+        continue
+    c = alt.Chart(df).mark_line().encode(
+        x=alt.X('bucket_start:T', title="Time"),
+        y=alt.Y('value:Q', title=title),
+        color=alt.Color('series:N', title="Line"),
+        tooltip=['bucket_start:T', 'series', alt.Tooltip('value:Q', format='.1f')]
+    )
+    st.altair_chart(c, theme="streamlit")
+
+with st.expander("Totals by Line"):
+    total = grid.resample(max(1, grid.bucket_min.shape[1]))
+    st.dataframe(prof.frame(pd.DataFrame({
+        "Line": [line_names.get(int(k), str(k)) for k in total.keys],
+        "Good Qty": total.good[:, 0].astype(int),
+        "Scrap Qty": total.scrap[:, 0].astype(int),
+        "Downtime (min)": (total.planned_downtime_min + total.unplanned_downtime_min)[:, 0].round(1),
+        "FPY %": (total.quality[:, 0] * 100).round(1),
+        "OEE %": (total.oee[:, 0] * 100).round(1),
+    })), hide_index=True)
+
+prof.finish()
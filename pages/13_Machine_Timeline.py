@@ -0,0 +1,85 @@
+import streamlit as st
+from datetime import datetime, timedelta
+from config import TIMELINE_MAX_MARKS
+from db import get_master_data
+from event_store import events_for_window
+import page_profiler
+import shift_calendar
+import timeline
+
+st.set_page_config(page_title="Machine Timeline", layout="wide")
+st.title("Machine Timeline")
+prof = page_profiler.start("Machine Timeline")
+
+# --- 1. Filters ---
+st.sidebar.header("Filters")
+master = get_master_data()
+lines_df = master["lines"]
+if lines_df.empty:
+    st.error("No lines configured.")
+    prof.finish()
+    st.stop()
+line_options = dict(zip(lines_df["name"].astype(str), lines_df["id"].astype(int)))
+selected_line_name = st.sidebar.selectbox("Line", list(line_options))
+selected_line_id = line_options[selected_line_name]
+
+selected_date = st.sidebar.date_input("Date", datetime.now())
+calendar = shift_calendar.line_calendar(selected_line_id)
+WEEK = "Week (7 days to date)"
+window = st.sidebar.selectbox("Window", [*calendar.names, shift_calendar.ALL_DAY, WEEK])
+if window == WEEK:
+    start_dt = datetime.combine(selected_date - timedelta(days=6), datetime.min.time())
+    end_dt = datetime.combine(selected_date, datetime.max.time())
+else:
+    start_dt, end_dt = shift_calendar.shift_window(calendar, selected_date, window)
+
+machines = master["machines"]
+machines = machines[machines["line_id"] == selected_line_id].sort_values("name")
+st.write(f"**{selected_line_name}** | {window} ({start_dt:%Y-%m-%d %H:%M} to {end_dt:%Y-%m-%d %H:%M})")
+if machines.empty:
+    st.info("No machines on this line.")
+    prof.finish()
+    st.stop()
+
+# --- 2. Marks (merged and bucketed server-side) ---
+prof.mark("marks")
+events = events_for_window(start_dt, end_dt)
+marks = timeline.build(events, machines["id"].astype(int).to_numpy(), start_dt, end_dt, master["downtime_reasons"])
+marks["machine_name"] = marks["machine_id"].map(dict(zip(machines["id"].astype(int), machines["name"].astype(str))))
+
+# --- 3. Chart ---
+prof.mark("chart")
+import altair as alt  # deferred: only the chart section needs it
+
+if marks.empty:
+    st.success("No downtime on this line in the selected window.")
+else:
+    machine_names = machines["name"].astype(str).tolist()
+    categories = sorted(c for c in marks["category"].unique() if c != timeline.SHORT_STOPS)
+    palette = ["#e45756", "#f58518", "#4c78a8", "#72b7b2", "#54a24b", "#eeca3b", "#b279a2", "#ff9da6"]
+    colors = alt.Scale(
+        domain=categories + [timeline.SHORT_STOPS],
+        range=[palette[i % len(palette)] for i in range(len(categories))] + ["#9d9d9d"],
+    )
+    c = alt.Chart(marks).mark_bar(opacity=0.85).encode(
+        x=alt.X('start:T', title="Time", scale=alt.Scale(domain=[start_dt.isoformat(), end_dt.isoformat()])),
+        x2='end:T',
+        y=alt.Y('machine_name:N', title=None, sort=machine_names, scale=alt.Scale(domain=machine_names)),
+        color=alt.Color('category:N', title="Reason Category", scale=colors),
+        tooltip=['machine_name', 'category', 'start:T', 'end:T', 'minutes', 'events']
+    ).properties(height=max(120, 28 * len(machine_names)))
+    st.altair_chart(c, theme="streamlit")
+    st.caption(
+        f"{len(marks):,} marks (at most {TIMELINE_MAX_MARKS:,}). Overlapping or adjacent stops are merged per "
+        f"machine and category, so a bar can cover short running gaps; its minutes count only the stops. "
+        f"Stops too short to see are grouped as '{timeline.SHORT_STOPS}'."
+    )
+
+    with st.expander("Downtime by Machine"):
+        by_machine = marks.groupby("machine_name", observed=True).agg(
+            downtime_min=("minutes", "sum"), stops=("events", "sum"),
+        ).reindex(machine_names, fill_value=0).reset_index()
+        by_machine.columns = ["Machine", "Downtime (min)", "Stops"]
+        st.dataframe(prof.frame(by_machine), hide_index=True)
+
+prof.finish()
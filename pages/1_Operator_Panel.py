@@ -1,28 +1,36 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 import time
-from db import (
-    get_lines, get_machines, get_work_orders, get_operators,
-    get_downtime_reasons, get_quality_reasons,
-    create_downtime_event, close_downtime_event, get_active_downtime_event,
+from db import get_master_data, get_panel_snapshot
+# Writes are journaled locally and acknowledged at once; a background worker replays them.
+from write_queue import (
+    create_downtime_event, close_downtime_event,
     log_quality_event, log_production_count,
-    get_recent_downtime_events, get_recent_quality_events
 )
+import live_timer
+import page_profiler
+import write_queue
 
 st.set_page_config(page_title="Operator Panel", layout="wide")
+# Tablets open this page directly, so app.py never runs; replay entries left by an earlier process.
+write_queue.start_worker()
 
 st.title("Operator Panel")
+prof = page_profiler.start("Operator Panel")
 
 # --- 1. Context Selection ---
 st.sidebar.header("Context")
 
-# Load Data
-lines_df = get_lines()
-operators_df = get_operators()
-downtime_reasons_df = get_downtime_reasons()
-quality_reasons_df = get_quality_reasons()
+# Load Data (process-wide cache; only the machine snapshot below hits the database per rerun)
+prof.mark("master data")
+master = get_master_data()
+lines_df = master["lines"]
+all_machines_df = master["machines"]
+operators_df = master["operators"]
+downtime_reasons_df = master["downtime_reasons"]
+quality_reasons_df = master["quality_reasons"]
 
+prof.mark("context selectors")
 # Initialize session state for context if not present
 if "selected_line_id" not in st.session_state:
     st.session_state.selected_line_id = None
@@ -61,7 +69,7 @@ if query_params:
     target_machine = get_param("machine")
     if target_machine and not st.session_state.selected_machine_id:
          if st.session_state.selected_line_id:
-             machines_for_line = get_machines(st.session_state.selected_line_id)
+             machines_for_line = all_machines_df[all_machines_df['line_id'] == st.session_state.selected_line_id]
              machine_match = machines_for_line[machines_for_line['name'] == target_machine]
              if not machine_match.empty:
                  st.session_state.selected_machine_id = int(machine_match.iloc[0]['id'])
@@ -102,7 +110,7 @@ if selected_line_name:
 # Machine Selection (Filtered by Line)
 machines_df = pd.DataFrame()
 if st.session_state.selected_line_id:
-    machines_df = get_machines(st.session_state.selected_line_id)
+    machines_df = all_machines_df[all_machines_df['line_id'] == st.session_state.selected_line_id]
 
 machine_options = {}
 machine_default_index = 0
@@ -126,20 +134,24 @@ if selected_machine_name:
 else:
     st.session_state.selected_machine_id = None
 
-# Work Order Selection (Filtered by Line)
-wo_df = pd.DataFrame()
-if st.session_state.selected_line_id:
-    wo_df = get_work_orders(st.session_state.selected_line_id)
+# Machine snapshot: active downtime, recent activity and the line's work orders in one query
+prof.mark("machine snapshot")
+snapshot = None
+if st.session_state.selected_machine_id:
+    read_started = time.time()
+    snapshot = get_panel_snapshot(st.session_state.selected_machine_id)
+    # Taps still queued (or applied after the read started) are shown as if already saved.
+    snapshot = write_queue.overlay(
+        snapshot, write_queue.unsynced(st.session_state.selected_machine_id, read_started), master
+    )
+
+# Work Order Selection (the machine's line, Active first, then Scheduled)
+wo_df = snapshot["work_orders"] if snapshot else pd.DataFrame()
 
 wo_options = {}
 wo_default_index = 0
 
 if not wo_df.empty:
-    # Sort: Active first, then Scheduled
-    status_order = {"Active": 0, "Scheduled": 1, "Completed": 2}
-    wo_df['sort_val'] = wo_df['status'].map(lambda x: status_order.get(x, 3))
-    wo_df = wo_df.sort_values(by=['sort_val', 'id'], ascending=[True, False])
-
     wo_options = {f"{row['wo_number']} - {row['part_number']} ({row['status']})": row["id"] for _, row in wo_df.iterrows()}
     
     # Check URL param for WO here if not set
@@ -189,40 +201,40 @@ if selected_operator_name:
 # Verify Context
 if not st.session_state.selected_machine_id:
     st.warning("Please select a Machine to proceed.")
+    prof.finish()
     st.stop()
 
 # --- 2. Current Status / Downtime Timer ---
+prof.mark("machine status")
 st.subheader("Machine Status")
 
 # Check for active downtime
-active_downtime = get_active_downtime_event(st.session_state.selected_machine_id)
+active_downtime = snapshot["active_downtime"]
 active_downtime_id = active_downtime["id"] if active_downtime else None
+is_down = active_downtime is not None
 
 col1, col2 = st.columns(2)
 
-if active_downtime_id:
+if is_down:
     # DOWN STATE
     with col1:
         st.error(f"DOWN - {selected_machine_name}")
         st.write(f"**Started:** {active_downtime['start_time']}")
         
-        # Calculate elapsed time
-        start_dt = datetime.fromisoformat(active_downtime["start_time"])
-        elapsed = datetime.now() - start_dt
-        st.metric("Elapsed Time", str(elapsed).split('.')[0]) # HH:MM:SS
+        # Elapsed time ticks in the browser; no reruns needed to keep it current
+        live_timer.elapsed(active_downtime["start_time"], color="#ff4b4b")
         
-        # Display Reason
-        reason_row = downtime_reasons_df[downtime_reasons_df["id"] == active_downtime["reason_id"]].iloc[0]
-        st.write(f"**Reason:** {reason_row['description']} ({reason_row['code']})")
+        # Display Reason (joined in the snapshot)
+        st.write(f"**Reason:** {active_downtime['reason_description']} ({active_downtime['reason_code']})")
         
         if st.button("End Downtime", type="primary", use_container_width=True):
-            close_downtime_event(active_downtime_id)
+            close_downtime_event(
+                st.session_state.selected_machine_id,
+                event_id=active_downtime_id,
+                client_event_id=active_downtime.get("client_event_id"),
+            )
             st.success("Downtime ended.")
             st.rerun()
-        
-        # Auto-refresh mechanism for timer
-        # time.sleep(5)
-        # st.rerun()
 
 else:
     # RUNNING STATE
@@ -250,10 +262,11 @@ else:
             st.rerun()
 
 # --- 3. Quality / Scrap Logging ---
+prof.mark("logging forms")
 with col2:
     st.subheader("Log Production / Quality")
     
-    if active_downtime_id:
+    if is_down:
         st.warning("Production logging is disabled while machine is DOWN.")
     else:
         tab1, tab2 = st.tabs(["Log Scrap", "Log Good Production"])
@@ -298,6 +311,7 @@ with col2:
 
 
 # --- 4. Recent Events ---
+prof.mark("recent activity")
 st.divider()
 st.subheader("Recent Activity")
 
@@ -305,21 +319,21 @@ col_recent_dt, col_recent_q = st.columns(2)
 
 with col_recent_dt:
     st.write("#### Recent Downtime")
-    recent_dt = get_recent_downtime_events(machine_id=st.session_state.selected_machine_id)
+    recent_dt = snapshot["recent_downtime"]
     if not recent_dt.empty:
         # Format for display
-        display_dt = recent_dt[["start_time", "duration_minutes", "reason_description", "operator_name"]].copy()
+        display_dt = recent_dt.copy()
         display_dt["duration_minutes"] = display_dt["duration_minutes"].round(1)
-        st.dataframe(display_dt, hide_index=True)
+        st.dataframe(prof.frame(display_dt, "recent downtime"), hide_index=True)
     else:
         st.info("No recent downtime.")
 
 with col_recent_q:
     st.write("#### Recent Quality Issues")
-    recent_q = get_recent_quality_events(machine_id=st.session_state.selected_machine_id)
+    recent_q = snapshot["recent_quality"]
     if not recent_q.empty:
-         # Format for display
-        display_q = recent_q[["timestamp", "quantity", "reason_description"]].copy()
-        st.dataframe(display_q, hide_index=True)
+        st.dataframe(prof.frame(recent_q, "recent quality"), hide_index=True)
     else:
         st.info("No recent quality issues.")
+
+prof.finish()
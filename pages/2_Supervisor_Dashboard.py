@@ -1,15 +1,15 @@
 import streamlit as st
 import pandas as pd
-import altair as alt
-from datetime import datetime, timedelta, time
-from config import SHIFTS
-from db import (
-    get_downtime_summary, get_quality_summary, get_production_summary,
-    get_lines
-)
+from datetime import datetime, timedelta
+from db import get_lines, get_master_data
+import oee
+import page_profiler
+import reports
+import shift_calendar
 
 st.set_page_config(page_title="Supervisor Dashboard", layout="wide")
 st.title("Supervisor Dashboard")
+prof = page_profiler.start("Supervisor Dashboard")
 
 # --- 1. Filters ---
 st.sidebar.header("Filters")
@@ -17,157 +17,79 @@ st.sidebar.header("Filters")
 # Date Selection
 selected_date = st.sidebar.date_input("Select Date", datetime.now())
 
-# Shift Selection
-selected_shift_name = st.sidebar.selectbox("Select Shift", options=list(SHIFTS.keys()))
-shift_times = SHIFTS[selected_shift_name]
-
-# Calculate Start and End Timestamps
-start_time_str = f"{selected_date}T{shift_times['start']}:00"
-# Handle overnight shift logic (simple MVP: if end < start, add 1 day to end date)
-# For MVP, let's keep it simple and assume same day unless specified.
-# Ideally, we check if end_time < start_time
-start_t = datetime.strptime(shift_times['start'], "%H:%M").time()
-end_t = datetime.strptime(shift_times['end'], "%H:%M").time()
-
-start_dt = datetime.combine(selected_date, start_t)
-if end_t < start_t:
-    end_dt = datetime.combine(selected_date + timedelta(days=1), end_t)
-else:
-    end_dt = datetime.combine(selected_date, end_t)
-
-start_iso = start_dt.isoformat()
-end_iso = end_dt.isoformat()
-
 # Filter by Line (Optional)
 lines_df = get_lines()
 line_options = {row["name"]: row["id"] for _, row in lines_df.iterrows()}
 selected_line_name = st.sidebar.selectbox("Filter by Line (Optional)", ["All"] + list(line_options.keys()))
 selected_line_id = line_options[selected_line_name] if selected_line_name != "All" else None
 
+# Shift Selection (the line's calendar; overnight shifts end on the next day)
+calendar = shift_calendar.line_calendar(selected_line_id)
+selected_shift_name = st.sidebar.selectbox("Select Shift", options=[shift_calendar.ALL_DAY, *calendar.names])
+start_dt, end_dt = shift_calendar.shift_window(calendar, selected_date, selected_shift_name)
+start_iso = start_dt.isoformat()
+end_iso = end_dt.isoformat()
+
 st.write(f"**Viewing Data For:** {selected_date} | {selected_shift_name} ({start_iso} to {end_iso})")
 
 # --- 2. Data Retrieval ---
-downtime_df = get_downtime_summary(start_iso, end_iso)
-quality_df = get_quality_summary(start_iso, end_iso)
-production_df = get_production_summary(start_iso, end_iso)
-
-# Filter by Line if selected
-if selected_line_id:
-    if not downtime_df.empty:
-        downtime_df = downtime_df[downtime_df['line_id'] == selected_line_id]
-    if not quality_df.empty:
-        quality_df = quality_df[quality_df['line_id'] == selected_line_id]
-    if not production_df.empty:
-        production_df = production_df[production_df['line_id'] == selected_line_id]
+prof.mark("event store")
+# Served from the shared in-memory event store; older windows come from the Reports history cache
+# (DuckDB when available), and every chart below aggregates these same columns.
+events = reports.load_events(start_dt, end_dt)
 
 # --- 3. Line / Machine Summary ---
+prof.mark("production summary")
 st.subheader("Production Summary")
 
-# Aggregate Data per Machine
-# We need a list of all relevant machines.
-# If a machine had no events, it might not be in the DFs. 
-# Ideally we query all machines first. But for MVP, we can aggregate what we have.
-
-machine_stats = {}
-
-# Process Downtime
-if not downtime_df.empty:
-    for _, row in downtime_df.iterrows():
-        m_name = row['machine_name']
-        if m_name not in machine_stats:
-            machine_stats[m_name] = {'downtime_min': 0, 'events': 0, 'scrap': 0, 'good': 0}
-        
-        # Calculate duration inside window
-        # MVP: Use pre-calculated duration or calculate now if active
-        if pd.isna(row['end_time']):
-             # Active event: duration = now - start (capped at window end)
-             # But for historical window, it's min(now, window_end) - max(start, window_start)
-             # Let's simplify: if active, calculate up to NOW (or window end)
-             event_end = min(datetime.now(), end_dt)
-             event_start = datetime.fromisoformat(row['start_time'])
-             # Ensure start is not before window start for calculation (metrics within window)
-             calc_start = max(event_start, start_dt)
-             duration = (event_end - calc_start).total_seconds() / 60.0
-             duration = max(0, duration)
-             machine_stats[m_name]['downtime_min'] += duration
-        else:
-             # Closed event
-             # MVP: Use stored duration_minutes. 
-             # Refinement: Only count intersection with window.
-             # Let's stick to MVP: sum stored duration if it started in window (or intersects).
-             # The query returns intersecting events.
-             machine_stats[m_name]['downtime_min'] += (row['duration_minutes'] if row['duration_minutes'] else 0)
-
-        machine_stats[m_name]['events'] += 1
-
-# Process Quality
-if not quality_df.empty:
-    for _, row in quality_df.iterrows():
-        m_name = row['machine_name']
-        if m_name not in machine_stats:
-            machine_stats[m_name] = {'downtime_min': 0, 'events': 0, 'scrap': 0, 'good': 0}
-        machine_stats[m_name]['scrap'] += row['quantity']
-
-# Process Production
-if not production_df.empty:
-    for _, row in production_df.iterrows():
-        m_name = row['machine_name']
-        if m_name not in machine_stats:
-            machine_stats[m_name] = {'downtime_min': 0, 'events': 0, 'scrap': 0, 'good': 0}
-        machine_stats[m_name]['good'] += row['good_quantity']
-
-# Convert to DataFrame
-summary_data = []
-total_window_min = (end_dt - start_dt).total_seconds() / 60.0
-
-for m_name, stats in machine_stats.items():
-    uptime_min = total_window_min - stats['downtime_min']
-    uptime_pct = (uptime_min / total_window_min) * 100 if total_window_min > 0 else 0
-    
-    summary_data.append({
-        "Machine": m_name,
-        "Downtime (min)": round(stats['downtime_min'], 1),
-        "DT Events": stats['events'],
-        "Good Qty": stats['good'],
-        "Scrap Qty": stats['scrap'],
-        "Uptime %": round(uptime_pct, 1)
+machine_df = events.machine_summary(start_dt, end_dt, selected_line_id)
+
+if not machine_df.empty:
+    # OEE over the window (one bucket per machine); elapsed time only for a running shift.
+    master = get_master_data()
+    standards = oee.load_standards(master["machines"], master["downtime_reasons"])
+    grid = oee.compute(events, machine_df["machine_id"].to_numpy(), oee.bucket_edges(start_dt, end_dt, end_dt - start_dt), standards)
+    total = grid.rollup()
+
+    m1, m2, m3, m4 = st.columns(4)
+    for col, label, values in (
+        (m1, "OEE", total.oee), (m2, "Availability", total.availability),
+        (m3, "Performance", total.performance), (m4, "Quality", total.quality),
+    ):
+        value = values[0, 0]
+        col.metric(label, "n/a" if pd.isnull(value) else f"{value:.1%}")
+    if pd.isnull(total.performance[0, 0]):
+        st.caption("Performance needs an ideal cycle time for every machine (Admin Config → Machines).")
+
+    summary_df = pd.DataFrame({
+        "Machine": machine_df["machine_name"],
+        "Downtime (min)": machine_df["downtime_min"].round(1),
+        "DT Events": machine_df["events"],
+        "Good Qty": machine_df["good"],
+        "Scrap Qty": machine_df["scrap"],
+        "Availability %": (grid.availability[:, 0] * 100).round(1),
+        "Performance %": (grid.performance[:, 0] * 100).round(1),
+        "Quality %": (grid.quality[:, 0] * 100).round(1),
+        "OEE %": (grid.oee[:, 0] * 100).round(1),
     })
-
-if summary_data:
-    st.dataframe(pd.DataFrame(summary_data), hide_index=True)
+    st.dataframe(prof.frame(summary_df), hide_index=True)
 else:
     st.info("No data found for the selected period.")
 
 # --- 4. Charts ---
+prof.mark("charts")
+import altair as alt  # deferred: only the chart section needs it
+
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Downtime Pareto (Minutes)")
-    if not downtime_df.empty:
-        # Group by reason
-        # We need to recalculate duration for active events for the chart too, 
-        # but for MVP let's just use sum of duration_minutes (and estimate active).
-        # To be consistent with table, we should use the same logic, but it's harder in pure pandas without iteration.
-        # Let's just group by reason description.
-        
-        # Fill NaN duration for active events with calculation
-        def calc_dur(row):
-            if pd.notnull(row['duration_minutes']):
-                return row['duration_minutes']
-            # Estimate
-            start = datetime.fromisoformat(row['start_time'])
-            end = min(datetime.now(), end_dt)
-            return max(0, (end - start).total_seconds() / 60.0)
-
-        downtime_df['calc_duration'] = downtime_df.apply(calc_dur, axis=1)
-        
-        pareto_dt = downtime_df.groupby("reason_description")['calc_duration'].sum().reset_index()
-        pareto_dt = pareto_dt.sort_values("calc_duration", ascending=False)
-        
+    pareto_dt = events.downtime_pareto(start_dt, end_dt, selected_line_id)
+    if not pareto_dt.empty:
         c = alt.Chart(pareto_dt).mark_bar().encode(
             x=alt.X('reason_description', sort='-y', title="Reason"),
-            y=alt.Y('calc_duration', title="Minutes"),
-            tooltip=['reason_description', 'calc_duration']
+            y=alt.Y('downtime_min', title="Minutes"),
+            tooltip=['reason_description', 'downtime_min', 'events']
         )
         st.altair_chart(c, theme="streamlit")
     else:
@@ -175,16 +97,43 @@ with col1:
 
 with col2:
     st.subheader("Scrap Pareto (Quantity)")
-    if not quality_df.empty:
-        pareto_q = quality_df.groupby("reason_description")['quantity'].sum().reset_index()
-        pareto_q = pareto_q.sort_values("quantity", ascending=False)
-        
+    pareto_q = events.scrap_pareto(start_dt, end_dt, selected_line_id)
+    if not pareto_q.empty:
         c = alt.Chart(pareto_q).mark_bar().encode(
             x=alt.X('reason_description', sort='-y', title="Reason"),
-            y=alt.Y('quantity', title="Quantity"),
-            tooltip=['reason_description', 'quantity']
+            y=alt.Y('scrap', title="Quantity"),
+            tooltip=['reason_description', 'scrap']
         )
         st.altair_chart(c, theme="streamlit")
     else:
         st.write("No scrap data.")
 
+# --- 5. Shift over Shift ---
+prof.mark("shift over shift")
+st.subheader("Shift over Shift")
+weeks = st.slider("Weeks", min_value=1, max_value=8, value=2)
+first_day = selected_date - timedelta(weeks=weeks) + timedelta(days=1)
+# Totals per scheduled shift instance; downtime crossing a shift change is split between shifts.
+# Weeks beyond the event store come from the Reports history cache, not a fresh load per rerun.
+history_start = datetime.combine(first_day, datetime.min.time())
+history_end = datetime.combine(selected_date + timedelta(days=1), datetime.max.time())
+shifts_df = shift_calendar.shift_totals(
+    reports.load_events(history_start, history_end), first_day, selected_date,
+    line_ids=[selected_line_id] if selected_line_id is not None else None,
+)
+if not shifts_df.empty:
+    per_shift = shifts_df.groupby(["shift_date", "shift"], as_index=False)[["downtime_min", "good", "scrap"]].sum()
+    per_shift["downtime_min"] = per_shift["downtime_min"].round(1)
+    s1, s2 = st.columns(2)
+    for col, field, title in ((s1, "good", "Good Qty"), (s2, "downtime_min", "Downtime (min)")):
+        c = alt.Chart(per_shift).mark_line(point=True).encode(
+            x=alt.X('shift_date:T', title="Production Date"),
+            y=alt.Y(f'{field}:Q', title=title),
+            color=alt.Color('shift:N', title="Shift"),
+            tooltip=['shift_date:T', 'shift', 'good', 'scrap', 'downtime_min']
+        )
+        col.altair_chart(c, theme="streamlit")
+else:
+    st.write("No scheduled shifts in this period.")
+
+prof.finish()
@@ -3,14 +3,16 @@ import pandas as pd
 from db import (
     get_lines, get_machines, get_operators, get_downtime_reasons,
     add_line, add_machine, add_operator, add_downtime_reason,
-    set_target, get_targets
+    set_targets, get_targets, set_ideal_cycle_seconds
 )
+import query_stats
+import sqdc_snapshots
 
 st.set_page_config(page_title="Admin Config", layout="wide")
 st.title("Admin Configuration")
 
-tab_lines, tab_machines, tab_operators, tab_reasons, tab_targets = st.tabs([
-    "Lines", "Machines", "Operators", "Downtime Reasons", "SQDC Targets"
+tab_lines, tab_machines, tab_operators, tab_reasons, tab_targets, tab_queries = st.tabs([
+    "Lines", "Machines", "Operators", "Downtime Reasons", "SQDC Targets", "Query Stats"
 ])
 
 # --- Lines ---
@@ -57,15 +59,28 @@ with tab_machines:
             selected_line = st.selectbox("Line", options=list(line_options.keys()))
             
             m_desc = st.text_input("Description")
+            m_cycle = st.number_input("Ideal Cycle Time (sec/unit, 0 = not set)", min_value=0.0, value=0.0, step=0.5)
             
             if st.form_submit_button("Add Machine"):
                 if m_name and selected_line:
-                    add_machine(m_name, line_options[selected_line], m_desc)
+                    add_machine(m_name, line_options[selected_line], m_desc, m_cycle or None)
                     st.success(f"Added machine: {m_name}")
                     st.rerun()
                 else:
                     st.error("Name and Line are required.")
 
+    with st.expander("Set Ideal Cycle Time (OEE Performance)"):
+        if not machines_df.empty:
+            with st.form("machine_cycle_form"):
+                machine_options = {row["name"]: row["id"] for _, row in machines_df.iterrows()}
+                cycle_machine = st.selectbox("Machine", options=list(machine_options.keys()))
+                cycle_seconds = st.number_input("Ideal Cycle Time (sec/unit, 0 = clear)", min_value=0.0, value=0.0, step=0.5)
+                st.caption("Work orders with their own ideal cycle time (part standard) override this.")
+                if st.form_submit_button("Save"):
+                    set_ideal_cycle_seconds(machine_options[cycle_machine], cycle_seconds or None)
+                    st.success(f"Saved ideal cycle time for {cycle_machine}")
+                    st.rerun()
+
 # --- Operators ---
 with tab_operators:
     st.subheader("Operators")
@@ -140,11 +155,41 @@ with tab_targets:
                 st.caption("Status is Green if Downtime <= Target.")
             
             if st.form_submit_button("Save Targets"):
-                set_target(selected_line_id, "safety", t_safety)
-                set_target(selected_line_id, "quality", t_quality)
-                set_target(selected_line_id, "delivery", t_delivery)
-                set_target(selected_line_id, "cost", t_cost)
+                set_targets(selected_line_id, {
+                    "safety": t_safety,
+                    "quality": t_quality,
+                    "delivery": t_delivery,
+                    "cost": t_cost,
+                })
+                sqdc_snapshots.invalidate()
                 st.success(f"Targets saved for {selected_line_name}!")
                 st.rerun()
     else:
         st.info("No lines available. Please create a line first.")
+
+# --- Query Stats ---
+with tab_queries:
+    st.subheader("Query Stats")
+    st.write("Database time per query since this app process started, slowest total first. Percentiles are histogram bucket bounds.")
+
+    stats_df = pd.DataFrame(query_stats.summary())
+    if stats_df.empty:
+        st.info("No queries recorded yet (or QUERY_STATS_ENABLED is off).")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queries", int(stats_df["calls"].sum()))
+        col2.metric("Total DB Time (s)", f"{stats_df['total_ms'].sum() / 1000:.1f}")
+        col3.metric("Mean Acquire (ms)", f"{(stats_df['acquire_ms'] * stats_df['calls']).sum() / stats_df['calls'].sum():.2f}")
+        st.dataframe(stats_df.drop(columns=["sql"]).head(25), hide_index=True)
+
+    slow = query_stats.slow_queries()
+    st.markdown(f"**Slow-Query Log** ({len(slow)} entries)")
+    for entry in slow[:50]:
+        with st.expander(f"{entry['at']:%H:%M:%S} · {entry['name']} · {entry['ms']} ms · {entry['caller']}"):
+            st.code(entry["sql"], language="sql")
+            st.caption(f"Params: {entry['params']} · Rows: {entry['rows']} · Acquire: {entry['acquire_ms']} ms")
+            st.code(entry["plan"] or "Plan pending...", language="text")
+
+    if st.button("Reset Query Stats"):
+        query_stats.reset()
+        st.rerun()
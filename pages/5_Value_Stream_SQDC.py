@@ -1,15 +1,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
-from db import (
-    get_lines, get_safety_incidents, log_safety_incident,
-    get_production_summary, get_quality_summary, get_downtime_summary,
-    get_targets
-)
+from db import get_lines, get_safety_incidents, log_safety_incident, get_targets, fetch_many
+from event_store import events_for_window
+import page_profiler
+import sqdc_snapshots
 
 st.set_page_config(page_title="Value Stream SQDC Board", layout="wide")
 
 st.title("Value Stream SQDC Board")
+prof = page_profiler.start("Value Stream SQDC")
 
 if hasattr(st, "page_link"):
     st.page_link("pages/6_Executive_Summary.py", label="Go to Executive Summary", icon="📈")
@@ -24,68 +24,57 @@ with col1:
         selected_line_id = lines_df[lines_df["name"] == selected_line_name]["id"].values[0]
     else:
         st.error("No lines found in database.")
+        prof.finish()
         st.stop()
 
 with col2:
     view_scope = st.radio("View Scope", ["Today", "This Week"], horizontal=True)
     if view_scope == "Today":
         selected_date = st.date_input("Date", date.today())
-        start_ts = datetime.combine(selected_date, datetime.min.time()).isoformat()
-        end_ts = datetime.combine(selected_date, datetime.max.time()).isoformat()
+        start_dt = datetime.combine(selected_date, datetime.min.time())
+        end_dt = datetime.combine(selected_date, datetime.max.time())
         period_days = 1
     else:
         # Week to date (starting Monday) or last 7 days. Let's do last 7 days including today.
         today = date.today()
         start_date = today - timedelta(days=6)
         st.write(f"Showing data from {start_date} to {today}")
-        start_ts = datetime.combine(start_date, datetime.min.time()).isoformat()
-        end_ts = datetime.combine(today, datetime.max.time()).isoformat()
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(today, datetime.max.time())
         period_days = 7
+    start_ts = start_dt.isoformat()
+    end_ts = end_dt.isoformat()
 
 # --- Metrics Calculation ---
-
-# Get Targets
-targets = get_targets(selected_line_id)
-t_safety = targets.get("safety", 0.0)
-t_quality = targets.get("quality", 95.0)
-t_delivery = targets.get("delivery", 100.0)
-t_cost = targets.get("cost", 30.0)
-
-# 1. Safety
-safety_df = get_safety_incidents(selected_line_id, start_ts[:10], end_ts[:10])
-safety_incidents_count = len(safety_df)
-# Safety is green if <= target (usually 0)
-safety_status = "green" if safety_incidents_count <= t_safety else "red"
-
-# 2. Quality
-quality_df = get_quality_summary(start_ts, end_ts)
-# Filter for line
-quality_df = quality_df[quality_df['line_id'] == selected_line_id]
-total_scrap = quality_df['quantity'].sum() if not quality_df.empty else 0
-
-prod_df = get_production_summary(start_ts, end_ts)
-prod_df = prod_df[prod_df['line_id'] == selected_line_id]
-total_good = prod_df['good_quantity'].sum() if not prod_df.empty else 0
-
-total_produced = total_good + total_scrap
-fpy = (total_good / total_produced * 100) if total_produced > 0 else 100.0
-quality_status = "green" if fpy >= t_quality else "red"
-
-# 3. Delivery
-# Target scales with period (e.g. weekly target = daily * 7)
-period_target = t_delivery * period_days
-delivery_status = "green" if total_good >= period_target else "red"
-
-# 4. Cost (Downtime)
-dt_df = get_downtime_summary(start_ts, end_ts)
-dt_df = dt_df[dt_df['line_id'] == selected_line_id]
-total_downtime_min = dt_df['duration_minutes'].sum() if not dt_df.empty else 0
-# Target also scales with period? Usually we think of downtime per day.
-period_downtime_target = t_cost * period_days
-cost_status = "green" if total_downtime_min <= period_downtime_target else "red"
+prof.mark("metrics")
+
+if start_dt.date() == date.today():
+    # Today and the last 7 days come from the shared snapshot, computed once per interval for all viewers.
+    board, computed_at = sqdc_snapshots.get_line(selected_line_id, "today" if period_days == 1 else "week")
+    st.caption(f"Board snapshot from {computed_at:%H:%M:%S}")
+else:
+    # Other days are computed on demand.
+    page_data = fetch_many({
+        "targets": (get_targets, selected_line_id),
+        "safety": (get_safety_incidents, selected_line_id, start_ts[:10], end_ts[:10]),
+    })
+    line_totals = events_for_window(start_dt, end_dt).line_totals(start_dt, end_dt)
+    line_rows = line_totals[line_totals["line_id"] == selected_line_id]
+    board = sqdc_snapshots.line_state(
+        page_data["targets"], len(page_data["safety"]), line_rows.iloc[0] if not line_rows.empty else None, period_days,
+    )
+
+safety, quality, delivery, cost = board["safety"], board["quality"], board["delivery"], board["cost"]
+safety_status, quality_status = safety["status"], quality["status"]
+delivery_status, cost_status = delivery["status"], cost["status"]
+safety_incidents_count, t_safety = safety["incidents"], safety["target"]
+fpy, t_quality, total_scrap = quality["fpy"], quality["target"], quality["scrap"]
+total_good, period_target = delivery["good"], delivery["target"]
+total_downtime_min, period_downtime_target = cost["downtime_min"], cost["target"]
 
 
 # --- Visual Board ---
+prof.mark("board")
 st.divider()
 
 c1, c2, c3, c4 = st.columns(4)
@@ -128,6 +117,7 @@ with c4:
 st.divider()
 
 # --- Actions ---
+prof.mark("actions")
 st.subheader("Quick Actions")
 with st.expander("Report Safety Incident"):
     with st.form("safety_form"):
@@ -136,6 +126,7 @@ with st.expander("Report Safety Incident"):
         if submitted:
             if desc:
                 log_safety_incident(selected_line_id, date.today().isoformat(), desc)
+                sqdc_snapshots.invalidate()
                 st.success("Incident logged successfully. Refreshing...")
                 st.rerun()
             else:
@@ -143,3 +134,4 @@ with st.expander("Report Safety Incident"):
 
 st.info("Use the Executive Summary Dashboard to manage corrective actions.")
 
+prof.finish()
@@ -3,48 +3,61 @@ import pandas as pd
 from datetime import datetime, date
 from db import (
     get_lines, get_operators, get_safety_incidents,
-    get_production_summary, get_quality_summary, get_downtime_summary,
-    create_action, get_actions, close_action, get_targets
+    create_action, get_actions, close_action, get_targets, fetch_many
 )
+from event_store import events_for_window
+import page_profiler
 
 st.set_page_config(page_title="Executive Summary Dashboard", layout="wide")
 st.title("Executive Summary Dashboard (Tier 2)")
+prof = page_profiler.start("Executive Summary")
 
 if hasattr(st, "page_link"):
     st.page_link("pages/5_Value_Stream_SQDC.py", label="Go to Value Stream Board", icon="📊")
 
 # --- Date Context ---
 selected_date = st.date_input("View Date", date.today())
-start_ts = datetime.combine(selected_date, datetime.min.time()).isoformat()
-end_ts = datetime.combine(selected_date, datetime.max.time()).isoformat()
+start_dt = datetime.combine(selected_date, datetime.min.time())
+end_dt = datetime.combine(selected_date, datetime.max.time())
+start_ts = start_dt.isoformat()
+end_ts = end_dt.isoformat()
 
 # --- Gather Data ---
+prof.mark("data")
 lines_df = get_lines()
 if lines_df.empty:
     st.error("No lines configured.")
+    prof.finish()
     st.stop()
 
+# Quality, Delivery and Cost for every line in one vectorized pass over the shared event store
+line_totals = events_for_window(start_dt, end_dt).line_totals(start_dt, end_dt).set_index("line_id")
+
+# Targets and safety for all lines, plus the action panel's data, fetched concurrently
+page_data = {"operators": (get_operators,), "open_actions": (get_actions, "open")}
+for lid in lines_df["id"]:
+    page_data[("targets", lid)] = (get_targets, lid)
+    page_data[("safety", lid)] = (get_safety_incidents, lid, start_ts[:10], end_ts[:10])
+page_data = fetch_many(page_data)
+
 # Helper to calculate metrics for a line
 def calculate_metrics(line_id):
     # Fetch targets
-    targets = get_targets(line_id)
+    targets = page_data[("targets", line_id)]
     t_safety = targets.get("safety", 0.0)
     t_quality = targets.get("quality", 95.0)
     t_delivery = targets.get("delivery", 100.0)
     t_cost = targets.get("cost", 30.0)
 
     # Safety
-    safety_df = get_safety_incidents(line_id, start_ts[:10], end_ts[:10])
+    safety_df = page_data[("safety", line_id)]
     incidents = len(safety_df)
     
+    totals = line_totals.loc[line_id] if line_id in line_totals.index else None
+
     # Quality
-    q_df = get_quality_summary(start_ts, end_ts)
-    q_df = q_df[q_df['line_id'] == line_id]
-    scrap = q_df['quantity'].sum() if not q_df.empty else 0
-    
-    p_df = get_production_summary(start_ts, end_ts)
-    p_df = p_df[p_df['line_id'] == line_id]
-    good = p_df['good_quantity'].sum() if not p_df.empty else 0
+    scrap = int(totals["scrap"]) if totals is not None else 0
+    good = int(totals["good"]) if totals is not None else 0
     
     total = good + scrap
     fpy = (good / total * 100) if total > 0 else 100.0
@@ -53,9 +66,7 @@ def calculate_metrics(line_id):
     delivery_pct = (good / t_delivery * 100) if t_delivery > 0 else 0
     
     # Cost
-    dt_df = get_downtime_summary(start_ts, end_ts)
-    dt_df = dt_df[dt_df['line_id'] == line_id]
-    downtime = dt_df['duration_minutes'].sum() if not dt_df.empty else 0
+    downtime = float(totals["downtime_min"]) if totals is not None else 0
     
     return {
         "safety": {"val": incidents, "ok": incidents <= t_safety},
@@ -67,6 +78,7 @@ def calculate_metrics(line_id):
 metrics_map = {}
 alerts = []
 
+prof.mark("status matrix")
 st.subheader("Plant-Wide Status Matrix")
 # Header
 cols = st.columns([2, 2, 2, 2, 2])
@@ -109,6 +121,7 @@ for _, line in lines_df.iterrows():
 st.divider()
 
 # --- Alerts & Actions ---
+prof.mark("alerts & action form")
 col_alerts, col_actions = st.columns([1, 2])
 
 with col_alerts:
@@ -128,7 +141,7 @@ with col_actions:
             line_id_act = lines_df[lines_df['name'] == line_choice]['id'].values[0]
             cat_choice = st.selectbox("Category", ["Safety", "Quality", "Delivery", "Cost", "Other"])
         with c2:
-            ops_df = get_operators()
+            ops_df = page_data["operators"]
             assignee = st.selectbox("Assign To", ops_df['name'] if not ops_df.empty else ["Unassigned"])
             assignee_id = ops_df[ops_df['name'] == assignee]['id'].values[0] if not ops_df.empty else None
         
@@ -142,12 +155,13 @@ with col_actions:
 st.divider()
 
 # --- Action List ---
+prof.mark("open actions")
 st.subheader("Open Actions")
-open_actions = get_actions(status="open")
+open_actions = page_data["open_actions"]
 
 if not open_actions.empty:
     for _, row in open_actions.iterrows():
-        with st.expander(f"[{row['category']}] {row['line_name']} - {row['timestamp'][:10]} (Assigned: {row['assignee_name']})"):
+        with st.expander(f"[{row['category']}] {row['line_name']} - {row['timestamp']:%Y-%m-%d} (Assigned: {row['assignee_name']})"):
             st.write(f"**Description:** {row['description']}")
             with st.form(f"close_action_{row['id']}"):
                 notes = st.text_input("Resolution Notes")
@@ -158,3 +172,4 @@ if not open_actions.empty:
 else:
     st.info("No open actions.")
 
+prof.finish()
@@ -74,6 +74,7 @@ with tab_add:
             wo_number = st.text_input("WO Number (e.g. WO-2024-001)")
             part_number = st.text_input("Part Number")
             target_qty = st.number_input("Target Quantity", min_value=1, value=100)
+            ideal_cycle = st.number_input("Ideal Cycle Time (sec/unit, 0 = machine default)", min_value=0.0, value=0.0, step=0.5)
         
         with col2:
             lines_df = get_lines()
@@ -90,7 +91,8 @@ with tab_add:
                     part_number, 
                     target_qty, 
                     due_date.isoformat(), 
-                    line_options[selected_line_name]
+                    line_options[selected_line_name],
+                    ideal_cycle_seconds=ideal_cycle or None,
                 )
                 st.success(f"Work Order {wo_number} created!")
                 time.sleep(1) # wait a bit
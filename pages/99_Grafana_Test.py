@@ -1,5 +1,6 @@
 import streamlit as st
 import streamlit.components.v1 as components
+from config import METRICS_PORT
 
 st.set_page_config(page_title="Grafana Test", layout="wide")
 st.title("Grafana Embedding Test")
@@ -37,6 +38,13 @@ else:
 
 st.divider()
 
+st.markdown("### Data Source")
+st.markdown(f"""
+The app serves Prometheus metrics at `http://<app-host>:{METRICS_PORT}/metrics`.
+They cover query latency, pool usage, cache hits, sessions and page run times, plus per-line / per-machine state, downtime minutes and good / scrap counts for today.
+Add it as a Prometheus scrape target (a 5s interval is fine; KPIs are served from cached aggregates) and build the dashboard from there.
+""")
+
 st.markdown("### Troubleshooting")
 st.markdown("""
 1. **Refused to connect**: Check if `allow_embedding = true` is set in `grafana.ini` under `[security]`.
@@ -1,9 +1,8 @@
 import streamlit as st
-import openai
 import os
 import json
 import pandas as pd
-from db import get_connection, get_lines, get_machines, get_downtime_reasons
+from db import get_read_connection, release_connection, get_lines, get_machines, get_downtime_reasons
 
 # --- Page Config ---
 st.set_page_config(page_title="Lean Assistant", layout="wide")
@@ -28,6 +27,8 @@ with st.sidebar:
 # --- Setup OpenAI ---
 api_key =  os.getenv("OPENAI_API_KEY")
 # st.secrets.get("OPENAI_API_KEY") or
+import openai  # deferred: only the LLM pages load the SDK
+
 client = openai.OpenAI(api_key=api_key)
 
 # --- Tool Definitions ---
@@ -35,10 +36,13 @@ client = openai.OpenAI(api_key=api_key)
 def run_sql_query(query):
     """Executes a SQL query on the internal SQLite database and returns the results."""
     try:
-        conn = get_connection()
+        # Read endpoint (replica / snapshot when configured) keeps ad-hoc SQL off the operator write path.
+        conn = get_read_connection()
         # Use pandas for easy formatting, but strict SQL is fine too
-        df = pd.read_sql(query, conn)
-        conn.close()
+        try:
+            df = pd.read_sql(query, conn)
+        finally:
+            release_connection(conn)
         return df.to_json(orient="records", date_format="iso")
     except Exception as e:
         return f"Error executing query: {str(e)}"
@@ -0,0 +1,286 @@
+"""
+In-process query instrumentation.
+
+The `db.py` primitives wrap every call in `probe(...)`, which records wall time, connection
+acquire time, row count and the caller (page / module and helper function) under the
+query's identity: the compiled statement name, e.g. "get_work_orders[line_id,status]".
+Per-query latencies go into fixed histogram buckets, so percentiles are cheap to estimate.
+Calls slower than QUERY_SLOW_MS are kept in a bounded slow-query log with their SQL,
+parameters and an EXPLAIN plan, which is taken in the background.
+Stats are per process and reset on restart.
+"""
+import contextvars
+import hashlib
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+from config import QUERY_SLOW_LOG_SIZE, QUERY_SLOW_MS, QUERY_STATS_ENABLED
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# A plan is re-taken at most this often per query, so a slow hot query does not EXPLAIN on every call.
+_EXPLAIN_INTERVAL = 10 * 60
+
+_ROOT = Path(__file__).resolve().parent
+# Frames in these files are plumbing, not callers.
+_INTERNAL_FILES = {_ROOT / "db.py", _ROOT / "query_stats.py"}
+_SKIP_FUNCTIONS = {
+    "_read_df", "_fetch_one", "_execute", "_execute_returning_id", "_executemany", "_caller", "__exit__",
+}
+
+# Set by db.fetch_many so helpers run on worker threads are attributed to the submitting page.
+_origin: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("andon_query_origin", default=None)
+
+
+class QueryStat:
+    """Running totals for one query identity."""
+
+    __slots__ = ("name", "sql", "calls", "errors", "total_ms", "max_ms", "acquire_ms", "rows", "buckets", "callers")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.acquire_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (max_ms for the overflow bucket)."""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+_stats = {}
+_slow_log = deque(maxlen=QUERY_SLOW_LOG_SIZE)
+_lock = threading.Lock()
+_plans = {}
+_explained_at = {}
+_explainer: Optional[Callable[[str, list], str]] = None
+_explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="andon-explain")
+# Database time spent on the current thread, read by the page profiler.
+_thread_totals = threading.local()
+
+
+def set_explainer(fn: Callable[[str, list], str]):
+    """Register the backend-specific EXPLAIN function (db.py does this at import)."""
+    global _explainer
+    _explainer = fn
+
+
+def query_name(query, sql: str) -> str:
+    """Identity of a query: its registered/compiled name, or a short hash for ad-hoc SQL."""
+    name = getattr(query, "name", None)
+    if name:
+        return name
+    return "adhoc:" + hashlib.sha1(sql.encode()).hexdigest()[:8]
+
+
+@lru_cache(maxsize=256)
+def _origin_label(filename: str) -> Optional[str]:
+    """Repo-relative path of a caller's file; None for db plumbing and thread-pool frames."""
+    path = Path(filename).resolve()
+    if path in _INTERNAL_FILES or path.name in ("threading.py", "thread.py"):
+        return None
+    try:
+        return path.relative_to(_ROOT).as_posix()
+    except ValueError:
+        return path.name
+
+
+def _origin_of(frame) -> Optional[str]:
+    while frame is not None:
+        label = _origin_label(frame.f_code.co_filename)
+        if label is not None:
+            return label
+        frame = frame.f_back
+    return _origin.get()
+
+
+def caller_origin() -> str:
+    """The page / module calling into db.py, captured before work is handed to a thread."""
+    return _origin_of(sys._getframe(1)) or "?"
+
+
+def _caller() -> str:
+    """'origin:helper' for the code that called a db.py primitive."""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_name in _SKIP_FUNCTIONS:
+        frame = frame.f_back
+    helper = frame.f_code.co_name if frame is not None else "?"
+    return f"{_origin_of(frame) or '?'}:{helper}"
+
+
+def thread_db_ms() -> float:
+    """Cumulative query time on this thread (only counted while stats are enabled)."""
+    return getattr(_thread_totals, "db_ms", 0.0)
+
+
+def with_origin(origin: str, fn, *args):
+    """Run fn(*args) with `origin` as the attributed caller (used on worker threads)."""
+    token = _origin.set(origin)
+    try:
+        return fn(*args)
+    finally:
+        _origin.reset(token)
+
+
+class _Probe:
+    """Times one primitive call; `acquired()` marks when the connection was checked out."""
+
+    __slots__ = ("query", "sql", "params", "rows", "_start", "_acquired")
+
+    def __init__(self, query, sql: str, params):
+        self.query = query
+        self.sql = sql
+        self.params = params
+        self.rows = 0
+        self._acquired = None
+
+    def acquired(self):
+        self._acquired = time.perf_counter()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        elapsed_ms = (end - self._start) * 1000
+        acquire_ms = ((self._acquired or end) - self._start) * 1000
+        _record(self, elapsed_ms, acquire_ms, _caller(), exc_type is not None)
+        _thread_totals.db_ms = getattr(_thread_totals, "db_ms", 0.0) + elapsed_ms
+        return False
+
+
+class _NoProbe:
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+    def acquired(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def probe(query, sql: str, params):
+    """Context manager around one query execution."""
+    if not QUERY_STATS_ENABLED:
+        return _NoProbe()
+    return _Probe(query, sql, params)
+
+
+def _record(p: _Probe, elapsed_ms: float, acquire_ms: float, caller: str, failed: bool):
+    name = query_name(p.query, p.sql)
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = QueryStat(name, p.sql)
+        stat.calls += 1
+        stat.errors += failed
+        stat.total_ms += elapsed_ms
+        stat.max_ms = max(stat.max_ms, elapsed_ms)
+        stat.acquire_ms += acquire_ms
+        stat.rows += p.rows or 0
+        stat.buckets[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        stat.callers[caller] += 1
+        if elapsed_ms < QUERY_SLOW_MS:
+            return
+        entry = {
+            "at": datetime.now(),
+            "name": name,
+            "ms": round(elapsed_ms, 1),
+            "acquire_ms": round(acquire_ms, 1),
+            "rows": p.rows,
+            "caller": caller,
+            "sql": p.sql,
+            "params": repr(list(p.params or []))[:500],
+        }
+        _slow_log.append(entry)
+        now = time.monotonic()
+        explain = _explainer is not None and (
+            name not in _explained_at or now - _explained_at[name] >= _EXPLAIN_INTERVAL
+        )
+        if explain:
+            _explained_at[name] = now
+    if explain:
+        _explain_pool.submit(_explain, name, p.sql, list(p.params or []))
+
+
+def _explain(name: str, sql: str, params: list):
+    try:
+        plan = _explainer(sql, params)
+    except Exception as e:  # noqa: BLE001 - a plan is diagnostic only
+        plan = f"EXPLAIN failed: {e}"
+    with _lock:
+        _plans[name] = plan
+
+
+def summary() -> list:
+    """One row per query identity, slowest total time first."""
+    with _lock:
+        stats = list(_stats.values())
+        rows = [
+            {
+                "query": stat.name,
+                "calls": stat.calls,
+                "errors": stat.errors,
+                "total_ms": round(stat.total_ms, 1),
+                "mean_ms": round(stat.total_ms / stat.calls, 2),
+                "p50_ms": stat.percentile(0.50),
+                "p95_ms": stat.percentile(0.95),
+                "max_ms": round(stat.max_ms, 1),
+                "acquire_ms": round(stat.acquire_ms / stat.calls, 2),
+                "rows": stat.rows,
+                "top_caller": stat.callers.most_common(1)[0][0],
+                "sql": stat.sql,
+            }
+            for stat in stats
+        ]
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def histograms() -> dict:
+    """{query: (bucket counts, sum ms, calls)}, aligned with BUCKETS_MS plus an overflow bucket."""
+    with _lock:
+        return {name: (list(stat.buckets), stat.total_ms, stat.calls) for name, stat in _stats.items()}
+
+
+def slow_queries() -> list:
+    """Slow-query log entries, newest first, each with the latest plan for its query."""
+    with _lock:
+        return [dict(entry, plan=_plans.get(entry["name"])) for entry in reversed(_slow_log)]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
+        _plans.clear()
+        _explained_at.clear()
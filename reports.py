@@ -0,0 +1,143 @@
+"""
+Server-side aggregation and downsampling for the Reports page.
+
+Raw events never reach the browser. A range is cut into time buckets at the finest
+resolution that keeps each series under REPORTS_SOURCE_BUCKETS (15 minutes for a day or a
+month, hours for a year), aggregated with oee.compute / rolled up per line, and line series
+are then reduced with LTTB (Largest-Triangle-Three-Buckets) so a chart carries at most
+REPORTS_MAX_POINTS points whatever the zoom:
+
+    freq = reports.pick_resolution(start, end)
+    events = reports.load_events(start, end)
+    grid = reports.line_grid(events, start, end, freq)
+    chart_df = reports.series_frame(grid, grid.good / grid.bucket_min * 60, line_names)
+
+LTTB keeps the points that shape the line (spikes and dips survive), unlike every-nth
+sampling or coarser averaging.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import REPORTS_CACHE_SECONDS, REPORTS_MAX_POINTS, REPORTS_SOURCE_BUCKETS
+from db import get_master_data
+from event_store import EventColumns, get_event_store
+import oee
+
+# Bucket sizes from finest to coarsest (pandas offset aliases).
+RESOLUTIONS = ("15min", "30min", "1h", "2h", "4h", "8h", "1D", "7D")
+
+# One-off loads for ranges older than the event store, keyed by (start, end).
+_CACHE_ENTRIES = 4
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def pick_resolution(start: datetime, end: datetime, max_buckets: int = REPORTS_SOURCE_BUCKETS) -> str:
+    """The finest resolution giving at most `max_buckets` buckets over [start, end]."""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for freq in RESOLUTIONS:
+        if span / pd.Timedelta(freq) <= max_buckets:
+            return freq
+    return RESOLUTIONS[-1]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the `n_out` points Largest-Triangle-Three-Buckets keeps (first and last always)."""
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Points 1..n-2 split into n_out - 2 buckets; each keeps the point forming the largest
+    # triangle with the previously kept point and the next bucket's centroid.
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    lengths = np.diff(bounds)
+    x_mean = np.add.reduceat(x[1:n - 1], bounds[:-1] - 1) / lengths
+    y_mean = np.add.reduceat(y[1:n - 1], bounds[:-1] - 1) / lengths
+    x_next = np.append(x_mean[1:], x[-1])
+    y_next = np.append(y_mean[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs((x[a] - x_next[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (y_next[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def load_events(start: datetime, end: datetime) -> EventColumns:
+    """The shared event store when it covers `start`, else EventColumns.from_history reused for REPORTS_CACHE_SECONDS."""
+    store = get_event_store().sync()
+    if store.covers(start):
+        return store
+    key = (start, end)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is None or time.monotonic() - hit[0] >= REPORTS_CACHE_SECONDS:
+            hit = _cache[key] = (time.monotonic(), EventColumns.from_history(start, end))
+            for stale in sorted(_cache, key=lambda k: _cache[k][0])[:-_CACHE_ENTRIES]:
+                del _cache[stale]
+        return hit[1]
+
+
+def line_grid(events, start: datetime, end: datetime, freq: str, line_id=None,
+              now: Optional[datetime] = None) -> oee.OeeGrid:
+    """OEE parts per line (keys = line ids) x buckets of `freq` over [start, end]."""
+    master = get_master_data()
+    machines = master["machines"]
+    if line_id is not None:
+        machines = machines[machines["line_id"] == int(line_id)]
+    machines = machines[machines["line_id"].notnull()]
+    standards = oee.load_standards(master["machines"], master["downtime_reasons"])
+    grid = oee.compute(events, machines["id"].astype(int).to_numpy(), oee.bucket_edges(start, end, freq), standards, now=now)
+    return grid.rollup(groups=machines["line_id"].astype(int).to_numpy())
+
+
+def downtime_by_category(events, start: datetime, end: datetime, freq: str, line_id=None,
+                         now: Optional[datetime] = None) -> pd.DataFrame:
+    """Downtime minutes per reason category and bucket, split across bucket boundaries."""
+    reasons = get_master_data()["downtime_reasons"]
+    categories = np.array(sorted(reasons["category"].dropna().astype(str).unique()), dtype=object)
+    category_of = oee._dense(dict(zip(
+        reasons["id"].astype(int), np.searchsorted(categories, reasons["category"].fillna("").astype(str)),
+    )), fill=-1)
+    edges = oee.bucket_edges(start, end, freq)
+    dt = events.downtime
+    idx = oee._index(dt["reason_id"], category_of).astype(np.int64)
+    keep = (idx >= 0) & (idx < categories.size)
+    if line_id is not None:
+        keep &= dt["line_id"] == int(line_id)
+    ends = np.where(np.isnat(dt["end_time"]), np.datetime64(now or datetime.now(), "ms"), dt["end_time"])
+    minutes = oee._overlap_minutes(idx[keep], dt["start_time"][keep], ends[keep], edges, categories.size)
+    df = pd.DataFrame({
+        "bucket_start": np.tile(edges[:-1], categories.size),
+        "category": np.repeat(categories, edges.size - 1),
+        "downtime_min": minutes.ravel().round(1),
+    })
+    return df[df["downtime_min"] > 0].reset_index(drop=True)
+
+
+def series_frame(grid: oee.OeeGrid, values: np.ndarray, names: dict, max_points: int = REPORTS_MAX_POINTS) -> pd.DataFrame:
+    """
+    Long frame (bucket_start, series, value) of one row of `values` per grid key, LTTB-downsampled
+    so all series together hold at most `max_points` points. Undefined (NaN) buckets are dropped.
+    """
+    x = grid.edges[:-1]
+    per_series = max(3, max_points // max(1, len(grid.keys)))
+    frames = []
+    for key, row in zip(grid.keys, values):
+        defined = np.isfinite(row)
+        xs, ys = x[defined], row[defined]
+        kept = lttb(xs.astype(np.int64), ys, per_series)
+        frames.append(pd.DataFrame({"bucket_start": xs[kept], "series": names.get(int(key), str(key)), "value": ys[kept]}))
+    if not frames:
+        return pd.DataFrame(columns=["bucket_start", "series", "value"])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,255 @@
+"""
+Shift calendars and vectorized event-to-shift bucketing.
+
+A Calendar is a set of daily shifts plus the weekdays they run on and holidays; the plant
+calendar comes from config.SHIFTS / SHIFT_WORKDAYS / HOLIDAYS, and lines can override it
+in LINE_CALENDARS_PATH. `shift_table(calendar, first, last)` expands it into sorted
+boundary arrays, one row per shift instance, with its production date (the day the shift
+starts, so the overnight Shift 3 belongs to the evening it begins). Events are then placed
+with np.searchsorted:
+
+    table = shift_table(line_calendar(line_id), date(2026, 9, 1), date(2026, 9, 30))
+    idx = table.assign(timestamps)                           # shift instance per event, -1 = off shift
+    event, idx, minutes = table.split(starts, ends)          # downtime cut at shift boundaries
+
+`shift_totals(events, first, last)` does this for every line over the event store (or any
+EventColumns) in one pass, so multi-week shift-over-shift comparisons cost no extra queries.
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import HOLIDAYS, LINE_CALENDARS_PATH, SHIFT_WORKDAYS, SHIFTS
+
+# Pseudo-shift in SHIFTS covering the calendar day; it is a view, not part of the calendar.
+ALL_DAY = "All Day"
+_MINUTE = np.timedelta64(1, "m")
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class Calendar(NamedTuple):
+    """Daily shifts as (name, start minute, end minute) from the production date's midnight."""
+    shifts: tuple
+    workdays: frozenset
+    holidays: frozenset
+
+    @classmethod
+    def build(cls, shifts: dict, workdays=SHIFT_WORKDAYS, holidays=HOLIDAYS) -> "Calendar":
+        rows = []
+        for name, spec in shifts.items():
+            if name == ALL_DAY:
+                continue
+            start, end = _minutes(spec["start"]), _minutes(spec["end"])
+            # An end at or before the start is on the next day (overnight shift).
+            rows.append((name, start, end if end > start else end + 24 * 60))
+        return cls(tuple(rows), frozenset(int(day) for day in workdays), frozenset(str(day) for day in holidays))
+
+    @property
+    def names(self) -> tuple:
+        return tuple(name for name, _, _ in self.shifts)
+
+
+def plant_calendar() -> Calendar:
+    return Calendar.build(SHIFTS)
+
+
+@lru_cache(maxsize=1)
+def _line_overrides() -> dict:
+    if not LINE_CALENDARS_PATH:
+        return {}
+    spec = json.loads(Path(LINE_CALENDARS_PATH).read_text())
+    return {
+        int(line_id): Calendar.build(
+            override.get("shifts", SHIFTS),
+            override.get("workdays", SHIFT_WORKDAYS),
+            override.get("holidays", HOLIDAYS),
+        )
+        for line_id, override in spec.items()
+    }
+
+
+def line_calendar(line_id=None) -> Calendar:
+    """The line's calendar, or the plant calendar (also for line_id=None)."""
+    if line_id is None:
+        return plant_calendar()
+    return _line_overrides().get(int(line_id), plant_calendar())
+
+
+class ShiftTable(NamedTuple):
+    """Shift instances of one calendar, sorted by start (shifts of a calendar never overlap)."""
+    start: np.ndarray   # datetime64[ms]
+    end: np.ndarray     # datetime64[ms]
+    shift: np.ndarray   # index into names
+    date: np.ndarray    # datetime64[D] production date
+    names: tuple
+
+    def __len__(self) -> int:
+        return self.start.size
+
+    def assign(self, timestamps: np.ndarray) -> np.ndarray:
+        """Row of the shift instance containing each timestamp, or -1 (off shift / outside the table)."""
+        timestamps = np.asarray(timestamps, dtype="datetime64[ms]")
+        if len(self) == 0:
+            return np.full(timestamps.shape, -1, dtype=np.int64)
+        idx = np.searchsorted(self.start, timestamps, side="right") - 1
+        inside = (idx >= 0) & (timestamps < self.end[np.maximum(idx, 0)])
+        return np.where(inside, idx, -1)
+
+    def split(self, starts: np.ndarray, ends: np.ndarray):
+        """
+        Cut [start, end) intervals at shift boundaries: (interval index, shift row, minutes)
+        for every interval / shift instance pair that overlaps.
+        """
+        starts = np.asarray(starts, dtype="datetime64[ms]")
+        ends = np.asarray(ends, dtype="datetime64[ms]")
+        if len(self) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+        # First shift ending after the start, last shift starting before the end.
+        first = np.searchsorted(self.end, starts, side="right")
+        last = np.searchsorted(self.start, ends, side="left") - 1
+        count = np.clip(last - first + 1, 0, None)
+        interval = np.repeat(np.arange(starts.size), count)
+        offset = np.arange(interval.size) - np.repeat(np.cumsum(count) - count, count)
+        row = first[interval] + offset
+        overlap = np.minimum(ends[interval], self.end[row]) - np.maximum(starts[interval], self.start[row])
+        minutes = overlap / _MINUTE
+        keep = minutes > 0
+        return interval[keep], row[keep], minutes[keep]
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "shift_date": self.date,
+            "shift": np.array(self.names, dtype=object)[self.shift] if len(self) else np.empty(0, dtype=object),
+            "shift_start": self.start,
+            "shift_end": self.end,
+            "scheduled_min": (self.end - self.start) / _MINUTE,
+        })
+
+
+@lru_cache(maxsize=64)
+def shift_table(calendar: Calendar, first: date, last: date) -> ShiftTable:
+    """Every shift instance whose production date lies in [first, last], working days only."""
+    days = np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+    # 1970-01-01 was a Thursday (weekday 3).
+    weekday = (days.astype(np.int64) + 3) % 7
+    working = np.isin(weekday, list(calendar.workdays))
+    if calendar.holidays:
+        working &= ~np.isin(days, np.array(sorted(calendar.holidays), dtype="datetime64[D]"))
+    days = days[working]
+
+    midnight = days.astype("datetime64[ms]")
+    starts, ends, shifts, dates = [], [], [], []
+    for index, (_, start_min, end_min) in enumerate(calendar.shifts):
+        starts.append(midnight + np.timedelta64(start_min, "m"))
+        ends.append(midnight + np.timedelta64(end_min, "m"))
+        shifts.append(np.full(days.size, index, dtype=np.int16))
+        dates.append(days)
+    if not starts:
+        empty = np.empty(0, dtype="datetime64[ms]")
+        return ShiftTable(empty, empty, np.empty(0, dtype=np.int16), np.empty(0, dtype="datetime64[D]"), calendar.names)
+    start = np.concatenate(starts)
+    order = np.argsort(start, kind="stable")
+    return ShiftTable(
+        start[order], np.concatenate(ends)[order], np.concatenate(shifts)[order],
+        np.concatenate(dates)[order], calendar.names,
+    )
+
+
+def shift_window(calendar: Calendar, day: date, shift_name: str):
+    """(start, end) datetimes of `shift_name` on production date `day`; "All Day" is the calendar day."""
+    midnight = datetime.combine(day, time.min)
+    if shift_name == ALL_DAY:
+        return midnight, datetime.combine(day, time(23, 59))
+    for name, start_min, end_min in calendar.shifts:
+        if name == shift_name:
+            return midnight + timedelta(minutes=start_min), midnight + timedelta(minutes=end_min)
+    raise KeyError(f"Unknown shift '{shift_name}'.")
+
+
+def current_shift(calendar: Calendar, now: Optional[datetime] = None):
+    """(name, start, end) of the scheduled shift running at `now`, or None."""
+    now = now or datetime.now()
+    # The running shift started today or (overnight) yesterday.
+    table = shift_table(calendar, now.date() - timedelta(days=1), now.date())
+    idx = int(table.assign(np.array([np.datetime64(now, "ms")]))[0])
+    if idx < 0:
+        return None
+    return (
+        table.names[table.shift[idx]],
+        table.start[idx].astype(datetime),
+        table.end[idx].astype(datetime),
+    )
+
+
+def shift_totals(events, first: date, last: date, line_ids=None, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Machine downtime minutes (cut at shift boundaries), downtime events started, good and scrap per line
+    and shift instance for production dates [first, last], each line on its own calendar.
+    `events` is an event_store.EventColumns covering the range (the store or EventColumns.from_db).
+    """
+    now = np.datetime64(now or datetime.now(), "ms")
+    if line_ids is None:
+        line_ids = sorted(events.names.get("line_id", {}))
+    by_calendar = {}
+    for line_id in line_ids:
+        by_calendar.setdefault(line_calendar(line_id), []).append(int(line_id))
+
+    dt, quality, production = events.downtime, events.quality, events.production
+    dt_ends = np.where(np.isnat(dt["end_time"]), now, dt["end_time"])
+    frames = []
+    for calendar, lines in by_calendar.items():
+        table = shift_table(calendar, first, last)
+        if len(table) == 0:
+            # No working days in the range on this calendar (weekend / holidays only).
+            continue
+        lines = np.array(sorted(lines), dtype=np.int64)
+        n_lines, n_shifts = lines.size, len(table)
+        size = n_lines * n_shifts
+
+        def cells(line_column, row):
+            """Flat (line, shift row) cell per event, or -1."""
+            pos = np.searchsorted(lines, line_column)
+            pos = np.minimum(pos, n_lines - 1)
+            ok = (lines[pos] == line_column) & (row >= 0)
+            return np.where(ok, pos * n_shifts + row, -1)
+
+        def total(cell, weights=None):
+            keep = cell >= 0
+            w = None if weights is None else weights[keep]
+            return np.bincount(cell[keep], weights=w, minlength=size).astype(np.float64)
+
+        interval, row, minutes = table.split(dt["start_time"], dt_ends)
+        downtime_min = total(cells(dt["line_id"][interval].astype(np.int64), row), minutes)
+        downtime_events = total(cells(dt["line_id"].astype(np.int64), table.assign(dt["start_time"])))
+        good = total(cells(production["line_id"].astype(np.int64), table.assign(production["timestamp"])),
+                     production["good_quantity"].astype(np.float64))
+        scrap = total(cells(quality["line_id"].astype(np.int64), table.assign(quality["timestamp"])),
+                      quality["quantity"].astype(np.float64))
+
+        shifts = table.frame()
+        frame = pd.concat([shifts] * n_lines, ignore_index=True)
+        frame.insert(0, "line_id", np.repeat(lines, n_shifts))
+        frame["downtime_min"] = downtime_min
+        frame["downtime_events"] = downtime_events.astype(np.int64)
+        frame["good"] = good.astype(np.int64)
+        frame["scrap"] = scrap.astype(np.int64)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=[
+            "line_id", "shift_date", "shift", "shift_start", "shift_end", "scheduled_min",
+            "downtime_min", "downtime_events", "good", "scrap",
+        ])
+    df = pd.concat(frames, ignore_index=True)
+    df["line_name"] = df["line_id"].map(events.names.get("line_id", {}))
+    return df.sort_values(["shift_start", "line_id"], ignore_index=True)
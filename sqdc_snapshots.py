@@ -0,0 +1,211 @@
+"""
+Shared SQDC board snapshots.
+
+Tier-1 boards hang on several screens per value stream, and each screen used to recompute
+Safety, Quality, Delivery and Cost on every rerun. Here each line's SQDC state for today
+and for the last 7 days is computed once per SQDC_SNAPSHOT_SECONDS (or right after targets
+or safety incidents change) and shared by every viewer:
+
+    snapshot = sqdc_snapshots.get_snapshot()
+    board = snapshot["lines"][line_id]["today"]    # {"safety": {...}, "quality": {...}, ...}
+
+A background thread, started with the event store, keeps the snapshot current and, when
+SQDC_EXPORT_DIR is set, writes it as static self-refreshing HTML pages for floor TVs
+(index.html plus line_<id>.html). Compute cost is per line per interval, not per viewer.
+"""
+import html
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from config import SQDC_EXPORT_DIR, SQDC_SNAPSHOT_SECONDS
+from db import fetch_many, get_lines, get_safety_incidents, get_targets
+from event_store import events_for_window
+
+# Board scopes: name -> (label, days ending today)
+SCOPES = {"today": ("Today", 1), "week": ("Last 7 Days", 7)}
+
+_lock = threading.Lock()
+_snapshot = None
+_computed_at = 0.0
+_started = False
+_start_lock = threading.Lock()
+
+
+def _scope_window(days: int, today: Optional[date] = None):
+    today = today or date.today()
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    return start, datetime.combine(today, datetime.max.time())
+
+
+def line_state(targets: dict, incidents: int, totals: Optional[pd.Series], period_days: int) -> dict:
+    """SQDC values, targets and green/red status for one line and period."""
+    t_safety = targets.get("safety", 0.0)
+    t_quality = targets.get("quality", 95.0)
+    t_delivery = targets.get("delivery", 100.0)
+    t_cost = targets.get("cost", 30.0)
+
+    scrap = int(totals["scrap"]) if totals is not None else 0
+    good = int(totals["good"]) if totals is not None else 0
+    downtime_min = float(totals["downtime_min"]) if totals is not None else 0.0
+    produced = good + scrap
+    fpy = (good / produced * 100) if produced > 0 else 100.0
+    # Delivery and Cost targets are per day and scale with the period.
+    delivery_target = t_delivery * period_days
+    cost_target = t_cost * period_days
+
+    def status(ok: bool) -> str:
+        return "green" if ok else "red"
+
+    return {
+        "safety": {"incidents": incidents, "target": t_safety, "status": status(incidents <= t_safety)},
+        "quality": {"fpy": fpy, "scrap": scrap, "target": t_quality, "status": status(fpy >= t_quality)},
+        "delivery": {"good": good, "target": delivery_target, "status": status(good >= delivery_target)},
+        "cost": {"downtime_min": downtime_min, "target": cost_target, "status": status(downtime_min <= cost_target)},
+    }
+
+
+def compute(today: Optional[date] = None) -> dict:
+    """Every line's SQDC state for each scope, from the shared event store plus 2 reads per line."""
+    today = today or date.today()
+    lines = get_lines()
+    week_start, _ = _scope_window(SCOPES["week"][1], today)
+    calls = {}
+    for line_id in lines["id"].astype(int):
+        calls[("targets", line_id)] = (get_targets, line_id)
+        # One safety read per line covers both scopes.
+        calls[("safety", line_id)] = (get_safety_incidents, line_id, week_start.date().isoformat(), today.isoformat())
+    data = fetch_many(calls)
+
+    totals = {}
+    for scope, (_, days) in SCOPES.items():
+        start, end = _scope_window(days, today)
+        totals[scope] = events_for_window(start, end).line_totals(start, end).set_index("line_id")
+
+    snapshot = {"computed_at": datetime.now(), "date": today, "lines": {}}
+    for line_id, name in zip(lines["id"].astype(int), lines["name"]):
+        safety_dates = data[("safety", line_id)]["date"].astype(str)
+        entry = {"name": str(name)}
+        for scope, (_, days) in SCOPES.items():
+            start, _ = _scope_window(days, today)
+            incidents = int((safety_dates >= start.date().isoformat()).sum())
+            row = totals[scope].loc[line_id] if line_id in totals[scope].index else None
+            entry[scope] = line_state(data[("targets", line_id)], incidents, row, days)
+        snapshot["lines"][line_id] = entry
+    return snapshot
+
+
+def get_snapshot(max_age: float = SQDC_SNAPSHOT_SECONDS) -> dict:
+    """The shared snapshot, recomputed by one caller when older than `max_age` or a day old."""
+    global _snapshot, _computed_at
+    with _lock:
+        stale = _snapshot is None or time.monotonic() - _computed_at >= max_age or _snapshot["date"] != date.today()
+        if stale:
+            _snapshot = compute()
+            _computed_at = time.monotonic()
+        return _snapshot
+
+
+def get_line(line_id, scope: str) -> tuple:
+    """(SQDC state, computed_at) for one line and scope; a line added since the last compute triggers one."""
+    snapshot = get_snapshot()
+    if int(line_id) not in snapshot["lines"]:
+        invalidate()
+        snapshot = get_snapshot()
+    return snapshot["lines"][int(line_id)][scope], snapshot["computed_at"]
+
+
+def invalidate():
+    """Recompute on the next read, e.g. after targets or safety incidents change."""
+    global _computed_at
+    with _lock:
+        _computed_at = 0.0
+
+
+# --- Static HTML export ---
+
+_STYLE = """
+  body {margin: 0; padding: 1.5rem; font-family: 'Source Sans Pro', sans-serif; background: #0e1117; color: #fafafa;}
+  h1 {margin: 0 0 0.5rem;} h2 {margin: 1.5rem 0 0.5rem; color: #bbb;}
+  .row {display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem;}
+  .card {border-radius: 10px; padding: 1rem 1.25rem;}
+  .green {background: #1b5e20;} .red {background: #b71c1c;}
+  .metric {font-size: 1.1rem; font-weight: 600;} .value {font-size: 2.6rem; font-weight: 700;}
+  .target, .stamp {color: #ddd;} a {color: #fafafa;}
+"""
+
+
+def _cards(state: dict) -> str:
+    s, q, d, c = state["safety"], state["quality"], state["delivery"], state["cost"]
+    cards = [
+        ("Safety", s, f"{s['incidents']} Incidents", f"Target: &le; {int(s['target'])}"),
+        ("Quality", q, f"FPY {q['fpy']:.1f}%", f"Target: &ge; {q['target']}% | Scrap: {q['scrap']}"),
+        ("Delivery", d, f"{d['good']}/{int(d['target'])}", f"Target: {int(d['target'])} units"),
+        ("Cost", c, f"{c['downtime_min']:.0f} min", f"Target: &le; {int(c['target'])} min downtime"),
+    ]
+    return '<div class="row">' + "".join(
+        f'<div class="card {m["status"]}"><div class="metric">{title}</div>'
+        f'<div class="value">{value}</div><div class="target">{target}</div></div>'
+        for title, m, value, target in cards
+    ) + "</div>"
+
+
+def _page(title: str, body: str, computed_at: datetime, refresh: int) -> str:
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><meta http-equiv="refresh" content="{refresh}">'
+        f"<title>{html.escape(title)}</title><style>{_STYLE}</style></head><body>"
+        f"{body}<p class=\"stamp\">Updated {computed_at:%Y-%m-%d %H:%M:%S}</p></body></html>"
+    )
+
+
+def export_html(snapshot: dict, directory: str = SQDC_EXPORT_DIR) -> list:
+    """Write index.html and one line_<id>.html per line; returns the paths written."""
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    refresh = max(5, int(SQDC_SNAPSHOT_SECONDS))
+    pages = {}
+    links = []
+    for line_id, entry in snapshot["lines"].items():
+        name = html.escape(entry["name"])
+        body = f"<h1>{name} SQDC</h1>" + "".join(
+            f"<h2>{label}</h2>{_cards(entry[scope])}" for scope, (label, _) in SCOPES.items()
+        )
+        pages[f"line_{line_id}.html"] = _page(f"{entry['name']} SQDC", body, snapshot["computed_at"], refresh)
+        links.append(f'<h2><a href="line_{line_id}.html">{name}</a></h2>{_cards(entry["today"])}')
+    pages["index.html"] = _page("Plant SQDC", "<h1>Plant SQDC (Today)</h1>" + "".join(links), snapshot["computed_at"], refresh)
+
+    written = []
+    for filename, content in pages.items():
+        path = target / filename
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(content, encoding="utf-8")
+        # Screens reloading mid-write see the previous complete page.
+        os.replace(tmp, path)
+        written.append(path)
+    return written
+
+
+def _run():
+    while True:
+        try:
+            snapshot = get_snapshot(max_age=0)
+            if SQDC_EXPORT_DIR:
+                export_html(snapshot)
+        except Exception as e:  # noqa: BLE001 - boards fall back to computing on read
+            print(f"SQDC snapshots: refresh failed ({e})")
+        time.sleep(SQDC_SNAPSHOT_SECONDS)
+
+
+def start_scheduler():
+    """Refresh (and export) the snapshot every SQDC_SNAPSHOT_SECONDS in the background, once per process."""
+    global _started
+    with _start_lock:
+        if _started or SQDC_SNAPSHOT_SECONDS <= 0:
+            return
+        _started = True
+    threading.Thread(target=_run, name="andon-sqdc-snapshots", daemon=True).start()
@@ -0,0 +1,161 @@
+"""
+Named SQL statements compiled once per dialect.
+
+Statements are written once with `?` placeholders. Each (dialect, filter set) variant
+is translated the first time it is used and cached, so helpers do no string work per
+call. The database driver sees the same query text every time, which lets psycopg
+reuse server-side prepared statements. Names such as "get_work_orders[line_id,status]"
+identify each variant for logging and instrumentation.
+"""
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+DIALECTS = ("sqlite", "postgres")
+
+
+class Compiled(NamedTuple):
+    name: str
+    sql: str
+
+
+def to_dialect(sql: str, dialect: str) -> str:
+    """
+    Translate `?` placeholders for the target dialect. `?` inside quoted literals,
+    quoted identifiers and comments is left alone; on postgres a literal `%` is
+    doubled because psycopg reserves it for placeholders.
+    """
+    if dialect == "sqlite":
+        return sql
+    if dialect != "postgres":
+        raise ValueError(f"Unsupported dialect '{dialect}'. Use one of: {', '.join(DIALECTS)}")
+
+    out = []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    # A doubled quote is an escaped quote, not the end of the literal.
+                    if end + 1 < n and sql[end + 1] == ch:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            out.append(sql[i:end + 1].replace("%", "%%"))
+            i = end + 1
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = n if end == -1 else end
+            out.append(sql[i:end].replace("%", "%%"))
+            i = end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(sql[i:end].replace("%", "%%"))
+            i = end
+        elif ch == "?":
+            out.append("%s")
+            i += 1
+        elif ch == "%":
+            out.append("%%")
+            i += 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+@lru_cache(maxsize=512)
+def compile_adhoc(sql: str, dialect: str) -> str:
+    """Cached translation for one-off SQL strings that are not registered statements."""
+    return to_dialect(sql, dialect)
+
+
+def _filter_active(value) -> bool:
+    # Matches the helpers' historical `if line_id:` checks: None and "" mean "no filter".
+    return value is not None and not (isinstance(value, str) and value == "")
+
+
+class Statement:
+    """
+    A named query. `sql` is either one string or a {dialect: sql} mapping. Optional
+    `filters` map a keyword to a condition that is ANDed into a WHERE clause only when
+    the keyword is given a value; `tail` (ORDER BY / LIMIT) is appended after it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sql: Union[str, Dict[str, str]],
+        filters: Optional[Dict[str, str]] = None,
+        tail: str = "",
+    ):
+        self.name = name
+        self._sql = sql
+        self.filters = dict(filters or {})
+        self.tail = tail
+        self._compiled: Dict[Tuple[str, Tuple[str, ...]], Compiled] = {}
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+    def _source(self, dialect: str) -> str:
+        if isinstance(self._sql, dict):
+            if dialect not in self._sql:
+                raise ValueError(f"Statement '{self.name}' has no {dialect} variant.")
+            return self._sql[dialect]
+        return self._sql
+
+    def compile(self, dialect: str, active: Tuple[str, ...] = ()) -> Compiled:
+        """Compiled text for a dialect and a set of active filters (cached)."""
+        key = (dialect, active)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            sql = self._source(dialect).rstrip()
+            if active:
+                sql += "\nWHERE " + " AND ".join(self.filters[name] for name in active)
+            if self.tail:
+                sql += "\n" + self.tail
+            name = f"{self.name}[{','.join(active)}]" if active else self.name
+            compiled = Compiled(name, to_dialect(sql, dialect))
+            self._compiled[key] = compiled
+        return compiled
+
+    def bind(self, dialect: str, **filters) -> Tuple[Compiled, list]:
+        """
+        Pick the variant for the filters that have values and return it with their
+        parameters, in declaration order. Tail parameters (e.g. LIMIT) go after these.
+        """
+        unknown = set(filters) - set(self.filters)
+        if unknown:
+            raise ValueError(f"Statement '{self.name}' has no filter(s): {', '.join(sorted(unknown))}")
+        active = tuple(name for name in self.filters if _filter_active(filters.get(name)))
+        return self.compile(dialect, active), [filters[name] for name in active]
+
+
+_REGISTRY: Dict[str, Statement] = {}
+
+
+def register(
+    name: str,
+    sql: Union[str, Dict[str, str]],
+    filters: Optional[Dict[str, str]] = None,
+    tail: str = "",
+) -> Statement:
+    """Create a named statement; names are unique across the process."""
+    if name in _REGISTRY:
+        raise ValueError(f"Statement '{name}' is already registered.")
+    statement = Statement(name, sql, filters=filters, tail=tail)
+    _REGISTRY[name] = statement
+    return statement
+
+
+def get(name: str) -> Statement:
+    return _REGISTRY[name]
+
+
+def registered() -> Dict[str, Statement]:
+    """All registered statements by name."""
+    return dict(_REGISTRY)
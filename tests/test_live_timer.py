@@ -0,0 +1,34 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import live_timer
+
+
+@pytest.fixture
+def chicago_tz():
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Chicago"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_epoch_ms_treats_naive_timestamp_as_local_time(chicago_tz):
+    text = "2026-10-19 08:30:00"
+    expected = int(time.mktime(time.strptime(text, "%Y-%m-%d %H:%M:%S")) * 1000)
+    assert live_timer._epoch_ms(text) == expected
+    assert live_timer._epoch_ms(pd.Timestamp(text)) == expected
+    assert live_timer._epoch_ms(pd.Timestamp(text).to_pydatetime()) == expected
+
+
+def test_board_span_matches_string_start_time(chicago_tz):
+    # The Andon Board passes the Timestamp from get_andon_board_state() rows straight to span().
+    text = "2026-10-19 08:30:00"
+    assert live_timer.span(pd.Timestamp(text)) == live_timer.span(text)
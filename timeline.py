@@ -0,0 +1,125 @@
+"""
+Machine state timeline (Gantt) marks from downtime events.
+
+A chart of every stop across 50 machines x a week would be tens of thousands of bars,
+most narrower than a pixel. `build()` turns downtime columns into a bounded set of marks
+in one vectorized pass:
+
+    marks = timeline.build(events, machine_ids, start, end)   # machine_id, category, start, end, ...
+
+1. Intervals are clipped to the window and merged per machine and reason category when
+   they overlap or sit closer than one slice (window / TIMELINE_COLUMNS) apart. A bar may
+   thus cover short running gaps; its `minutes` is the down time of the stops it covers.
+2. Merged intervals shorter than a slice are bucketed per machine and slice into one
+   "Short stops" mark carrying their count and minutes.
+3. If there are still more than TIMELINE_MAX_MARKS marks, the slice doubles and the pass
+   repeats, so the chart size is bounded however busy the plant was.
+"""
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import TIMELINE_COLUMNS, TIMELINE_MAX_MARKS
+import oee
+
+SHORT_STOPS = "Short stops"
+
+
+def merge_intervals(keys: np.ndarray, starts: np.ndarray, ends: np.ndarray, gap: int = 0):
+    """
+    Merge [start, end) int64 intervals sharing a key that overlap or lie at most `gap` apart.
+    Returns (keys, starts, ends, counts) of the merged intervals, sorted by key then start.
+    """
+    if keys.size == 0:
+        return keys, starts, ends, np.zeros(0, dtype=np.int64)
+    order = np.lexsort((starts, keys))
+    k, s, e = keys[order], starts[order], ends[order]
+    first_of_key = np.r_[True, k[1:] != k[:-1]]
+    # Running max of ends within each key: offset each key's block above the previous one
+    # so a single maximum.accumulate never carries an end across keys.
+    group = np.cumsum(first_of_key) - 1
+    base = e.min()
+    height = int(e.max() - base) + 1
+    offset = group.astype(np.int64) * height
+    reach = np.maximum.accumulate(e - base + offset) - offset + base
+    opens = first_of_key | (s > np.r_[base, reach[:-1]] + gap)
+    heads = np.flatnonzero(opens)
+    return k[heads], s[heads], np.maximum.reduceat(e, heads), np.diff(np.r_[heads, k.size])
+
+
+def _marks(rows, cats, s, e, n_categories, origin, width):
+    """Merged bars and per-slice short-stop buckets for one slice width (ms)."""
+    # The union of stops (gap 0) is the real down time; joining pieces up to one slice apart
+    # is for drawing only, so each mark also carries the down time of the pieces it covers.
+    keys, us, ue, counts = merge_intervals(rows * n_categories + cats, s, e)
+    opens = np.r_[True, (keys[1:] != keys[:-1]) | (us[1:] > ue[:-1] + width)][:keys.size]
+    heads = np.flatnonzero(opens)
+    keys, ms = keys[heads], us[heads]
+    me = np.maximum.reduceat(ue, heads) if heads.size else ue
+    down = np.add.reduceat(ue - us, heads) if heads.size else ue
+    counts = np.add.reduceat(counts, heads) if heads.size else counts
+
+    long = (me - ms) >= width
+    bars = (keys[long] // n_categories, keys[long] % n_categories, ms[long], me[long], counts[long], down[long])
+
+    short_rows, short_slice = keys[~long] // n_categories, (ms[~long] - origin) // width
+    n_slices = int((e.max() - origin) // width) + 1 if e.size else 1
+    cell = short_rows * n_slices + short_slice
+    cells, inverse = np.unique(cell, return_inverse=True)
+    stops = np.bincount(inverse, weights=counts[~long], minlength=cells.size)
+    busy = np.bincount(inverse, weights=down[~long], minlength=cells.size)
+    slice_start = origin + (cells % n_slices) * width
+    short = (cells // n_slices, slice_start, slice_start + width, stops.astype(np.int64), busy)
+    return bars, short
+
+
+def build(events, machine_ids, start: datetime, end: datetime, reasons: pd.DataFrame,
+          now: Optional[datetime] = None, columns: int = TIMELINE_COLUMNS,
+          max_marks: int = TIMELINE_MAX_MARKS) -> pd.DataFrame:
+    """
+    Timeline marks for `machine_ids` over [start, end] from event columns (the event store or
+    EventColumns.from_db): machine_id, category, start, end, minutes (down time) and events.
+    `reasons` is the downtime_reasons frame (id, category).
+    """
+    machine_ids = np.asarray(machine_ids, dtype=np.int64)
+    categories = np.array(sorted(reasons["category"].dropna().astype(str).unique()), dtype=object)
+    category_of = oee._dense(dict(zip(
+        reasons["id"].astype(int), np.searchsorted(categories, reasons["category"].fillna("").astype(str)),
+    )), fill=-1)
+    row_of = oee._dense(dict(zip(machine_ids.tolist(), range(machine_ids.size))), fill=-1)
+
+    origin = np.datetime64(start, "ms").astype(np.int64)
+    stop = np.datetime64(end, "ms").astype(np.int64)
+    current = np.datetime64(now or datetime.now(), "ms").astype(np.int64)
+    dt = events.downtime
+    rows = oee._index(dt["machine_id"], row_of).astype(np.int64)
+    cats = oee._index(dt["reason_id"], category_of).astype(np.int64)
+    # Category -1 (reason missing) goes to an extra "Other" slot.
+    cats = np.where((cats < 0) | (cats >= categories.size), categories.size, cats)
+    s = np.maximum(dt["start_time"].astype("datetime64[ms]").astype(np.int64), origin)
+    ends = dt["end_time"].astype("datetime64[ms]")
+    e = np.minimum(np.where(np.isnat(ends), current, ends.astype(np.int64)), min(stop, current))
+    keep = (rows >= 0) & (e > s)
+    rows, cats, s, e = rows[keep], cats[keep], s[keep], e[keep]
+    labels = np.append(categories, "Other")
+
+    width = max(1, (stop - origin) // max(1, columns))
+    while True:
+        bars, short = _marks(rows, cats, s, e, labels.size, origin, width)
+        if bars[0].size + short[0].size <= max_marks or width >= stop - origin:
+            break
+        width *= 2
+
+    frame = pd.DataFrame({
+        "machine_id": np.concatenate([machine_ids[bars[0]], machine_ids[short[0]]]),
+        "category": np.concatenate([labels[bars[1]], np.full(short[0].size, SHORT_STOPS, dtype=object)]),
+        "start": np.concatenate([bars[2], short[1]]).astype("datetime64[ms]"),
+        "end": np.concatenate([bars[3], np.minimum(short[2], stop)]).astype("datetime64[ms]"),
+        "minutes": np.concatenate([bars[5], short[4]]) / 60_000,
+        "events": np.concatenate([bars[4], short[3]]),
+    })
+    frame["minutes"] = frame["minutes"].round(1)
+    frame["machine_name"] = frame["machine_id"].map(events.names.get("machine_id", {}))
+    return frame.sort_values(["machine_id", "start"], ignore_index=True)
@@ -0,0 +1,189 @@
+"""
+Warm-cache stage for fast restarts.
+
+When the process-wide event store is created, it is restored from an Arrow IPC snapshot
+on disk if the snapshot is still valid for the current database. A background thread then
+syncs it, which fetches only the rows past the snapshot watermarks, and precomputes
+today's and the current shift's aggregates. The thread keeps the store synced every
+EVENT_STORE_REFRESH_SECONDS, recomputing those aggregates whenever a sync changed the
+columns, and rewrites the snapshot every WARM_CACHE_SNAPSHOT_SECONDS and once more at exit.
+The first Supervisor / SQDC load after a deploy is then served from memory instead of a
+cold multi-day fetch. Snapshots are validated by MAX(id) against the stored watermarks;
+only the small master tables are counted.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import EVENT_STORE_REFRESH_SECONDS, WARM_CACHE_DIR, WARM_CACHE_SNAPSHOT_SECONDS
+from db import DB_BACKEND, DB_NAME, get_table_versions
+from event_store import DOWNTIME_COLUMNS, PRODUCTION_COLUMNS, QUALITY_COLUMNS, EventStore
+import shift_calendar
+
+# Bump when the snapshot layout or the names it carries change.
+SNAPSHOT_FORMAT = 3
+
+_LAYOUTS = {
+    "downtime": DOWNTIME_COLUMNS,
+    "quality": QUALITY_COLUMNS,
+    "production": PRODUCTION_COLUMNS,
+}
+# Event tables: a snapshot is only usable if none of them was reset below its watermark.
+_EVENT_TABLES = {
+    "downtime": "downtime_events",
+    "quality": "quality_events",
+    "production": "production_counts",
+}
+_MASTER_TABLES = ("lines", "machines", "operators", "downtime_reasons", "quality_reasons")
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _snapshot_dir() -> Path:
+    # One directory per database, so a dev SQLite file and Lakebase never share a snapshot.
+    return Path(WARM_CACHE_DIR) / f"event_store_{DB_BACKEND}_{Path(DB_NAME).stem}"
+
+
+def save_snapshot(store: EventStore, versions: dict = None) -> bool:
+    """Write the store's columns (Arrow IPC) and metadata; False when nothing to write."""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:  # pragma: no cover - snapshots are optional
+        return False
+
+    state = store.state()
+    if state["horizon"] is None:
+        return False
+    versions = versions if versions is not None else get_table_versions()
+    target = _snapshot_dir()
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    for name in _LAYOUTS:
+        feather.write_feather(pa.table(state[name]), tmp / f"{name}.arrow", compression="uncompressed")
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "written_at": datetime.now().isoformat(),
+        "days": store.days,
+        "horizon": state["horizon"].isoformat(),
+        "watermarks": state["watermarks"],
+        # Event tables are checked against the watermarks, so only master data versions are kept.
+        "table_versions": {
+            table: list(version) for table, version in versions.items()
+            if table == "schema_version" or table in _MASTER_TABLES
+        },
+        # JSON object keys are strings; ids are restored to int on load.
+        "names": {kind: {str(k): v for k, v in lookup.items()} for kind, lookup in state["names"].items()},
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    # Replace the previous snapshot as a whole so a reader never sees a half-written one.
+    old = target.with_name(target.name + ".old")
+    if target.exists():
+        os.replace(target, old)
+    os.replace(tmp, target)
+    if old.exists():
+        for path in old.iterdir():
+            path.unlink()
+        old.rmdir()
+    return True
+
+
+def load_snapshot(store: EventStore) -> bool:
+    """
+    Restore `store` from disk if the snapshot matches the current database: same schema
+    version and store window, and no event table below its snapshot watermark. Master data
+    names are kept only if those tables are unchanged.
+    """
+    try:
+        import pyarrow.feather as feather
+    except ImportError:  # pragma: no cover - snapshots are optional
+        return False
+
+    source = _snapshot_dir()
+    meta_path = source / "meta.json"
+    if not meta_path.exists():
+        return False
+    try:
+        meta = json.loads(meta_path.read_text())
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("days") != store.days:
+            return False
+
+        versions = get_table_versions()
+        saved = {table: tuple(version) for table, version in meta["table_versions"].items()}
+        if saved.get("schema_version") != versions.get("schema_version"):
+            return False
+        for kind, table in _EVENT_TABLES.items():
+            if versions[table][0] < meta["watermarks"][kind]:
+                return False
+        names_current = all(saved.get(table) == versions.get(table) for table in _MASTER_TABLES)
+
+        state = {
+            name: {
+                column: feather.read_table(source / f"{name}.arrow").column(column).to_numpy().astype(dtype)
+                for column, dtype in layout.items()
+            }
+            for name, layout in _LAYOUTS.items()
+        }
+        state["names"] = {kind: {int(k): v for k, v in lookup.items()} for kind, lookup in meta["names"].items()}
+        state["watermarks"] = meta["watermarks"]
+        state["horizon"] = datetime.fromisoformat(meta["horizon"])
+    except Exception as e:  # noqa: BLE001 - a corrupt snapshot just means a cold start
+        print(f"Warm cache: ignoring snapshot ({e})")
+        return False
+    return store.restore(state, names_current)
+
+
+def _precompute(store: EventStore):
+    """Fill the store's aggregate memo for the windows the dashboards open first."""
+    now = datetime.now()
+    # SQDC board / Executive Summary: today's per-line totals.
+    store.line_totals(datetime.combine(now.date(), datetime.min.time()), datetime.combine(now.date(), datetime.max.time()))
+    # Supervisor Dashboard: "All Day" and the running shift on each line's calendar.
+    all_day = shift_calendar.shift_window(shift_calendar.plant_calendar(), now.date(), shift_calendar.ALL_DAY)
+    for line_id in store.names.get("line_id", {}):
+        store.machine_summary(*all_day, line_id)
+        shift = shift_calendar.current_shift(shift_calendar.line_calendar(line_id), now)
+        if shift:
+            store.machine_summary(shift[1], shift[2], line_id)
+
+
+def _run(store: EventStore):
+    # Keep the store synced and the precompute set warm: the memo is dropped whenever a sync
+    # changes the columns, so the aggregates are recomputed here rather than by the next page.
+    warmed = None
+    snapshot_at = time.monotonic()
+    max_age = 0.0
+    while True:
+        try:
+            store.sync(max_age=max_age)
+            if store.generation != warmed:
+                warmed = store.generation
+                _precompute(store)
+        except Exception as e:  # noqa: BLE001 - warming is best effort; pages sync on demand
+            print(f"Warm cache: warm-up failed ({e})")
+        max_age = EVENT_STORE_REFRESH_SECONDS
+        if WARM_CACHE_DIR and WARM_CACHE_SNAPSHOT_SECONDS > 0 and time.monotonic() - snapshot_at >= WARM_CACHE_SNAPSHOT_SECONDS:
+            snapshot_at = time.monotonic()
+            try:
+                save_snapshot(store)
+            except Exception as e:  # noqa: BLE001
+                print(f"Warm cache: snapshot failed ({e})")
+        time.sleep(max(1.0, EVENT_STORE_REFRESH_SECONDS))
+
+
+def start_warmup(store: EventStore):
+    """Restore `store` from the snapshot (if valid), then warm and persist it in the background."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    if WARM_CACHE_DIR:
+        load_snapshot(store)
+        atexit.register(lambda: save_snapshot(store))
+    threading.Thread(target=_run, args=(store,), name="andon-warm-cache", daemon=True).start()
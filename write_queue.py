@@ -0,0 +1,350 @@
+"""
+Durable write-ahead queue for operator actions.
+
+Operator Panel writes are appended to a local SQLite journal (WRITE_QUEUE_PATH) and
+acknowledged at once: start / end downtime, scrap and good counts. Button latency
+therefore no longer depends on the main database. A background worker drains the
+journal in journal order, in batches of WRITE_QUEUE_BATCH, through db.apply_queued_writes.
+
+Every entry carries a client_event_id (uuid4) that is stored on the event row, so an
+entry replayed after a crash or a lost commit acknowledgement is applied only once.
+If the database is unreachable, the worker backs off and retries.
+If an entry is rejected, later entries for the same machine wait behind it, which keeps
+per-machine order. After WRITE_QUEUE_MAX_ATTEMPTS rejections the entry is parked as
+failed. The panel overlays entries that are not yet visible in its snapshot, so a tap
+shows up immediately.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import db
+from config import WRITE_QUEUE_BATCH, WRITE_QUEUE_MAX_ATTEMPTS, WRITE_QUEUE_PATH
+
+# Applied entries are kept this long so the panel can tell "applied after my snapshot" apart.
+_KEEP_APPLIED_SECONDS = 3600
+_IDLE_SECONDS = 1.0
+_MAX_BACKOFF_SECONDS = 30.0
+# Errors that mean the entry itself is bad; anything else (connection loss, lock timeouts) is retried.
+# Base classes in both sqlite3 and psycopg (constraint violations subclass IntegrityError there).
+_REJECTED = {"IntegrityError", "DataError"}
+
+_JOURNAL_DDL = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_event_id TEXT NOT NULL UNIQUE,
+    machine_id INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    applied_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_writes_status ON pending_writes (status, seq);
+CREATE INDEX IF NOT EXISTS idx_pending_writes_machine ON pending_writes (machine_id, seq);
+"""
+
+_init_lock = threading.Lock()
+# One journal connection per process, used under _journal_lock: taps queue on a Python lock
+# instead of spinning in SQLite's busy handler.
+_journal_lock = threading.Lock()
+_conn = None
+_worker = None
+_wake = threading.Event()
+
+
+def enabled() -> bool:
+    return bool(WRITE_QUEUE_PATH)
+
+
+@contextmanager
+def _journal():
+    """The process's journal connection, held exclusively for the duration of the block."""
+    global _conn
+    with _journal_lock:
+        if _conn is None:
+            Path(WRITE_QUEUE_PATH).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(WRITE_QUEUE_PATH, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # An acknowledged tap must survive a power cut: fsync every commit.
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(_JOURNAL_DDL)
+            _conn = conn
+        yield _conn
+
+
+def _native(value):
+    # Ids from DataFrame rows arrive as NumPy scalars.
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+
+def _enqueue(op: str, machine_id, payload: dict) -> str:
+    client_event_id = str(uuid.uuid4())
+    payload = dict(payload, client_event_id=client_event_id)
+    row = (client_event_id, int(machine_id), op, json.dumps(payload, default=_native), time.time())
+    with _journal() as conn, conn:
+        conn.execute(
+            "INSERT INTO pending_writes (client_event_id, machine_id, op, payload, created_at) VALUES (?, ?, ?, ?, ?)", row,
+        )
+    start_worker()
+    _wake.set()
+    return client_event_id
+
+
+# --- Operator actions (the Operator Panel's write paths) ---
+
+def create_downtime_event(machine_id, line_id, work_order_id, operator_id, reason_id, notes=""):
+    """Start downtime; returns the client_event_id (queued) or the row id (direct)."""
+    if not enabled():
+        return db.create_downtime_event(machine_id, line_id, work_order_id, operator_id, reason_id, notes)
+    return _enqueue("create_downtime", machine_id, {
+        "machine_id": machine_id, "line_id": line_id, "work_order_id": work_order_id, "operator_id": operator_id,
+        "reason_id": reason_id, "start_time": datetime.now().isoformat(), "notes": notes,
+    })
+
+
+def close_downtime_event(machine_id, event_id=None, client_event_id=None):
+    """End downtime by row id, or by the client_event_id of a start that may still be queued."""
+    if not enabled():
+        return db.close_downtime_event(event_id)
+    return _enqueue("close_downtime", machine_id, {
+        "event_id": event_id, "start_client_event_id": client_event_id, "end_time": datetime.now().isoformat(),
+    })
+
+
+def log_quality_event(machine_id, line_id, work_order_id, operator_id, reason_id, quantity, notes=""):
+    if not enabled():
+        return db.log_quality_event(machine_id, line_id, work_order_id, operator_id, reason_id, quantity, notes)
+    return _enqueue("log_quality", machine_id, {
+        "machine_id": machine_id, "line_id": line_id, "work_order_id": work_order_id, "operator_id": operator_id,
+        "reason_id": reason_id, "quantity": quantity, "timestamp": datetime.now().isoformat(), "notes": notes,
+    })
+
+
+def log_production_count(machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity=0):
+    if not enabled():
+        return db.log_production_count(machine_id, line_id, work_order_id, operator_id, good_quantity, scrap_quantity)
+    return _enqueue("log_production", machine_id, {
+        "machine_id": machine_id, "line_id": line_id, "work_order_id": work_order_id, "operator_id": operator_id,
+        "good_quantity": good_quantity, "scrap_quantity": scrap_quantity, "timestamp": datetime.now().isoformat(),
+    })
+
+
+# --- Read-your-writes for the Operator Panel ---
+
+def unsynced(machine_id, since: float) -> list:
+    """
+    Entries for a machine that a database read started at `since` (time.time()) may not
+    include: still pending, or applied after that. In journal order, as (op, payload).
+    """
+    if not enabled():
+        return []
+    with _journal() as conn:
+        rows = conn.execute(
+            """
+            SELECT op, payload FROM pending_writes
+            WHERE machine_id = ? AND (status = 'pending' OR (status = 'applied' AND applied_at >= ?))
+            ORDER BY seq
+            """,
+            (int(machine_id), since),
+        ).fetchall()
+    return [(row["op"], json.loads(row["payload"])) for row in rows]
+
+
+def overlay(snapshot: dict, entries: list, master: dict) -> dict:
+    """The panel snapshot with unsynced entries applied: active downtime and recent lists."""
+    if not entries:
+        return snapshot
+    downtime_reasons = master["downtime_reasons"].set_index("id")
+    quality_reasons = master["quality_reasons"].set_index("id")
+    operators = master["operators"].set_index("id")["name"]
+    active = snapshot["active_downtime"]
+    new_downtime, new_quality = [], []
+    for op, payload in entries:
+        if op == "create_downtime":
+            if active and active.get("client_event_id") == payload["client_event_id"]:
+                continue  # already in the snapshot
+            reason = downtime_reasons.loc[payload["reason_id"]] if payload["reason_id"] in downtime_reasons.index else None
+            active = {
+                "id": None, "client_event_id": payload["client_event_id"], "machine_id": payload["machine_id"],
+                "line_id": payload["line_id"], "reason_id": payload["reason_id"], "start_time": payload["start_time"],
+                "acknowledged_at": None,
+                "reason_code": reason["code"] if reason is not None else None,
+                "reason_description": reason["description"] if reason is not None else None,
+            }
+            new_downtime.append({
+                "start_time": payload["start_time"], "duration_minutes": None,
+                "reason_description": active["reason_description"], "operator_name": operators.get(payload["operator_id"]),
+            })
+        elif op == "close_downtime":
+            if active and (
+                (payload["event_id"] is not None and active.get("id") == payload["event_id"])
+                or (payload["start_client_event_id"] and active.get("client_event_id") == payload["start_client_event_id"])
+            ):
+                active = None
+        elif op == "log_quality":
+            reason = quality_reasons["description"].get(payload["reason_id"])
+            new_quality.append({"timestamp": payload["timestamp"], "quantity": payload["quantity"], "reason_description": reason})
+    snapshot = dict(snapshot, active_downtime=active)
+    for name, rows in (("recent_downtime", new_downtime), ("recent_quality", new_quality)):
+        if rows:
+            current = snapshot[name]
+            added = pd.DataFrame(rows[::-1], columns=current.columns)
+            for column in ("start_time", "timestamp"):
+                if column in added:
+                    added[column] = pd.to_datetime(added[column])
+            snapshot[name] = pd.concat([added, current], ignore_index=True).head(len(current) + len(rows))
+    return snapshot
+
+
+# --- Background drain ---
+
+def _is_rejection(e: Exception) -> bool:
+    return any(cls.__name__ in _REJECTED for cls in type(e).__mro__)
+
+
+def _mark_applied(seqs: list):
+    with _journal() as conn, conn:
+        conn.executemany(
+            "UPDATE pending_writes SET status = 'applied', applied_at = ? WHERE seq = ?",
+            [(time.time(), seq) for seq in seqs],
+        )
+
+
+def _mark_failed_attempt(row, error: Exception):
+    attempts = row["attempts"] + 1
+    status = "failed" if attempts >= WRITE_QUEUE_MAX_ATTEMPTS else "pending"
+    with _journal() as conn, conn:
+        conn.execute(
+            "UPDATE pending_writes SET attempts = ?, status = ?, last_error = ? WHERE seq = ?",
+            (attempts, status, f"{type(error).__name__}: {error}"[:500], row["seq"]),
+        )
+    if status == "failed":
+        print(f"Write queue: parked {row['op']} {row['client_event_id']} after {attempts} attempts: {error}")
+
+
+def drain_once() -> tuple:
+    """
+    Apply one batch of pending entries. Returns (applied, retry): `retry` is True when
+    the worker should back off (database unreachable or an entry was rejected).
+    """
+    # The journal is not held while the main database is written, so taps never wait on it.
+    with _journal() as conn:
+        rows = conn.execute(
+            "SELECT seq, client_event_id, machine_id, op, payload, attempts FROM pending_writes "
+            "WHERE status = 'pending' ORDER BY seq LIMIT ?",
+            (WRITE_QUEUE_BATCH,),
+        ).fetchall()
+    if not rows:
+        return 0, False
+    entries = [(row["op"], json.loads(row["payload"])) for row in rows]
+    try:
+        db.apply_queued_writes(entries)
+    except Exception as e:  # noqa: BLE001 - classified below
+        if not _is_rejection(e):
+            return 0, True
+    else:
+        _mark_applied([row["seq"] for row in rows])
+        return len(rows), False
+
+    # A batch was rejected: apply one by one to isolate the bad entries, keeping order per machine.
+    applied, blocked = [], set()
+    for row, entry in zip(rows, entries):
+        if row["machine_id"] in blocked:
+            continue
+        try:
+            db.apply_queued_writes([entry])
+        except Exception as e:  # noqa: BLE001
+            if not _is_rejection(e):
+                break
+            _mark_failed_attempt(row, e)
+            blocked.add(row["machine_id"])
+            continue
+        applied.append(row["seq"])
+    _mark_applied(applied)
+    return len(applied), True
+
+
+def _purge():
+    with _journal() as conn, conn:
+        conn.execute(
+            "DELETE FROM pending_writes WHERE status = 'applied' AND applied_at < ?",
+            (time.time() - _KEEP_APPLIED_SECONDS,),
+        )
+
+
+def _run():
+    backoff = 0.0
+    last_purge = 0.0
+    while True:
+        _wake.wait(backoff or _IDLE_SECONDS)
+        _wake.clear()
+        try:
+            while True:
+                applied, retry = drain_once()
+                if retry:
+                    backoff = min(max(backoff * 2, 0.5), _MAX_BACKOFF_SECONDS)
+                    break
+                backoff = 0.0
+                if not applied:
+                    break
+            if time.monotonic() - last_purge > 60:
+                _purge()
+                last_purge = time.monotonic()
+        except Exception as e:  # noqa: BLE001 - keep the worker alive (e.g. journal disk full)
+            print(f"Write queue worker error: {e}")
+            backoff = _MAX_BACKOFF_SECONDS
+
+
+def start_worker():
+    """Start the drain thread once per process; also drains entries left by a previous run."""
+    global _worker
+    if not enabled() or _worker is not None:
+        return
+    with _init_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="andon-write-queue", daemon=True)
+            _worker.start()
+
+
+def flush(timeout: float = 10.0) -> bool:
+    """Wait until nothing is pending (tests, benchmarks, shutdown); False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not stats()["pending"]:
+            return True
+        _wake.set()
+        time.sleep(0.05)
+    return False
+
+
+def stats() -> dict:
+    """Pending / failed counts and the age of the oldest pending entry, in seconds."""
+    if not enabled():
+        return {"pending": 0, "failed": 0, "oldest_pending_seconds": 0.0}
+    with _journal() as conn:
+        row = conn.execute(
+            """
+            SELECT SUM(status = 'pending') AS pending, SUM(status = 'failed') AS failed,
+                   MIN(CASE WHEN status = 'pending' THEN created_at END) AS oldest
+            FROM pending_writes
+            """
+        ).fetchone()
+    oldest = row["oldest"]
+    return {
+        "pending": row["pending"] or 0,
+        "failed": row["failed"] or 0,
+        "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+    }